@@ -0,0 +1,137 @@
+"""
+Budget Optimizer for Affiliate Matrix
+
+Vectorized solver for splitting a total budget across campaigns.
+
+Each campaign gets a concave response curve
+
+    f(b) = w * log(1 + b / s)      (s > 0, diminishing returns)
+    f(b) = w * log(b)              (s = 0)
+
+whose marginal return w / (s + b) falls as spend grows. Maximizing the
+summed response under sum(b) <= total and lower <= b <= upper is solved
+by water-filling: at the optimum every campaign strictly inside its
+bounds has the same marginal return lambda, so
+
+    b(lambda) = clip(w / lambda - s, lower, upper)
+
+and lambda is found by bisection on the (monotone) total spend. Equal
+and proportional splits are the s = 0 cases with w = 1 and w = score.
+"""
+
+from typing import Optional, Tuple
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BISECTION_STEPS = 100
+
+
+def response(weights: np.ndarray, saturation: np.ndarray, budgets: np.ndarray) -> np.ndarray:
+    """Expected return of each campaign at the given spend (saturation > 0)."""
+    return weights * np.log1p(budgets / saturation)
+
+
+def curve_from_observation(value_per_dollar: np.ndarray, budgets: np.ndarray,
+                           saturation: np.ndarray) -> np.ndarray:
+    """Curve weights that reproduce an observed average return at the current spend.
+
+    A campaign returning `value_per_dollar` on average at `budgets` with
+    the given saturation spend gets w = value * b / log(1 + b / s); with no
+    spend yet, the observed value is taken as the marginal return at zero.
+    """
+    ratio = budgets / saturation
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scale = np.where(ratio > 0, ratio / np.log1p(ratio), 1.0)
+    return value_per_dollar * saturation * scale
+
+
+def change_bounds(current: np.ndarray, lower: np.ndarray, upper: np.ndarray,
+                  max_change_ratio: Optional[float]) -> Tuple[np.ndarray, np.ndarray]:
+    """Tighten [lower, upper] so no budget moves more than max_change_ratio of its current value.
+
+    Campaigns without a current budget are only held to their own bounds.
+    Where the two limits conflict, the campaign's own bounds win.
+    """
+    if max_change_ratio is None:
+        return lower, upper
+    funded = current > 0
+    low = np.where(funded, np.maximum(lower, current * (1 - max_change_ratio)), lower)
+    high = np.where(funded, np.minimum(upper, current * (1 + max_change_ratio)), upper)
+    low = np.minimum(low, upper)
+    return low, np.maximum(high, low)
+
+
+def water_fill(weights: np.ndarray, saturation: np.ndarray, lower: np.ndarray, upper: np.ndarray,
+               total: float, min_marginal: Optional[float] = None) -> np.ndarray:
+    """
+    Optimal budgets for concave response curves under box and total constraints.
+
+    Args:
+        weights: Curve weights w (>= 0)
+        saturation: Curve offsets s (>= 0); 0 gives logarithmic curves
+        lower: Per-campaign minimum budgets
+        upper: Per-campaign maximum budgets (may be inf)
+        total: Budget to distribute
+        min_marginal: Stop spending where a dollar returns less than this
+
+    Returns:
+        Budgets, aligned with the inputs
+    """
+    lower = np.asarray(lower, dtype=float)
+    upper = np.asarray(upper, dtype=float)
+    floor_total = lower.sum()
+    if floor_total >= total:
+        if floor_total > total:
+            logger.warning(f"Minimum budgets ({floor_total:.2f}) exceed the total ({total:.2f}); scaling them down")
+        return lower * (total / floor_total) if floor_total > 0 else lower.copy()
+
+    active = weights > 0
+    if not active.any():
+        return lower.copy()
+
+    def spend(lam: float) -> np.ndarray:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            wanted = np.where(active, weights / lam - saturation, lower)
+        return np.clip(wanted, lower, upper)
+
+    # Bracket lambda between the marginal returns at the upper and lower bounds
+    with np.errstate(divide='ignore'):
+        high = float(np.where(active, weights / (saturation + lower), 0.0).max())
+        low = float(np.where(active, weights / (saturation + upper), np.inf).min())
+    if np.isinf(high):
+        # Logarithmic curve starting at zero: raise lambda until the spend fits
+        high = float(weights.max())
+        while spend(high).sum() > total:
+            high *= 2
+    if low <= 0:
+        # Some campaign is unbounded: lower lambda until it would overspend
+        low = high
+        while spend(low).sum() <= total:
+            low /= 2
+    if spend(low).sum() <= total:
+        lam = low                   # every active campaign fits at its upper bound
+    else:
+        for _ in range(BISECTION_STEPS):
+            lam = float(np.sqrt(low * high))
+            if spend(lam).sum() > total:
+                low = lam
+            else:
+                high = lam
+            if high / low - 1 < 1e-12:
+                break
+        lam = high
+
+    if min_marginal is not None and lam < min_marginal:
+        return spend(min_marginal)
+    budgets = spend(lam)
+    # Hand the bisection remainder to the campaigns with room left
+    remainder = total - budgets.sum()
+    # (in proportion to their spend, never past their upper bound)
+    room = np.where(active, np.minimum(upper - budgets, budgets + 1.0), 0.0)
+    room_total = room.sum()
+    if remainder > 0 and room_total > 0:
+        budgets += room * min(1.0, remainder / room_total)
+    return budgets
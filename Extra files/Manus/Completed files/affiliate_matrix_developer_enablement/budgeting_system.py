@@ -5,12 +5,15 @@ This module implements a dynamic budgeting system to allocate funds to campaigns
 based on performance metrics.
 """
 
-from typing import Dict, List, Optional, Any, Union
+from typing import Dict, List, Optional, Any
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime
 from enum import Enum
+import numpy as np
 from pydantic import BaseModel, Field
 
+from .budget_optimizer import change_bounds, curve_from_observation, response, water_fill
+
 logger = logging.getLogger(__name__)
 
 class AllocationStrategy(str, Enum):
@@ -42,6 +45,9 @@ class Campaign(BaseModel):
     status: str = "active"  # active, paused, completed
     performance: Dict[str, float] = {}
     tags: List[str] = []
+    min_budget: Optional[float] = None
+    max_budget: Optional[float] = None
+    saturation_budget: Optional[float] = None  # spend at which returns have halved
     
     @property
     def remaining_budget(self) -> float:
@@ -77,16 +83,22 @@ class BudgetingSystem:
     4. Providing budget forecasts and recommendations
     """
     
-    def __init__(self, total_budget: float, allocation_strategy: AllocationStrategy = AllocationStrategy.PROPORTIONAL):
+    def __init__(self, total_budget: float, allocation_strategy: AllocationStrategy = AllocationStrategy.PROPORTIONAL,
+                 max_change_ratio: Optional[float] = None, min_campaign_budget: float = 0.0):
         """
         Initialize the BudgetingSystem service.
         
         Args:
             total_budget: Total budget available for allocation
             allocation_strategy: Strategy to use for budget allocation
+            max_change_ratio: Largest relative change of a campaign budget per
+                allocation (e.g. 0.25 for +/-25%); None for no limit
+            min_campaign_budget: Minimum budget of campaigns without their own
         """
         self.total_budget = total_budget
         self.allocation_strategy = allocation_strategy
+        self.max_change_ratio = max_change_ratio
+        self.min_campaign_budget = min_campaign_budget
         self.campaigns: Dict[str, Campaign] = {}
         self.allocation_history: List[BudgetAllocation] = []
         
@@ -201,61 +213,73 @@ class BudgetingSystem:
         Returns:
             List of BudgetAllocation decisions
         """
-        # TODO: Implement budget allocation logic
-        # This should calculate new budgets for each campaign based on performance
-        # and the selected allocation strategy
-        
         strategy = allocation_strategy or self.allocation_strategy
         logger.info(f"Allocating budget using {strategy} strategy based on {performance_metric}")
         
-        # Example implementation:
-        # active_campaigns = self.list_campaigns(status="active")
-        # if not active_campaigns:
-        #     return []
-        # 
-        # allocations = []
-        # 
-        # if strategy == AllocationStrategy.EQUAL:
-        #     # Equal distribution
-        #     per_campaign_budget = self.total_budget / len(active_campaigns)
-        #     for campaign in active_campaigns:
-        #         allocation = BudgetAllocation(
-        #             campaign_id=campaign.id,
-        #             previous_budget=campaign.current_budget,
-        #             new_budget=per_campaign_budget,
-        #             change_amount=per_campaign_budget - campaign.current_budget,
-        #             change_percentage=(per_campaign_budget / campaign.current_budget - 1) * 100 if campaign.current_budget > 0 else 100,
-        #             reason=f"Equal distribution of ${self.total_budget} across {len(active_campaigns)} campaigns"
-        #         )
-        #         allocations.append(allocation)
-        # 
-        # elif strategy == AllocationStrategy.PROPORTIONAL:
-        #     # Proportional to performance
-        #     total_performance = sum(c.performance.get(performance_metric, 0) for c in active_campaigns)
-        #     if total_performance <= 0:
-        #         # Fall back to equal distribution if no performance data
-        #         return self.allocate_budget(performance_metric, AllocationStrategy.EQUAL)
-        #     
-        #     for campaign in active_campaigns:
-        #         performance_value = campaign.performance.get(performance_metric, 0)
-        #         proportion = performance_value / total_performance if total_performance > 0 else 0
-        #         new_budget = self.total_budget * proportion
-        #         
-        #         allocation = BudgetAllocation(
-        #             campaign_id=campaign.id,
-        #             previous_budget=campaign.current_budget,
-        #             new_budget=new_budget,
-        #             change_amount=new_budget - campaign.current_budget,
-        #             change_percentage=(new_budget / campaign.current_budget - 1) * 100 if campaign.current_budget > 0 else 100,
-        #             reason=f"Proportional allocation based on {performance_metric} performance ({performance_value:.2f})"
-        #         )
-        #         allocations.append(allocation)
-        # 
-        # # ... implement other strategies similarly
-        # 
-        # return allocations
+        active_campaigns = self.list_campaigns(status="active")
+        if not active_campaigns or strategy == AllocationStrategy.MANUAL:
+            return []
+        
+        current, lower, upper, saturation = self._budget_arrays(active_campaigns)
+        score = self._value_per_dollar(active_campaigns, performance_metric)
+        
+        # Every strategy is a water-filling solve with its own response curves:
+        # log(b) curves give budgets proportional to their weights
+        if strategy == AllocationStrategy.EXPLORATORY:
+            weights = curve_from_observation(score, current, saturation)
+            offsets = saturation
+            reason = f"Diminishing-returns optimization of {performance_metric}"
+        else:
+            if strategy == AllocationStrategy.PARETO and (score > 0).any():
+                # The top 20% of performers share the budget beyond the minimums
+                score = np.where(score >= np.quantile(score, 0.8), score, 0.0)
+            if strategy == AllocationStrategy.EQUAL or not (score > 0).any():
+                weights = np.ones(len(active_campaigns))
+                reason = f"Equal distribution of ${self.total_budget} across {len(active_campaigns)} campaigns"
+            else:
+                weights = score
+                reason = f"{strategy.value.capitalize()} allocation based on {performance_metric} performance"
+            offsets = np.zeros(len(active_campaigns))
         
-        return []
+        lower, upper = change_bounds(current, lower, upper, self.max_change_ratio)
+        budgets = water_fill(weights, offsets, lower, upper, self.total_budget)
+        return self._allocations(active_campaigns, current, budgets, reason)
+    
+    def _budget_arrays(self, campaigns: List[Campaign]):
+        """(current budgets, lower bounds, upper bounds, saturation spends) as arrays"""
+        current = np.array([c.current_budget for c in campaigns], dtype=float)
+        lower = np.array([self.min_campaign_budget if c.min_budget is None else c.min_budget
+                          for c in campaigns], dtype=float)
+        upper = np.array([np.inf if c.max_budget is None else c.max_budget for c in campaigns], dtype=float)
+        # Without an estimate, returns are assumed to halve at twice the average budget
+        default = max(2 * self.total_budget / len(campaigns), 1e-9)
+        saturation = np.array([c.saturation_budget or default for c in campaigns], dtype=float)
+        return current, lower, upper, saturation
+    
+    @staticmethod
+    def _value_per_dollar(campaigns: List[Campaign], metric: PerformanceMetric) -> np.ndarray:
+        """Observed return per budget dollar (ROI and revenue) or the raw score (other metrics)"""
+        values = np.array([c.performance.get(metric, 0.0) for c in campaigns], dtype=float)
+        if metric == PerformanceMetric.ROI:
+            values = 1 + values
+        elif metric == PerformanceMetric.TOTAL_REVENUE:
+            spend = np.array([c.spent_budget or c.current_budget for c in campaigns], dtype=float)
+            values = np.divide(values, spend, out=np.zeros_like(values), where=spend > 0)
+        return np.maximum(values, 0.0)
+    
+    @staticmethod
+    def _allocations(campaigns: List[Campaign], current: np.ndarray, budgets: np.ndarray,
+                     reason: str) -> List[BudgetAllocation]:
+        change = budgets - current
+        with np.errstate(divide='ignore', invalid='ignore'):
+            percentage = np.where(current > 0, change / current * 100, 100.0)
+        now = datetime.utcnow()
+        return [
+            BudgetAllocation(campaign_id=c.id, previous_budget=previous, new_budget=new,
+                             change_amount=delta, change_percentage=pct, reason=reason, timestamp=now)
+            for c, previous, new, delta, pct in zip(campaigns, current.tolist(), budgets.tolist(),
+                                                    change.tolist(), percentage.tolist())
+        ]
     
     def apply_allocations(self, allocations: List[BudgetAllocation]) -> bool:
         """
@@ -267,23 +291,16 @@ class BudgetingSystem:
         Returns:
             True if successful, False otherwise
         """
-        # TODO: Implement allocation application logic
-        # This should update each campaign's budget based on the allocations
-        
-        # Example implementation:
-        # for allocation in allocations:
-        #     if allocation.campaign_id in self.campaigns:
-        #         campaign = self.campaigns[allocation.campaign_id]
-        #         campaign.current_budget = allocation.new_budget
-        #         allocation.applied = True
-        #         self.allocation_history.append(allocation)
-        #     else:
-        #         logger.warning(f"Campaign not found for allocation: {allocation.campaign_id}")
-        # 
-        # logger.info(f"Applied {len(allocations)} budget allocations")
-        # return True
+        for allocation in allocations:
+            if allocation.campaign_id in self.campaigns:
+                campaign = self.campaigns[allocation.campaign_id]
+                campaign.current_budget = allocation.new_budget
+                allocation.applied = True
+                self.allocation_history.append(allocation)
+            else:
+                logger.warning(f"Campaign not found for allocation: {allocation.campaign_id}")
         
-        logger.info(f"Applying {len(allocations)} budget allocations")
+        logger.info(f"Applied {len(allocations)} budget allocations")
         return True
     
     def get_allocation_history(self, campaign_id: Optional[str] = None) -> List[BudgetAllocation]:
@@ -330,15 +347,39 @@ class BudgetingSystem:
         Returns:
             Dictionary with optimization results
         """
-        # TODO: Implement budget optimization logic
-        # This should use advanced algorithms to find optimal budget distribution
-        
         logger.info(f"Optimizing budget distribution for {target_metric}")
+        active_campaigns = self.list_campaigns(status="active")
+        if not active_campaigns:
+            return {
+                "current_performance": 0.0,
+                "optimized_performance": 0.0,
+                "improvement_percentage": 0.0,
+                "recommended_allocations": []
+            }
+        
+        current, lower, upper, saturation = self._budget_arrays(active_campaigns)
+        weights = curve_from_observation(self._value_per_dollar(active_campaigns, target_metric), current, saturation)
+        lower, upper = change_bounds(current, lower, upper, self.max_change_ratio)
+        # For ROI, stop funding a campaign once a dollar returns less than a dollar
+        min_marginal = 1.0 if target_metric == PerformanceMetric.ROI else None
+        budgets = water_fill(weights, saturation, lower, upper, self.total_budget, min_marginal)
+        
+        def performance(spend: np.ndarray) -> float:
+            expected = float(response(weights, saturation, spend).sum())
+            # ROI is reported as net return; other metrics as their expected total
+            return expected - float(spend.sum()) if min_marginal is not None else expected
+        
+        current_performance = performance(current)
+        optimized_performance = performance(budgets)
+        improvement = ((optimized_performance - current_performance) / abs(current_performance) * 100
+                       if current_performance else 0.0)
         return {
-            "current_performance": 0.0,
-            "optimized_performance": 0.0,
-            "improvement_percentage": 0.0,
-            "recommended_allocations": []
+            "current_performance": current_performance,
+            "optimized_performance": optimized_performance,
+            "improvement_percentage": improvement,
+            "recommended_allocations": self._allocations(
+                active_campaigns, current, budgets,
+                f"Optimized for {target_metric} with diminishing returns"),
         }
     
     def set_total_budget(self, new_total: float) -> bool:
@@ -414,5 +455,4 @@ class BudgetingSystem:
 # TODO: Add telemetry hooks to track budget allocation performance
 # This should track how well allocations improve overall performance
 
-# TODO: Implement budget alerts for overs
-(Content truncated due to size limit. Use line ranges to read in chunks)
\ No newline at end of file
+# TODO: Implement budget alerts for overspending
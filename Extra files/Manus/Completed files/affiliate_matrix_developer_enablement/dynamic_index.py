@@ -5,12 +5,20 @@ This module implements dynamic indexing and caching to ensure fast access
 to the master index of affiliate programs.
 """
 
-from typing import Dict, List, Optional, Any, Union, Callable
+from typing import Dict, Iterable, List, Mapping, Optional, Any, Union, Callable, Set, Tuple
+import asyncio
+import bisect
+import heapq
+import itertools
+import json
 import logging
+import sys
+import threading
 import time
-from datetime import datetime, timedelta
+from collections import OrderedDict
+from datetime import datetime
 from functools import wraps
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 logger = logging.getLogger(__name__)
 
@@ -18,39 +26,161 @@ class CacheConfig(BaseModel):
     """Configuration for cache behavior."""
     ttl_seconds: int = 3600  # Default TTL of 1 hour
     max_size: Optional[int] = None  # Maximum number of items in cache
+    max_bytes: Optional[int] = None  # Maximum estimated size of all cached values
     strategy: str = "lru"  # Cache eviction strategy: lru, lfu, fifo
     namespace: str = "default"  # Cache namespace for grouping related items
+    cleanup_interval_seconds: float = 60.0  # How often expired items are purged
 
 class CacheStats(BaseModel):
     """Statistics for cache performance monitoring."""
     hits: int = 0
     misses: int = 0
     evictions: int = 0
+    expirations: int = 0
     size: int = 0
+    bytes: int = 0
     hit_rate: float = 0.0
     avg_lookup_time_ms: float = 0.0
-    last_reset: datetime = datetime.utcnow()
+    last_reset: datetime = Field(default_factory=datetime.utcnow)
 
 class CacheItem:
     """Individual item stored in the cache."""
-    def __init__(self, key: str, value: Any, ttl_seconds: int = 3600):
+    __slots__ = ('key', 'value', 'namespace', 'size', 'created_at', 'expires_at',
+                 'last_accessed', 'access_count')
+
+    def __init__(self, key: str, value: Any, ttl_seconds: int = 3600,
+                 namespace: str = "default", size: int = 0):
         self.key = key
         self.value = value
-        self.created_at = datetime.utcnow()
-        self.expires_at = self.created_at + timedelta(seconds=ttl_seconds)
+        self.namespace = namespace
+        self.size = size
+        # Monotonic seconds: immune to wall-clock jumps and cheap to compare
+        self.created_at = time.monotonic()
+        self.expires_at = self.created_at + ttl_seconds
         self.last_accessed = self.created_at
         self.access_count = 0
         
     @property
     def is_expired(self) -> bool:
         """Check if the cache item has expired."""
-        return datetime.utcnow() > self.expires_at
+        return time.monotonic() > self.expires_at
     
     def access(self) -> None:
         """Record an access to this cache item."""
-        self.last_accessed = datetime.utcnow()
+        self.last_accessed = time.monotonic()
         self.access_count += 1
 
+
+def estimate_size(value: Any, _depth: int = 0) -> int:
+    """Approximate memory footprint of a value in bytes (containers two levels deep)."""
+    size = sys.getsizeof(value)
+    if _depth >= 2:
+        return size
+    if isinstance(value, dict):
+        size += sum(estimate_size(k, _depth + 1) + estimate_size(v, _depth + 1) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(v, _depth + 1) for v in value)
+    elif isinstance(value, BaseModel):
+        size += estimate_size(value.__dict__, _depth + 1)
+    return size
+
+
+class LRUPolicy:
+    """Evicts the least recently used key."""
+
+    def __init__(self):
+        self._order: "OrderedDict[str, None]" = OrderedDict()
+
+    def insert(self, key: str) -> None:
+        self._order[key] = None
+
+    def touch(self, key: str) -> None:
+        self._order.move_to_end(key)
+
+    def remove(self, key: str) -> None:
+        self._order.pop(key, None)
+
+    def victim(self) -> Optional[str]:
+        return next(iter(self._order), None)
+
+
+class FIFOPolicy(LRUPolicy):
+    """Evicts the oldest inserted key; reads don't change the order."""
+
+    def touch(self, key: str) -> None:
+        pass
+
+
+class LFUPolicy:
+    """Evicts the least frequently used key (oldest first among ties).
+
+    Keys sit in per-frequency buckets, and the non-empty buckets are linked
+    in frequency order behind a 0 sentinel, so the least frequent bucket is
+    always the head and every operation is O(1).
+    """
+
+    def __init__(self):
+        self._freq: Dict[str, int] = {}
+        self._buckets: Dict[int, "OrderedDict[str, None]"] = {}
+        self._next: Dict[int, Optional[int]] = {0: None}
+        self._prev: Dict[int, int] = {}
+
+    def _link(self, freq: int, after: int) -> None:
+        following = self._next[after]
+        self._next[after] = freq
+        self._next[freq] = following
+        self._prev[freq] = after
+        if following is not None:
+            self._prev[following] = freq
+        self._buckets[freq] = OrderedDict()
+
+    def _unlink(self, freq: int) -> None:
+        del self._buckets[freq]
+        previous = self._prev.pop(freq)
+        following = self._next.pop(freq)
+        self._next[previous] = following
+        if following is not None:
+            self._prev[following] = previous
+
+    def insert(self, key: str) -> None:
+        if 1 not in self._buckets:
+            self._link(1, 0)
+        self._freq[key] = 1
+        self._buckets[1][key] = None
+
+    def touch(self, key: str) -> None:
+        freq = self._freq[key]
+        if freq + 1 not in self._buckets:
+            self._link(freq + 1, freq)
+        self._freq[key] = freq + 1
+        self._buckets[freq + 1][key] = None
+        bucket = self._buckets[freq]
+        del bucket[key]
+        if not bucket:
+            self._unlink(freq)
+
+    def remove(self, key: str) -> None:
+        freq = self._freq.pop(key, None)
+        if freq is None:
+            return
+        bucket = self._buckets[freq]
+        del bucket[key]
+        if not bucket:
+            self._unlink(freq)
+
+    def victim(self) -> Optional[str]:
+        head = self._next[0]
+        return next(iter(self._buckets[head])) if head is not None else None
+
+
+EVICTION_POLICIES = {
+    "lru": LRUPolicy,
+    "lfu": LFUPolicy,
+    "fifo": FIFOPolicy,
+}
+
+_MISSING = object()
+
 class DynamicCache:
     """
     Service for caching frequently accessed data from the master index.
@@ -60,6 +190,10 @@ class DynamicCache:
     2. Automatic invalidation based on TTL or explicit triggers
     3. Cache statistics and performance monitoring
     4. Multiple eviction strategies for optimal memory usage
+    
+    get/set/delete are O(1) (amortized O(log n) for the expiry heap).
+    Expired items are dropped lazily on access and in a periodic purge
+    driven by cache traffic.
     """
     
     def __init__(self, config: Optional[CacheConfig] = None):
@@ -70,12 +204,29 @@ class DynamicCache:
             config: Optional cache configuration
         """
         self.config = config or CacheConfig()
+        if self.config.strategy not in EVICTION_POLICIES:
+            raise ValueError(f"Unknown cache strategy: {self.config.strategy}")
         self._cache: Dict[str, CacheItem] = {}
-        self.stats = CacheStats()
+        self._policy = EVICTION_POLICIES[self.config.strategy]()
+        self._namespaces: Dict[str, Set[str]] = {}
+        self._expiry: List[Tuple[float, str]] = []  # (expires_at, key) heap, may hold stale entries
+        self._next_cleanup = time.monotonic() + self.config.cleanup_interval_seconds
+        self._bytes = 0
+        self._lock = threading.RLock()
+        # Plain counters (pydantic attribute writes are slow); see get_stats
+        self._hits = self._misses = self._evictions = self._expirations = 0
+        self._lookup_time_total_ms = 0.0
+        self._last_reset = datetime.utcnow()
         
         logger.info(f"DynamicCache initialized with TTL: {self.config.ttl_seconds}s, "
                    f"strategy: {self.config.strategy}")
     
+    def __len__(self) -> int:
+        return len(self._cache)
+    
+    def __contains__(self, key: str) -> bool:
+        return self.lookup(key)[0]
+    
     def get(self, key: str) -> Optional[Any]:
         """
         Retrieve an item from the cache.
@@ -86,36 +237,41 @@ class DynamicCache:
         Returns:
             Cached value if found and not expired, None otherwise
         """
-        start_time = time.time()
-        
-        # TODO: Implement actual cache retrieval logic
-        # 1. Check if key exists in cache
-        # 2. If it exists, check if it's expired
-        # 3. If not expired, update access stats and return value
-        # 4. If expired or not found, return None
-        
-        # Example implementation:
-        # item = self._cache.get(key)
-        # if item is None:
-        #     self.stats.misses += 1
-        #     return None
-        # 
-        # if item.is_expired:
-        #     del self._cache[key]
-        #     self.stats.evictions += 1
-        #     self.stats.misses += 1
-        #     return None
-        # 
-        # item.access()
-        # self.stats.hits += 1
-        # lookup_time_ms = (time.time() - start_time) * 1000
-        # self._update_stats(lookup_time_ms)
-        # return item.value
+        found, value = self.lookup(key)
+        return value if found else None
+    
+    def lookup(self, key: str) -> Tuple[bool, Any]:
+        """
+        Retrieve an item, distinguishing a cached None from a miss.
         
+        Args:
+            key: Cache key to retrieve
+            
+        Returns:
+            (found, value) tuple
+        """
+        start_time = time.perf_counter()
+        with self._lock:
+            self._maybe_cleanup()
+            item = self._cache.get(key)
+            if item is not None and item.is_expired:
+                self._remove(key)
+                self._expirations += 1
+                item = None
+            if item is None:
+                self._misses += 1
+                found, value = False, None
+            else:
+                item.access()
+                self._policy.touch(key)
+                self._hits += 1
+                found, value = True, item.value
+            self._update_stats((time.perf_counter() - start_time) * 1000)
         logger.debug(f"Cache get: {key}")
-        return None
+        return found, value
     
-    def set(self, key: str, value: Any, ttl_seconds: Optional[int] = None) -> None:
+    def set(self, key: str, value: Any, ttl_seconds: Optional[int] = None,
+            namespace: Optional[str] = None) -> None:
         """
         Store an item in the cache.
         
@@ -123,23 +279,29 @@ class DynamicCache:
             key: Cache key to store
             value: Value to cache
             ttl_seconds: Optional TTL override for this specific item
+            namespace: Optional namespace override for this specific item
         """
-        # TODO: Implement actual cache storage logic
-        # 1. Create a new CacheItem
-        # 2. Check if cache is at max size
-        # 3. If at max size, evict items based on strategy
-        # 4. Store the new item
-        
-        # Example implementation:
-        # ttl = ttl_seconds if ttl_seconds is not None else self.config.ttl_seconds
-        # item = CacheItem(key, value, ttl)
-        # 
-        # if self.config.max_size and len(self._cache) >= self.config.max_size:
-        #     self._evict_items()
-        # 
-        # self._cache[key] = item
-        # self.stats.size = len(self._cache)
-        
+        ttl = ttl_seconds if ttl_seconds is not None else self.config.ttl_seconds
+        size = estimate_size(value) if self.config.max_bytes else 0
+        item = CacheItem(key, value, ttl, namespace or self.config.namespace, size)
+        with self._lock:
+            self._maybe_cleanup()
+            if key in self._cache:
+                self._remove(key)
+            if self.config.max_bytes and size > self.config.max_bytes:
+                logger.debug(f"Not caching {key}: {size} bytes exceeds max_bytes")
+                return
+            
+            over_size = self.config.max_size and len(self._cache) >= self.config.max_size
+            over_bytes = self.config.max_bytes and self._bytes + size > self.config.max_bytes
+            if over_size or over_bytes:
+                self._evict_items(incoming_bytes=size)
+            
+            self._cache[key] = item
+            self._policy.insert(key)
+            self._namespaces.setdefault(item.namespace, set()).add(key)
+            heapq.heappush(self._expiry, (item.expires_at, key))
+            self._bytes += size
         logger.debug(f"Cache set: {key}")
     
     def delete(self, key: str) -> bool:
@@ -152,16 +314,9 @@ class DynamicCache:
         Returns:
             True if item was found and deleted, False otherwise
         """
-        # TODO: Implement cache deletion logic
-        # Example implementation:
-        # if key in self._cache:
-        #     del self._cache[key]
-        #     self.stats.size = len(self._cache)
-        #     return True
-        # return False
-        
         logger.debug(f"Cache delete: {key}")
-        return False
+        with self._lock:
+            return self._remove(key) is not None
     
     def clear(self, namespace: Optional[str] = None) -> int:
         """
@@ -173,29 +328,87 @@ class DynamicCache:
         Returns:
             Number of items cleared
         """
-        # TODO: Implement cache clearing logic
-        # If namespace is provided, only clear items in that namespace
-        
         logger.info(f"Cache clear: {namespace or 'all'}")
-        return 0
+        with self._lock:
+            if namespace is None:
+                cleared = len(self._cache)
+                self._cache.clear()
+                self._policy = EVICTION_POLICIES[self.config.strategy]()
+                self._namespaces.clear()
+                self._expiry.clear()
+                self._bytes = 0
+            else:
+                keys = list(self._namespaces.get(namespace, ()))
+                for key in keys:
+                    self._remove(key)
+                cleared = len(keys)
+            return cleared
     
-    def _evict_items(self, count: int = 1) -> int:
+    def purge_expired(self) -> int:
+        """
+        Drop every expired item now.
+        
+        Returns:
+            Number of items removed
+        """
+        with self._lock:
+            now = time.monotonic()
+            removed = 0
+            while self._expiry and self._expiry[0][0] < now:
+                expires_at, key = heapq.heappop(self._expiry)
+                item = self._cache.get(key)
+                # Heap entries outlive overwritten or deleted items; skip those
+                if item is not None and item.expires_at == expires_at:
+                    self._remove(key)
+                    removed += 1
+            # Keep stale heap entries from piling up under heavy overwrites
+            if len(self._expiry) > 2 * len(self._cache) + 64:
+                self._expiry = [(item.expires_at, key) for key, item in self._cache.items()]
+                heapq.heapify(self._expiry)
+            self._expirations += removed
+            self._next_cleanup = now + self.config.cleanup_interval_seconds
+            return removed
+    
+    def _maybe_cleanup(self) -> None:
+        if time.monotonic() >= self._next_cleanup:
+            self.purge_expired()
+    
+    def _remove(self, key: str) -> Optional[CacheItem]:
+        item = self._cache.pop(key, None)
+        if item is None:
+            return None
+        self._policy.remove(key)
+        keys = self._namespaces.get(item.namespace)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._namespaces[item.namespace]
+        self._bytes -= item.size
+        return item
+    
+    def _evict_items(self, count: int = 1, incoming_bytes: int = 0) -> int:
         """
         Evict items from the cache based on the configured strategy.
         
         Args:
-            count: Number of items to evict
+            count: Minimum number of items to evict
+            incoming_bytes: Size of the item about to be stored
             
         Returns:
             Number of items actually evicted
         """
-        # TODO: Implement eviction strategies
-        # - LRU: Evict least recently used items
-        # - LFU: Evict least frequently used items
-        # - FIFO: Evict oldest items first
-        
         logger.debug(f"Evicting {count} items using {self.config.strategy} strategy")
-        return 0
+        evicted = 0
+        max_bytes = self.config.max_bytes
+        while self._cache and (evicted < count or
+                               (max_bytes and self._bytes + incoming_bytes > max_bytes)):
+            key = self._policy.victim()
+            if key is None:
+                break
+            self._remove(key)
+            evicted += 1
+        self._evictions += evicted
+        return evicted
     
     def _update_stats(self, lookup_time_ms: float) -> None:
         """
@@ -204,9 +417,7 @@ class DynamicCache:
         Args:
             lookup_time_ms: Time taken for the lookup in milliseconds
         """
-        # TODO: Implement statistics updating
-        # This should update hit rate, average lookup time, etc.
-        pass
+        self._lookup_time_total_ms += lookup_time_ms
     
     def get_stats(self) -> CacheStats:
         """
@@ -215,21 +426,223 @@ class DynamicCache:
         Returns:
             CacheStats object with current statistics
         """
-        # TODO: Calculate current statistics
-        # Example implementation:
-        # total_lookups = self.stats.hits + self.stats.misses
-        # if total_lookups > 0:
-        #     self.stats.hit_rate = self.stats.hits / total_lookups
-        # self.stats.size = len(self._cache)
-        
-        return self.stats
+        with self._lock:
+            total_lookups = self._hits + self._misses
+            return CacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                expirations=self._expirations,
+                size=len(self._cache),
+                bytes=self._bytes,
+                hit_rate=self._hits / total_lookups if total_lookups else 0.0,
+                avg_lookup_time_ms=self._lookup_time_total_ms / total_lookups if total_lookups else 0.0,
+                last_reset=self._last_reset,
+            )
+    
+    @property
+    def stats(self) -> CacheStats:
+        return self.get_stats()
     
     def reset_stats(self) -> None:
         """Reset cache statistics."""
-        self.stats = CacheStats(last_reset=datetime.utcnow())
+        with self._lock:
+            self._hits = self._misses = self._evictions = self._expirations = 0
+            self._lookup_time_total_ms = 0.0
+            self._last_reset = datetime.utcnow()
         logger.info("Cache statistics reset")
 
 
+def _attr(record: Any, name: str) -> Any:
+    if isinstance(record, Mapping):
+        return record.get(name)
+    return getattr(record, name, None)
+
+def _commission(record: Any) -> Optional[float]:
+    value = _attr(record, "commission_value")
+    if value is None:
+        commission = _attr(record, "commission")
+        value = commission.get("value") if isinstance(commission, Mapping) else commission
+    if isinstance(value, Mapping):
+        return max(value.values()) if value else None
+    return value
+
+def _fold(value: Any) -> Any:
+    """Hash index key of a value: strings match case-insensitively, like the search facets"""
+    return value.lower() if isinstance(value, str) else value
+
+def _epc(record: Any) -> Optional[float]:
+    epc = _attr(record, "epc")
+    if epc is None:
+        epc = (_attr(record, "metrics") or {}).get("epc")
+    return epc
+
+def program_matches(program: Any, status: Optional[str] = None,
+                    category: Optional[str] = None, tag: Optional[str] = None,
+                    source: Optional[str] = None, search: Optional[str] = None,
+                    min_commission: Optional[float] = None, max_commission: Optional[float] = None,
+                    min_epc: Optional[float] = None, min_conversion_rate: Optional[float] = None) -> bool:
+    """Whether a program passes the ProgramService list filters (text matches ignore case)"""
+    def contains(values, wanted):
+        return _fold(wanted) in [_fold(v) for v in values or []]
+    
+    if status and _fold(_attr(program, "status") or "") != _fold(status):
+        return False
+    if category and not contains(_attr(program, "category"), category):
+        return False
+    if tag and not contains(_attr(program, "tags"), tag):
+        return False
+    if source and _fold(_attr(program, "source") or "") != _fold(source):
+        return False
+    if search and not any(_fold(search) in _fold(_attr(program, f) or "")
+                          for f in ("name", "description", "url")):
+        return False
+    for value, low, high in ((_commission(program), min_commission, max_commission),
+                             (_epc(program), min_epc, None),
+                             (_attr(program, "conversionRate"), min_conversion_rate, None)):
+        if low is None and high is None:
+            continue
+        if value is None or (low is not None and value < low) or (high is not None and value > high):
+            return False
+    return True
+
+# field -> (index type, extractor); extractors accept both MasterIndex
+# AffiliateProgram models and the program dicts served by ProgramService
+INDEXABLE_FIELDS: Dict[str, Tuple[str, Callable[[Any], Any]]] = {
+    "category": ("hash", lambda r: _attr(r, "category")),
+    "network": ("hash", lambda r: _attr(r, "network")),
+    "status": ("hash", lambda r: _attr(r, "status")),
+    "commission": ("sorted", _commission),
+    "epc": ("sorted", _epc),
+}
+
+# query parameter -> (field, operator)
+FILTER_PARAMS = {
+    "category": ("category", "in"),
+    "categories": ("category", "in"),
+    "network": ("network", "in"),
+    "networks": ("network", "in"),
+    "status": ("status", "in"),
+    "min_commission": ("commission", "ge"),
+    "max_commission": ("commission", "le"),
+    "min_epc": ("epc", "ge"),
+    "max_epc": ("epc", "le"),
+}
+SORT_PARAMS = ("sort_by", "sort")
+# Parameters that pick a page or order rather than the result set
+PAGING_PARAMS = {"limit", "offset", "page", "order"}
+
+CACHE_NAMESPACE = "dynamic_index"
+
+
+class HashIndex:
+    """Equality index: value -> ids (list-valued fields index every element)"""
+    index_type = "hash"
+
+    def __init__(self, field: str, extract: Callable[[Any], Any]):
+        self.field = field
+        self.extract = extract
+        self.postings: Dict[Any, Set[str]] = {}
+        self.hits = 0
+        self.latency_saved_ms = 0.0
+
+    def _values(self, record: Any) -> tuple:
+        value = self.extract(record)
+        if value is None:
+            return ()
+        values = value if isinstance(value, (list, tuple, set, frozenset)) else (value,)
+        return tuple(_fold(v) for v in values)
+
+    def add(self, record_id: str, record: Any) -> None:
+        for value in self._values(record):
+            self.postings.setdefault(value, set()).add(record_id)
+
+    def remove(self, record_id: str, record: Any) -> None:
+        for value in self._values(record):
+            ids = self.postings.get(value)
+            if ids is not None:
+                ids.discard(record_id)
+                if not ids:
+                    del self.postings[value]
+
+    def estimate(self, values: List[Any]) -> int:
+        return sum(len(self.postings.get(_fold(v), ())) for v in values)
+
+    def lookup(self, values: List[Any]) -> Set[str]:
+        ids: Set[str] = set()
+        for value in values:
+            ids |= self.postings.get(_fold(value), set())
+        return ids
+
+    def __len__(self) -> int:
+        return len(self.postings)
+
+
+class SortedIndex:
+    """Range/order index: ids kept sorted by a numeric value.
+
+    Records without a value are left out of the ordering and tracked in
+    `missing` so sorted scans can still append them last.
+    """
+    index_type = "sorted"
+
+    def __init__(self, field: str, extract: Callable[[Any], Any]):
+        self.field = field
+        self.extract = extract
+        self.keys: List[float] = []
+        self.ids: List[str] = []
+        self.missing: Set[str] = set()
+        self.hits = 0
+        self.latency_saved_ms = 0.0
+
+    def _value(self, record: Any) -> Optional[float]:
+        try:
+            value = self.extract(record)
+            return float(value) if value is not None else None
+        except (TypeError, ValueError):
+            return None
+
+    def add(self, record_id: str, record: Any) -> None:
+        value = self._value(record)
+        if value is None:
+            self.missing.add(record_id)
+            return
+        i = bisect.bisect_right(self.keys, value)
+        self.keys.insert(i, value)
+        self.ids.insert(i, record_id)
+
+    def remove(self, record_id: str, record: Any) -> None:
+        value = self._value(record)
+        if value is None:
+            self.missing.discard(record_id)
+            return
+        lo, hi = bisect.bisect_left(self.keys, value), bisect.bisect_right(self.keys, value)
+        i = self.ids.index(record_id, lo, hi)
+        del self.keys[i]
+        del self.ids[i]
+
+    def span(self, low: Optional[float], high: Optional[float]) -> Tuple[int, int]:
+        """[start, stop) positions of the ids with low <= value <= high"""
+        start = bisect.bisect_left(self.keys, low) if low is not None else 0
+        stop = bisect.bisect_right(self.keys, high) if high is not None else len(self.keys)
+        return start, max(start, stop)
+
+    def estimate(self, low: Optional[float], high: Optional[float]) -> int:
+        start, stop = self.span(low, high)
+        return stop - start
+
+    def lookup(self, low: Optional[float], high: Optional[float]) -> Set[str]:
+        start, stop = self.span(low, high)
+        return set(self.ids[start:stop])
+
+    def ordered(self, descending: bool = False) -> Iterable[str]:
+        ids = reversed(self.ids) if descending else self.ids
+        return itertools.chain(ids, sorted(self.missing))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
 class DynamicIndex:
     """
     Service for optimizing access to the master index through dynamic indexing.
@@ -239,53 +652,282 @@ class DynamicIndex:
     2. Query optimization based on access patterns
     3. Index performance monitoring
     4. Integration with the caching layer
+    
+    Callers report each query's filters and sort through `record_query`.
+    Pattern scores decay with `half_life_seconds`; every `analyze_every`
+    recorded queries the hottest indexable fields get an index (hash for
+    category/network/status, sorted for commission/EPC) and fields whose
+    score fell below `drop_threshold` lose theirs. `query` answers a
+    query from those indexes over the records given to `load`/`add`;
+    `execute` hands a caller's own search the candidates they select.
+    Writes mark cached results stale and the next read clears them once,
+    so a batch of adds costs one invalidation.
     """
     
-    def __init__(self, cache: Optional[DynamicCache] = None):
+    def __init__(self, cache: Optional[DynamicCache] = None,
+                 build_threshold: float = 5.0,
+                 drop_threshold: float = 1.0,
+                 half_life_seconds: float = 3600.0,
+                 analyze_every: int = 50,
+                 max_tracked_queries: int = 1000):
         """
         Initialize the DynamicIndex service.
         
         Args:
             cache: Optional cache service to use
+            build_threshold: Decayed query count at which a field gets an index
+            drop_threshold: Decayed query count below which an index is dropped
+            half_life_seconds: Half-life of the query pattern scores
+            analyze_every: Recorded queries between automatic index tuning runs
+            max_tracked_queries: Distinct queries remembered for cache warming
         """
-        self.cache = cache or DynamicCache()
+        self.cache = cache if cache is not None else DynamicCache()
+        self.build_threshold = build_threshold
+        self.drop_threshold = drop_threshold
+        self.half_life_seconds = half_life_seconds
+        self.analyze_every = analyze_every
+        self.max_tracked_queries = max_tracked_queries
         
-        # TODO: Initialize index structures
-        # These could be in-memory structures, database indexes, or search engine indexes
+        self._records: Dict[str, Any] = {}
+        self._order: Dict[str, int] = {}  # record id -> insertion sequence
+        self._sequence = itertools.count()
+        self._indexes: Dict[str, Union[HashIndex, SortedIndex]] = {}
+        # (filter fields, sort field) -> [decayed score, last update]
+        self._patterns: Dict[Tuple[Tuple[str, ...], Optional[str]], List[float]] = {}
+        # canonical query -> [params, decayed score, last update]
+        self._queries: Dict[str, list] = {}
+        self._since_analysis = 0
+        # Per-pattern full-scan latency, the baseline for "latency saved"
+        self._scan_ms: Dict[Tuple[Tuple[str, ...], Optional[str]], float] = {}
+        self._scan_ms_per_record: Optional[float] = None
+        self._stale = False  # cached results predate a write
+        self._lock = threading.RLock()
         
         logger.info("DynamicIndex service initialized")
     
-    def optimize_query(self, query_params: Dict[str, Any]) -> Dict[str, Any]:
+    def __len__(self) -> int:
+        return len(self._records)
+    
+    # ------------ Records ------------ #
+    def load(self, records: Mapping[str, Any]) -> None:
+        """Replace the indexed records (id -> program) and rebuild every index"""
+        with self._lock:
+            self._records = dict(records)
+            self._order = {record_id: next(self._sequence) for record_id in self._records}
+            for field in list(self._indexes):
+                self._indexes[field] = self._build(field, self._indexes[field].index_type)
+            self._stale = True
+    
+    def add(self, record_id: str, record: Any) -> None:
+        """Add or replace one record, keeping the indexes in step"""
+        with self._lock:
+            self._discard(record_id)
+            self._records[record_id] = record
+            self._order[record_id] = next(self._sequence)
+            for index in self._indexes.values():
+                index.add(record_id, record)
+            self._stale = True
+    
+    def remove(self, record_id: str) -> bool:
+        """Remove one record; returns False if it was not indexed"""
+        with self._lock:
+            removed = self._discard(record_id)
+            if removed:
+                self._stale = True
+            return removed
+    
+    def records(self, ids: Optional[Iterable[str]] = None) -> List[Any]:
+        """The records with `ids` (all of them by default), in insertion order"""
+        with self._lock:
+            if ids is None:
+                return list(self._records.values())
+            return [self._records[i] for i in sorted(ids, key=self._order.__getitem__)]
+    
+    def _refresh(self) -> None:
+        """Drop cached results once after any number of writes"""
+        with self._lock:
+            if self._stale:
+                self.cache.clear(CACHE_NAMESPACE)
+                self._stale = False
+    
+    def _discard(self, record_id: str) -> bool:
+        record = self._records.pop(record_id, None)
+        if record is None:
+            return False
+        del self._order[record_id]
+        for index in self._indexes.values():
+            index.remove(record_id, record)
+        return True
+    
+    # ------------ Query patterns ------------ #
+    @staticmethod
+    def _active(query_params: Dict[str, Any]) -> Dict[str, Any]:
+        return {k: v for k, v in query_params.items() if v is not None and v != [] and v != ""}
+    
+    def _pattern(self, params: Dict[str, Any]) -> Tuple[Tuple[str, ...], Optional[str]]:
+        fields = set()
+        sort = None
+        for name, value in params.items():
+            if name in SORT_PARAMS:
+                sort = value if value != "relevance" else None
+            elif name not in PAGING_PARAMS:
+                fields.add(FILTER_PARAMS[name][0] if name in FILTER_PARAMS else name)
+        return tuple(sorted(fields)), sort
+    
+    @staticmethod
+    def cache_key(query_params: Dict[str, Any]) -> str:
+        """Cache key of a query (ignores unset parameters)"""
+        params = DynamicIndex._active(query_params)
+        return f"{CACHE_NAMESPACE}:{json.dumps(params, sort_keys=True, default=str)}"
+    
+    def _decay(self, score: float, since: float, now: float) -> float:
+        return score * 0.5 ** ((now - since) / self.half_life_seconds)
+    
+    def record_query(self, query_params: Dict[str, Any]) -> None:
         """
-        Optimize a query based on available indexes.
+        Record the filters and sort of a query that was served.
         
         Args:
-            query_params: Original query parameters
+            query_params: The query's parameters, as passed to
+                search_programs or get_programs_list
+        """
+        params = self._active(query_params)
+        now = time.monotonic()
+        key = self.cache_key(params)
+        with self._lock:
+            entry = self._patterns.setdefault(self._pattern(params), [0.0, now])
+            entry[0] = self._decay(entry[0], entry[1], now) + 1.0
+            entry[1] = now
             
-        Returns:
-            Optimized query parameters
+            query = self._queries.get(key)
+            if query is None:
+                query = self._queries[key] = [params, 0.0, now]
+                if len(self._queries) > 2 * self.max_tracked_queries:
+                    self._trim_queries(now)
+            query[1] = self._decay(query[1], query[2], now) + 1.0
+            query[2] = now
+            
+            self._since_analysis += 1
+            if self._since_analysis >= self.analyze_every:
+                self.analyze_query_patterns()
+    
+    def _trim_queries(self, now: float) -> None:
+        ranked = sorted(self._queries.items(), key=lambda kv: self._decay(kv[1][1], kv[1][2], now))
+        for key, _ in ranked[:len(ranked) - self.max_tracked_queries]:
+            del self._queries[key]
+    
+    def top_queries(self, k: int = 20) -> List[Dict[str, Any]]:
+        """The `k` most frequently recorded queries (recent ones weigh more)"""
+        now = time.monotonic()
+        with self._lock:
+            ranked = heapq.nlargest(k, self._queries.values(),
+                                    key=lambda q: self._decay(q[1], q[2], now))
+        return [dict(params) for params, _, _ in ranked]
+    
+    def export_patterns(self) -> Dict[str, Any]:
+        """JSON-ready query history, to be restored with `import_patterns` after a restart"""
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "patterns": [[list(fields), sort, self._decay(score, t, now)]
+                             for (fields, sort), (score, t) in self._patterns.items()],
+                "queries": [[params, self._decay(score, t, now)]
+                            for params, score, t in self._queries.values()],
+            }
+    
+    def import_patterns(self, state: Dict[str, Any]) -> None:
+        """Merge a query history saved by `export_patterns` and retune the indexes"""
+        now = time.monotonic()
+        with self._lock:
+            for fields, sort, score in state.get("patterns", []):
+                entry = self._patterns.setdefault((tuple(fields), sort), [0.0, now])
+                entry[0] = self._decay(entry[0], entry[1], now) + score
+                entry[1] = now
+            for params, score in state.get("queries", []):
+                query = self._queries.setdefault(self.cache_key(params), [params, 0.0, now])
+                query[1] = self._decay(query[1], query[2], now) + score
+                query[2] = now
+            self.analyze_query_patterns()
+    
+    def analyze_query_patterns(self, apply: bool = True) -> Dict[str, Any]:
         """
-        # TODO: Implement query optimization logic
-        # This should analyze the query and determine the best indexes to use
+        Analyze recent query patterns to suggest index improvements.
         
-        logger.debug(f"Optimizing query: {query_params}")
-        return query_params
+        Args:
+            apply: Build the suggested indexes and drop the unused ones
+        
+        Returns:
+            Dictionary with analysis results and suggestions
+        """
+        logger.info("Analyzing query patterns")
+        now = time.monotonic()
+        with self._lock:
+            self._since_analysis = 0
+            heat: Dict[str, float] = {}
+            for (fields, sort), (score, t) in list(self._patterns.items()):
+                score = self._decay(score, t, now)
+                if score < 0.01:
+                    del self._patterns[(fields, sort)]
+                    continue
+                for field in set(fields) | ({sort} if sort else set()):
+                    heat[field] = heat.get(field, 0.0) + score
+            
+            suggested = [field for field, score in heat.items()
+                         if field in INDEXABLE_FIELDS and field not in self._indexes
+                         and score >= self.build_threshold]
+            unused = [field for field in self._indexes if heat.get(field, 0.0) < self.drop_threshold]
+            if apply:
+                for field in unused:
+                    self.drop_index(field)
+                for field in suggested:
+                    self.create_index(field)
+            
+            return {
+                "common_fields": [{"field": field, "score": round(score, 3)}
+                                  for field, score in sorted(heat.items(), key=lambda kv: -kv[1])],
+                "suggested_indexes": [{"field": field, "index_type": INDEXABLE_FIELDS[field][0]}
+                                      for field in suggested],
+                "unused_indexes": unused,
+            }
+    
+    # ------------ Indexes ------------ #
+    def _build(self, field: str, index_type: str) -> Union[HashIndex, SortedIndex]:
+        extract = INDEXABLE_FIELDS[field][1]
+        index = HashIndex(field, extract) if index_type == "hash" else SortedIndex(field, extract)
+        start = time.perf_counter()
+        for record_id, record in self._records.items():
+            index.add(record_id, record)
+        if self._records and self._scan_ms_per_record is None:
+            # Reading one field of every record approximates a full scan's cost
+            elapsed = (time.perf_counter() - start) * 1000
+            self._scan_ms_per_record = elapsed / len(self._records)
+        return index
     
-    def create_index(self, field: str, index_type: str = "btree") -> bool:
+    def create_index(self, field: str, index_type: Optional[str] = None) -> bool:
         """
         Create a new index on a specific field.
         
         Args:
             field: Field to index
-            index_type: Type of index to create
+            index_type: "hash" or "sorted" ("btree" is accepted for sorted);
+                defaults to the field's natural index type
             
         Returns:
             True if successful, False otherwise
         """
-        # TODO: Implement index creation logic
-        # This will depend on the underlying storage system
+        if field not in INDEXABLE_FIELDS:
+            logger.error(f"Cannot index unknown field: {field}")
+            return False
+        natural = INDEXABLE_FIELDS[field][0]
+        index_type = "sorted" if index_type == "btree" else (index_type or natural)
+        if index_type != natural:
+            logger.error(f"Field {field} supports a {natural} index, not {index_type}")
+            return False
         
         logger.info(f"Creating {index_type} index on {field}")
+        with self._lock:
+            if field not in self._indexes:
+                self._indexes[field] = self._build(field, index_type)
         return True
     
     def drop_index(self, field: str) -> bool:
@@ -298,79 +940,370 @@ class DynamicIndex:
         Returns:
             True if successful, False otherwise
         """
-        # TODO: Implement index dropping logic
-        
         logger.info(f"Dropping index on {field}")
-        return True
+        with self._lock:
+            return self._indexes.pop(field, None) is not None
     
     def list_indexes(self) -> List[Dict[str, Any]]:
         """
         List all current indexes.
         
         Returns:
-            List of index information dictionaries
+            List of index information dictionaries, with hit counts and
+            the estimated query latency they saved
         """
-        # TODO: Implement index listing logic
-        
-        logger.info("Listing all indexes")
-        return []
+        with self._lock:
+            return [{
+                "field": field,
+                "index_type": index.index_type,
+                "entries": len(index),
+                "hits": index.hits,
+                "latency_saved_ms": round(index.latency_saved_ms, 3),
+            } for field, index in self._indexes.items()]
     
-    def analyze_query_patterns(self) -> Dict[str, Any]:
+    # ------------ Query execution ------------ #
+    def optimize_query(self, query_params: Dict[str, Any]) -> Dict[str, Any]:
         """
-        Analyze recent query patterns to suggest index improvements.
+        Optimize a query based on available indexes.
         
+        Args:
+            query_params: Original query parameters
+            
         Returns:
-            Dictionary with analysis results and suggestions
+            Query plan: the normalized predicates, the index that produces
+            the candidates (the most selective one), the index that
+            provides the order, and the predicates checked per candidate
         """
-        # TODO: Implement query pattern analysis
-        # This should examine query logs and suggest new indexes or index changes
+        logger.debug(f"Optimizing query: {query_params}")
+        params = self._active(query_params)
+        unsupported = [name for name in params
+                       if name not in FILTER_PARAMS and name not in SORT_PARAMS and name not in PAGING_PARAMS]
+        if unsupported:
+            raise ValueError(f"Unsupported query parameters: {', '.join(sorted(unsupported))}")
+        
+        # field -> ("in", values) or ("range", low, high)
+        predicates: Dict[str, tuple] = {}
+        for name, value in params.items():
+            if name not in FILTER_PARAMS:
+                continue
+            field, op = FILTER_PARAMS[name]
+            if op == "in":
+                predicates[field] = ("in", list(value) if isinstance(value, (list, tuple, set)) else [value])
+            else:
+                _, low, high = predicates.get(field, ("range", None, None))
+                predicates[field] = ("range", value, high) if op == "ge" else ("range", low, value)
+        
+        sort = next((params[p] for p in SORT_PARAMS if p in params and params[p] != "relevance"), None)
+        descending = params.get("order", "desc" if sort in ("commission", "epc") else "asc") == "desc"
+        
+        with self._lock:
+            driving, best = None, len(self._records) + 1
+            for field, predicate in predicates.items():
+                index = self._indexes.get(field)
+                if index is not None:
+                    size = index.estimate(*predicate[1:]) if predicate[0] == "range" else index.estimate(predicate[1])
+                    if size < best:
+                        driving, best = field, size
+            # Walking the sort index beats sorting only when few rows get filtered out
+            sort_index = sort if isinstance(self._indexes.get(sort), SortedIndex) else None
+            if sort_index and driving and best * 4 < len(self._records):
+                sort_index = None
         
-        logger.info("Analyzing query patterns")
         return {
-            "common_fields": [],
-            "suggested_indexes": [],
-            "unused_indexes": []
+            "params": params,
+            "pattern": self._pattern(params),
+            "predicates": predicates,
+            "driving_index": driving,
+            "sort": sort,
+            "descending": descending,
+            "sort_index": sort_index,
+            "residual": [field for field in predicates if field != driving],
         }
     
-    def warm_cache(self, query_patterns: List[Dict[str, Any]]) -> int:
+    @staticmethod
+    def _matches(record: Any, field: str, predicate: tuple) -> bool:
+        value = INDEXABLE_FIELDS[field][1](record)
+        if predicate[0] == "in":
+            values = value if isinstance(value, (list, tuple, set, frozenset)) else (value,)
+            wanted = {_fold(v) for v in predicate[1]}
+            return any(_fold(v) in wanted for v in values)
+        _, low, high = predicate
+        if value is None:
+            return False
+        return (low is None or value >= low) and (high is None or value <= high)
+    
+    def _lookup(self, plan: Dict[str, Any]) -> Optional[Set[str]]:
+        """Ids from the plan's driving index; None when it has none"""
+        driving = plan["driving_index"]
+        if not driving:
+            return None
+        index = self._indexes[driving]
+        predicate = plan["predicates"][driving]
+        return index.lookup(*predicate[1:]) if predicate[0] == "range" else index.lookup(predicate[1])
+    
+    def _execute(self, plan: Dict[str, Any], limit: Optional[int], offset: int) -> List[Any]:
+        records = self._records
+        predicates = plan["predicates"]
+        residual = [(field, predicates[field]) for field in plan["residual"]]
+        candidates = self._lookup(plan)
+        
+        def keep(record_id: str) -> bool:
+            record = records[record_id]
+            return all(self._matches(record, field, predicate) for field, predicate in residual)
+        
+        stop = offset + limit if limit is not None else None
+        if plan["sort_index"]:
+            # Index order is result order: stop as soon as the page is full
+            ids = self._indexes[plan["sort_index"]].ordered(plan["descending"])
+            if candidates is not None:
+                ids = (i for i in ids if i in candidates)
+            return [records[i] for i in itertools.islice(filter(keep, ids), offset, stop)]
+        
+        ids = candidates if candidates is not None else records.keys()
+        matches = [i for i in ids if keep(i)]
+        if plan["sort"]:
+            extract = INDEXABLE_FIELDS[plan["sort"]][1] if plan["sort"] in INDEXABLE_FIELDS \
+                else (lambda r, name=plan["sort"]: _attr(r, name))
+            present = [i for i in matches if extract(records[i]) is not None]
+            # Ties in insertion order (reversed when descending), like a sorted index walk
+            present.sort(key=lambda i: (extract(records[i]), self._order[i]), reverse=plan["descending"])
+            matches = present + sorted(set(matches) - set(present))
+        elif candidates is not None:
+            # Keep insertion order, as a full scan would
+            matches.sort(key=self._order.__getitem__)
+        return [records[i] for i in matches[offset:stop]]
+    
+    def query(self, query_params: Dict[str, Any]) -> List[Any]:
+        """
+        Answer a filtered/sorted query over the loaded records.
+        
+        Results are cached, the query is recorded, and time saved against
+        a full scan is credited to the indexes that were used.
+        
+        Args:
+            query_params: Filter, sort (sort_by/sort, order) and paging
+                (limit, offset or page) parameters
+            
+        Returns:
+            Matching records, in result order
+            
+        Raises:
+            ValueError: If the query uses parameters that cannot be answered here
+        """
+        plan = self.optimize_query(query_params)
+        self.record_query(query_params)
+        key = self.cache_key(plan["params"])
+        self._refresh()
+        found, value = self.cache.lookup(key)
+        if found:
+            return value
+        
+        params = plan["params"]
+        limit = params.get("limit")
+        offset = params.get("offset") or ((params.get("page", 1) - 1) * limit if limit else 0)
+        start = time.perf_counter()
+        with self._lock:
+            results = self._execute(plan, limit, offset)
+            self._credit(plan, {plan["driving_index"], plan["sort_index"]},
+                         (time.perf_counter() - start) * 1000)
+        self.cache.set(key, results, namespace=CACHE_NAMESPACE)
+        return results
+    
+    def execute(self, query_params: Dict[str, Any],
+                run: Callable[[Optional[Set[str]]], Any]) -> Any:
+        """
+        Answer a query with the caller's own search, narrowed by the indexes.
+        
+        The filters of `query_params` listed in FILTER_PARAMS are planned
+        with `optimize_query`. `run` gets the ids of the records passing
+        all of them, read from the indexes, or None when no index applies
+        and it has to scan; it applies every other parameter itself.
+        Results are cached and time saved is credited as in `query`.
+        
+        Args:
+            query_params: The query's parameters, as passed to the caller
+            run: Function producing the results from the candidate ids
+            
+        Returns:
+            Whatever `run` returns
+        """
+        params = self._active(query_params)
+        key = self.cache_key(params)
+        self._refresh()
+        found, value = self.cache.lookup(key)
+        if found:
+            return value
+        
+        plan = self.optimize_query({k: v for k, v in params.items() if k in FILTER_PARAMS})
+        plan["pattern"] = self._pattern(params)
+        start = time.perf_counter()
+        with self._lock:
+            candidates = self._lookup(plan)
+            if candidates is not None and plan["residual"]:
+                predicates = plan["predicates"]
+                candidates = {i for i in candidates
+                              if all(self._matches(self._records[i], field, predicates[field])
+                                     for field in plan["residual"])}
+        results = run(candidates)
+        with self._lock:
+            self._credit(plan, {plan["driving_index"]} if candidates is not None else set(),
+                         (time.perf_counter() - start) * 1000)
+        self.cache.set(key, results, namespace=CACHE_NAMESPACE)
+        return results
+    
+    def list_programs(self, query_params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        One page of a ProgramService listing over the loaded programs.
+        
+        Runs through `execute`, so the status/category/commission/EPC
+        filters are narrowed by any built index and pages are cached;
+        every filter of `program_matches` is then checked on the candidates.
+        
+        Args:
+            query_params: page, limit, sort, order and the `program_matches` filters
+            
+        Returns:
+            Dictionary containing programs and pagination information
+        """
+        params = self._active(query_params)
+        page = params.get("page", 1)
+        limit = params.get("limit", 20)
+        sort = params.get("sort")
+        filters = {k: v for k, v in params.items() if k not in PAGING_PARAMS and k not in SORT_PARAMS}
+        
+        def run(ids: Optional[Set[str]]) -> Dict[str, Any]:
+            programs = [p for p in self.records(ids) if program_matches(p, **filters)]
+            if sort:
+                extract = INDEXABLE_FIELDS[sort][1] if sort in INDEXABLE_FIELDS \
+                    else (lambda r: _attr(r, sort))
+                present = [p for p in programs if extract(p) is not None]
+                present.sort(key=extract, reverse=params.get("order") == "desc")
+                programs = present + [p for p in programs if extract(p) is None]
+            
+            total = len(programs)
+            offset = (page - 1) * limit
+            return {
+                "data": programs[offset:offset + limit],
+                "pagination": {
+                    "page": page,
+                    "limit": limit,
+                    "total": total,
+                    "total_pages": (total + limit - 1) // limit
+                }
+            }
+        
+        return self.execute(params, run)
+    
+    def _credit(self, plan: Dict[str, Any], fields: Set[Optional[str]], elapsed: float) -> None:
+        """Record a scan's latency, or credit the indexes used with the time saved against it"""
+        used = [self._indexes[f] for f in fields if f in self._indexes]
+        if not used:
+            previous = self._scan_ms.get(plan["pattern"])
+            self._scan_ms[plan["pattern"]] = elapsed if previous is None else 0.8 * previous + 0.2 * elapsed
+            if self._records:
+                self._scan_ms_per_record = elapsed / len(self._records)
+            return
+        baseline = self._scan_ms.get(plan["pattern"])
+        if baseline is None and self._scan_ms_per_record is not None:
+            baseline = self._scan_ms_per_record * len(self._records)
+        saved = max(0.0, (baseline or 0.0) - elapsed) / len(used)
+        for index in used:
+            index.hits += 1
+            index.latency_saved_ms += saved
+    
+    def warm_cache(self, query_patterns: Optional[List[Dict[str, Any]]] = None,
+                   top_k: int = 20, loader: Optional[Callable[..., Any]] = None) -> int:
         """
         Pre-populate cache with results for common query patterns.
         
         Args:
-            query_patterns: List of common query patterns to cache
+            query_patterns: Queries to cache; defaults to the `top_k` most
+                frequent recorded (or imported) queries
+            top_k: Number of recorded queries to warm when none are given
+            loader: Function answering a query from its keyword parameters
+                (e.g. MasterIndex.search_programs); defaults to this index
             
         Returns:
             Number of queries cached
         """
-        # TODO: Implement cache warming logic
-        # This should execute common queries and store results in cache
-        
-        logger.info(f"Warming cache with {len(query_patterns)} query patterns")
-        return 0
+        patterns = query_patterns if query_patterns is not None else self.top_queries(top_k)
+        self._refresh()
+        logger.info(f"Warming cache with {len(patterns)} query patterns")
+        warmed = 0
+        for params in patterns:
+            params = self._active(params)
+            try:
+                if loader is not None:
+                    results = loader(**params)
+                else:
+                    plan = self.optimize_query(params)
+                    limit = params.get("limit")
+                    offset = params.get("offset") or ((params.get("page", 1) - 1) * limit if limit else 0)
+                    with self._lock:
+                        results = self._execute(plan, limit, offset)
+            except Exception as e:
+                logger.error(f"Error warming cache for {params}: {str(e)}")
+                continue
+            self.cache.set(self.cache_key(params), results, namespace=CACHE_NAMESPACE)
+            warmed += 1
+        return warmed
+
+
+_default_cache: Optional[DynamicCache] = None
+
+def get_default_cache() -> DynamicCache:
+    """Process-wide cache used by `cached` when no cache is given."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = DynamicCache()
+    return _default_cache
 
 
-def cached(ttl_seconds: Optional[int] = None, key_prefix: str = ""):
+def make_cache_key(func: Callable, args: tuple, kwargs: Dict[str, Any], key_prefix: str = "") -> str:
+    """Cache key from a function's qualified name and its arguments."""
+    name = f"{func.__module__}.{func.__qualname__}"
+    return f"{key_prefix}{name}:{args!r}:{sorted(kwargs.items())!r}"
+
+
+def cached(ttl_seconds: Optional[int] = None, key_prefix: str = "",
+           cache: Optional[DynamicCache] = None, namespace: Optional[str] = None):
     """
     Decorator for caching function results.
     
     Args:
         ttl_seconds: Optional TTL override
         key_prefix: Prefix for cache keys
+        cache: Cache to use (defaults to the process-wide DynamicCache)
+        namespace: Optional namespace for the cached results
         
     Returns:
         Decorated function
     """
-    # TODO: Implement caching decorator
-    # This should cache function results based on arguments
-    
     def decorator(func: Callable):
+        def store() -> DynamicCache:
+            return cache if cache is not None else get_default_cache()
+        
+        if asyncio.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                key = make_cache_key(func, args, kwargs, key_prefix)
+                found, value = store().lookup(key)
+                if found:
+                    return value
+                value = await func(*args, **kwargs)
+                store().set(key, value, ttl_seconds, namespace)
+                return value
+            return async_wrapper
+        
         @wraps(func)
         def wrapper(*args, **kwargs):
-            # Generate cache key from function name, args, and kwargs
-            # Check cache for existing result
-            # If found, return cached result
-            # If not found, execute function and cache result
-            return func(*args, **kwargs)
+            key = make_cache_key(func, args, kwargs, key_prefix)
+            found, value = store().lookup(key)
+            if found:
+                return value
+            value = func(*args, **kwargs)
+            store().set(key, value, ttl_seconds, namespace)
+            return value
         return wrapper
     return decorator
 
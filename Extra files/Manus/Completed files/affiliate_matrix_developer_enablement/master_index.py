@@ -8,8 +8,14 @@ compiled from various aggregators and APIs.
 from typing import Dict, List, Optional, Any, Union
 import logging
 from datetime import datetime
+from itertools import islice
 from pydantic import BaseModel, Field
 
+from backend.index.dedupe import DedupeEngine, registrable_domain
+from backend.index.models import ProgramIndexEntry
+from .dynamic_index import DynamicIndex
+from .search_index import ProgramSearchIndex
+
 logger = logging.getLogger(__name__)
 
 class AffiliateProgram(BaseModel):
@@ -57,6 +63,31 @@ class AffiliateProgram(BaseModel):
             }
         }
 
+def commission_rate(program: AffiliateProgram) -> Optional[float]:
+    """Best commission value of a program (the highest tier for tiered commissions)."""
+    value = program.commission_value
+    if isinstance(value, dict):
+        return max(value.values()) if value else None
+    return value
+
+
+def dedupe_entry(program: AffiliateProgram) -> ProgramIndexEntry:
+    """View of a program for the dedupe engine: its name, website and source listing."""
+    return ProgramIndexEntry.construct(
+        id=program.id, name=program.name, domain=program.website, network=program.source,
+        merchant_id=program.source_id or program.id, source=program.source, provenance=[],
+    )
+
+
+# sort_by -> (key, descending)
+SORT_FIELDS = {
+    "name": (lambda p: p.name.lower(), False),
+    "commission": (lambda p: commission_rate(p) or 0.0, True),
+    "cookie_duration": (lambda p: p.cookie_duration or 0, True),
+    "updated_at": (lambda p: p.updated_at, True),
+    "created_at": (lambda p: p.created_at, True),
+}
+
 class MasterIndex:
     """
     Service for managing the centralized master index of affiliate programs.
@@ -68,13 +99,31 @@ class MasterIndex:
     4. Tracking of data freshness and update cycles
     """
     
-    def __init__(self):
-        """Initialize the MasterIndex service."""
+    def __init__(self, dynamic_index: Optional[DynamicIndex] = None,
+                 dedupe_engine: Optional[DedupeEngine] = None):
+        """
+        Initialize the MasterIndex service.
+        
+        Args:
+            dynamic_index: Optional DynamicIndex that learns from the search
+                traffic and caches search results
+            dedupe_engine: Optional DedupeEngine; new programs matching an
+                indexed program from another source are merged into it
+        """
         # TODO: Initialize database connection or in-memory storage
         # This could be SQLAlchemy, MongoDB, or another database
+        self._programs: Dict[str, AffiliateProgram] = {}
+        self._by_source: Dict[tuple, str] = {}  # (source, source_id) -> program id
+        self._last_updated: Optional[datetime] = None
+        
+        # Full-text (BM25) and structured-filter index over the programs
+        self._search = ProgramSearchIndex()
+        self._dynamic = dynamic_index
         
-        # TODO: Set up indexing structures for efficient querying
-        # This could involve full-text search indexes, category indexes, etc.
+        # Duplicate program id -> canonical id, and the listings merged into each canonical program
+        self._dedupe = dedupe_engine
+        self._canonical: Dict[str, str] = {}
+        self._merged_sources: Dict[str, List[Dict[str, Optional[str]]]] = {}
         
         logger.info("MasterIndex service initialized")
     
@@ -88,15 +137,115 @@ class MasterIndex:
         Returns:
             True if successful, False otherwise
         """
-        # TODO: Implement program addition logic
-        # 1. Check if program already exists (by source and source_id)
-        # 2. If it exists, update it with new information
-        # 3. If it doesn't exist, add it as a new program
-        # 4. Update indexes accordingly
-        
         logger.info(f"Adding/updating program: {program.name} from {program.source}")
+        
+        # An existing program from the same source keeps its id
+        if program.source_id:
+            existing_id = self._by_source.get((program.source, program.source_id))
+            if existing_id and existing_id != program.id:
+                program = program.copy(update={"id": existing_id})
+        
+        canonical_id = self._canonical.get(program.id)
+        if canonical_id is None and self._dedupe is not None and program.id not in self._programs:
+            canonical_id = self._find_duplicate(program)
+        if canonical_id is not None:
+            return self._merge_duplicate(canonical_id, program)
+        
+        previous = self._programs.get(program.id)
+        if previous is not None and previous.source_id:
+            self._by_source.pop((previous.source, previous.source_id), None)
+        if program.source_id:
+            self._by_source[(program.source, program.source_id)] = program.id
+        self._put(program)
+        if self._dedupe is not None:
+            self._dedupe.add(program.id, dedupe_entry(program))
         return True
     
+    def _put(self, program: AffiliateProgram) -> None:
+        self._programs[program.id] = program
+        self._search.add(
+            program.id,
+            name=program.name,
+            description=program.description,
+            website=program.website,
+            tags=program.category,
+            facets={
+                "category": program.category,
+                "network": [program.network],
+                "commission_type": [program.commission_type],
+                "source": [program.source],
+            },
+            ranges={
+                "commission": commission_rate(program),
+                "cookie_duration": program.cookie_duration,
+            },
+        )
+        if self._dynamic is not None:
+            self._dynamic.add(program.id, program)
+        self._last_updated = datetime.utcnow()
+    
+    @staticmethod
+    def _listing(program: AffiliateProgram) -> Dict[str, Optional[str]]:
+        return {"id": program.id, "source": program.source, "source_id": program.source_id,
+                "network": program.network, "website": program.website}
+    
+    def _find_duplicate(self, program: AffiliateProgram) -> Optional[str]:
+        """Id of an indexed program that `program` duplicates, if any"""
+        self._dedupe.add(program.id, dedupe_entry(program))
+        try:
+            domain = registrable_domain(program.website)
+            for candidate_id in sorted(self._dedupe.candidates(program.id)):
+                candidate = self._programs.get(candidate_id)
+                if candidate is None or not self._dedupe.is_match(program.id, candidate_id):
+                    continue
+                listings = self._merged_sources.get(candidate_id) or [self._listing(candidate)]
+                # Another listing from the same source, or another site, is a different program
+                if any(l["source"] == program.source for l in listings):
+                    continue
+                if domain and registrable_domain(candidate.website) not in (None, domain):
+                    continue
+                return candidate_id
+            return None
+        finally:
+            self._dedupe.remove(program.id)
+    
+    def _merge_duplicate(self, canonical_id: str, program: AffiliateProgram) -> bool:
+        """Fold a duplicate listing into its canonical program, keeping its provenance"""
+        canonical = self._programs[canonical_id]
+        logger.info(f"Merging duplicate {program.id} from {program.source} into {canonical_id}")
+        self._canonical[program.id] = canonical_id
+        if program.source_id:
+            self._by_source[(program.source, program.source_id)] = program.id
+        listings = self._merged_sources.setdefault(canonical_id, [self._listing(canonical)])
+        listings[:] = [l for l in listings if l["id"] != program.id] + [self._listing(program)]
+        
+        merged = canonical.copy(update={
+            "description": canonical.description or program.description,
+            "category": list(dict.fromkeys(canonical.category + program.category)),
+            "network": canonical.network or program.network,
+            "cookie_duration": canonical.cookie_duration or program.cookie_duration,
+            "payment_methods": list(dict.fromkeys(canonical.payment_methods + program.payment_methods)),
+            "updated_at": max(canonical.updated_at, program.updated_at),
+        })
+        self._put(merged)
+        return True
+    
+    def get_program_sources(self, program_id: str) -> List[Dict[str, Optional[str]]]:
+        """
+        Listings (id, source, source_id, network, website) merged into a program.
+        
+        Args:
+            program_id: ID of the program, or of a listing merged into it
+            
+        Returns:
+            One dict per source listing; just the program's own when nothing was merged
+        """
+        program_id = self._canonical.get(program_id, program_id)
+        program = self._programs.get(program_id)
+        if program is None:
+            return []
+        return list(self._merged_sources.get(program_id) or [self._listing(program)])
+    
     def get_program(self, program_id: str) -> Optional[AffiliateProgram]:
         """
         Retrieve an affiliate program by ID.
@@ -107,10 +256,8 @@ class MasterIndex:
         Returns:
             AffiliateProgram if found, None otherwise
         """
-        # TODO: Implement program retrieval logic
-        
         logger.info(f"Retrieving program with ID: {program_id}")
-        return None
+        return self._programs.get(self._canonical.get(program_id, program_id))
     
     def search_programs(self, 
                         query: Optional[str] = None, 
@@ -121,7 +268,8 @@ class MasterIndex:
                         min_cookie_duration: Optional[int] = None,
                         sort_by: str = "relevance",
                         limit: int = 100,
-                        offset: int = 0) -> List[AffiliateProgram]:
+                        offset: int = 0,
+                        prefix: bool = False) -> List[AffiliateProgram]:
         """
         Search for affiliate programs based on various criteria.
         
@@ -135,15 +283,55 @@ class MasterIndex:
             sort_by: Field to sort results by
             limit: Maximum number of results to return
             offset: Number of results to skip
+            prefix: Treat the last query word as a prefix (autocomplete)
             
         Returns:
             List of matching AffiliateProgram objects
         """
-        # TODO: Implement search logic
-        # This should use the indexing structures for efficient querying
-        
         logger.info(f"Searching programs with query: {query}")
-        return []
+        filters = dict(
+            categories=categories,
+            networks=networks,
+            commission_type=commission_type,
+            min_commission=min_commission,
+            min_cookie_duration=min_cookie_duration,
+        )
+        
+        if self._dynamic is None:
+            return self._search_programs(query, filters, sort_by, limit, offset, prefix)
+        params = dict(filters, query=query, sort_by=sort_by, limit=limit, offset=offset,
+                      prefix=prefix or None)
+        self._dynamic.record_query(params)
+        # Built indexes narrow the category/network/commission candidates first
+        return self._dynamic.execute(params, lambda ids: self._search_programs(
+            query, dict(filters, ids=ids), sort_by, limit, offset, prefix))
+    
+    def _search_programs(self, query: Optional[str], filters: Dict[str, Any], sort_by: str,
+                         limit: int, offset: int, prefix: bool) -> List[AffiliateProgram]:
+        # Ranked queries only score enough documents to fill the page
+        if sort_by == "relevance" and query:
+            hits = self._search.search(query, limit=limit, offset=offset, prefix=prefix, **filters)
+            return [self._programs[program_id] for program_id, _ in hits]
+        
+        matches = (self._programs[pid] for pid in self._search.match(query, prefix=prefix, **filters))
+        if sort_by not in SORT_FIELDS:
+            return list(islice(matches, offset, offset + limit))
+        key, descending = SORT_FIELDS[sort_by]
+        programs = sorted(matches, key=key, reverse=descending)
+        return programs[offset:offset + limit]
+    
+    def suggest(self, prefix: str, limit: int = 10) -> List[str]:
+        """
+        Autocomplete suggestions for a partially typed search term.
+        
+        Args:
+            prefix: Beginning of the term
+            limit: Maximum number of suggestions
+            
+        Returns:
+            Indexed terms starting with the prefix, most common first
+        """
+        return self._search.complete(prefix, limit)
     
     def delete_program(self, program_id: str) -> bool:
         """
@@ -155,9 +343,21 @@ class MasterIndex:
         Returns:
             True if successful, False otherwise
         """
-        # TODO: Implement program deletion logic
-        
         logger.info(f"Deleting program with ID: {program_id}")
+        program_id = self._canonical.get(program_id, program_id)
+        program = self._programs.pop(program_id, None)
+        if program is None:
+            return False
+        for listing in self._merged_sources.pop(program_id, None) or [self._listing(program)]:
+            self._canonical.pop(listing["id"], None)
+            if listing["source_id"]:
+                self._by_source.pop((listing["source"], listing["source_id"]), None)
+        self._search.remove(program_id)
+        if self._dedupe is not None:
+            self._dedupe.remove(program_id)
+        if self._dynamic is not None:
+            self._dynamic.remove(program_id)
+        self._last_updated = datetime.utcnow()
         return True
     
     def get_stats(self) -> Dict[str, Any]:
@@ -167,16 +367,14 @@ class MasterIndex:
         Returns:
             Dictionary of statistics
         """
-        # TODO: Implement statistics gathering
-        # This should include counts by category, network, source, etc.
-        
         logger.info("Retrieving master index statistics")
         return {
-            "total_programs": 0,
-            "programs_by_source": {},
-            "programs_by_category": {},
-            "programs_by_network": {},
-            "last_updated": datetime.utcnow().isoformat()
+            "total_programs": len(self._programs),
+            "duplicates_merged": len(self._canonical),
+            "programs_by_source": self._search.facet_counts("source"),
+            "programs_by_category": self._search.facet_counts("category"),
+            "programs_by_network": self._search.facet_counts("network"),
+            "last_updated": (self._last_updated or datetime.utcnow()).isoformat()
         }
     
     def import_from_aggregator(self, aggregator_name: str, data: List[Dict[str, Any]]) -> Dict[str, Any]:
@@ -247,9 +445,6 @@ class MasterIndex:
 # TODO: Implement data normalization functions to standardize program data from different sources
 # This should handle variations in commission structures, categories, etc.
 
-# TODO: Implement deduplication logic to identify and merge duplicate program entries
-# This could involve fuzzy matching on program names, websites, etc.
-
 # TODO: Implement data quality assessment to flag potential issues
 # This could include missing fields, inconsistent data, etc.
 
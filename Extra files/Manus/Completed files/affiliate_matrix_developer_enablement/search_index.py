@@ -0,0 +1,455 @@
+"""
+Full-text Search Index for the Affiliate Matrix Master Index
+
+This module implements an embedded inverted index over program name,
+description, domain and tags with BM25 ranking, prefix search for
+autocomplete and bitset-based structured filters.
+"""
+
+import heapq
+import logging
+import math
+import re
+from bisect import bisect_left, insort
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r'[^\W_]+')
+_NONZERO_BYTE_RE = re.compile(rb'[^\x00]')
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Lower-cased alphanumeric tokens of `text`."""
+    return _TOKEN_RE.findall(text.lower()) if text else []
+
+
+def domain_tokens(website: Optional[str]) -> List[str]:
+    """Meaningful host labels of a URL, e.g. ``https://www.shop-x.co.uk`` -> shop, x, co."""
+    if not website:
+        return []
+    host = urlparse(website if '//' in website else f'//{website}').hostname or ''
+    labels = [label for label in host.split('.') if label and label != 'www']
+    return tokenize(' '.join(labels[:-1] or labels))
+
+
+class Bitset:
+    """Mutable bitset over document ids.
+
+    Bits live in a bytearray so single updates are O(1); `as_int` exposes
+    the bits as a Python int (cached until the next update) so filters
+    combine with C-speed ``&`` / ``|``.
+    """
+
+    __slots__ = ('_bytes', '_int', 'count')
+
+    def __init__(self):
+        self._bytes = bytearray()
+        self._int: Optional[int] = 0
+        self.count = 0
+
+    def add(self, i: int) -> None:
+        index, bit = i >> 3, 1 << (i & 7)
+        if index >= len(self._bytes):
+            self._bytes.extend(bytes(index + 1 - len(self._bytes)))
+        if not self._bytes[index] & bit:
+            self._bytes[index] |= bit
+            self.count += 1
+            self._int = None
+
+    def discard(self, i: int) -> None:
+        index, bit = i >> 3, 1 << (i & 7)
+        if index < len(self._bytes) and self._bytes[index] & bit:
+            self._bytes[index] &= ~bit & 0xFF
+            self.count -= 1
+            self._int = None
+
+    def __contains__(self, i: int) -> bool:
+        index = i >> 3
+        return index < len(self._bytes) and bool(self._bytes[index] >> (i & 7) & 1)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def as_int(self) -> int:
+        if self._int is None:
+            self._int = int.from_bytes(self._bytes, 'little')
+        return self._int
+
+
+def iter_bits(mask: bytes) -> Iterator[int]:
+    """Positions of the set bits in a little-endian bitset, ascending."""
+    for match in _NONZERO_BYTE_RE.finditer(mask):
+        base, byte = match.start() << 3, mask[match.start()]
+        for bit in range(8):
+            if byte >> bit & 1:
+                yield base + bit
+
+
+def _prefix_range(vocab: List[str], prefix: str) -> range:
+    """Positions of the terms of a sorted vocabulary that start with `prefix`."""
+    start = bisect_left(vocab, prefix)
+    return range(start, bisect_left(vocab, prefix + '\U0010ffff', start))
+
+
+class RangeIndex:
+    """Numeric column bucketed into bitsets of width `step`.
+
+    `at_least` ORs the buckets that can hold qualifying values; only the
+    boundary bucket may contain values below the threshold, so callers
+    check `values` for candidates when `exact` is False.
+    """
+
+    def __init__(self, step: float = 1.0):
+        self.step = step
+        self.values: Dict[int, float] = {}
+        self._buckets: Dict[int, Bitset] = {}
+
+    def _bucket(self, value: float) -> int:
+        return math.floor(value / self.step)
+
+    def add(self, docid: int, value: Optional[float]) -> None:
+        self.discard(docid)
+        if value is not None:
+            self.values[docid] = value
+            self._buckets.setdefault(self._bucket(value), Bitset()).add(docid)
+
+    def discard(self, docid: int) -> None:
+        value = self.values.pop(docid, None)
+        if value is not None:
+            bucket = self._bucket(value)
+            bits = self._buckets[bucket]
+            bits.discard(docid)
+            if not bits:
+                del self._buckets[bucket]
+
+    def at_least(self, threshold: float) -> Tuple[int, bool]:
+        """(candidate mask, exact) for values >= threshold."""
+        low = self._bucket(threshold)
+        mask = 0
+        for bucket, bits in self._buckets.items():
+            if bucket >= low:
+                mask |= bits.as_int()
+        exact = low * self.step == threshold or low not in self._buckets
+        return mask, exact
+
+
+class ProgramSearchIndex:
+    """
+    Inverted index with quantized BM25 and impact-ordered postings.
+
+    Each (term, document) pair stores its BM25 term-frequency component
+    quantized to one of `levels` impact levels, and each term keeps its
+    postings grouped by level. A query visits the groups in decreasing
+    order of idf * level and stops as soon as no unseen document can beat
+    the current top-k, so common terms cost O(k) rather than O(postings).
+
+    Documents get dense integer ids (reused after deletes) so structured
+    filters are bitsets combined with integer AND/OR.
+    """
+
+    FIELD_WEIGHTS = {'name': 3.0, 'tags': 2.0, 'domain': 2.0, 'description': 1.0}
+    FACETS = ('category', 'network', 'commission_type', 'source')
+    RANGES = {'commission': 1.0, 'cookie_duration': 1.0}
+
+    # Re-level every posting once the average length drifts this far from
+    # the one the current levels were computed with
+    RELEVEL_DRIFT = 0.25
+    # Check the stopping condition every this many documents within a group
+    CHECK_EVERY = 256
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, levels: int = 32,
+                 max_expansions: int = 20, max_prefix_scan: int = 5000):
+        self.k1 = k1
+        self.b = b
+        self.levels = levels
+        self.max_expansions = max_expansions
+        self.max_prefix_scan = max_prefix_scan
+
+        # Document table; docids are positions in these lists
+        self._ids: List[Optional[str]] = []
+        self._docids: Dict[str, int] = {}
+        self._free: List[int] = []
+        self._doc_tf: List[Optional[Dict[str, float]]] = []
+        self._doc_len: List[float] = []
+        self._total_len = 0.0
+        self._avgdl = 0.0                       # reference length for levels
+
+        # term -> {docid: level} and term -> {level: docids}
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._tiers: Dict[str, Dict[int, Set[int]]] = {}
+        # Sorted vocabularies for prefix lookups; terms seen in a single
+        # document (ids, unique domains) only fill up spare completions
+        self._vocab: List[str] = []
+        self._common_vocab: List[str] = []
+
+        self._live = Bitset()
+        self._facets: Dict[str, Dict[str, Bitset]] = {name: {} for name in self.FACETS}
+        self._doc_facets: List[Optional[Dict[str, List[str]]]] = []
+        self._ranges = {name: RangeIndex(step) for name, step in self.RANGES.items()}
+
+    def __len__(self) -> int:
+        return len(self._docids)
+
+    def __contains__(self, program_id: str) -> bool:
+        return program_id in self._docids
+
+    # ---------- Updates ---------- #
+    def add(self, program_id: str, name: str, description: Optional[str] = None,
+            website: Optional[str] = None, tags: Iterable[str] = (),
+            facets: Optional[Dict[str, Iterable[str]]] = None,
+            ranges: Optional[Dict[str, Optional[float]]] = None) -> None:
+        """Index (or re-index) a program."""
+        self.remove(program_id)
+        docid = self._free.pop() if self._free else len(self._ids)
+        if docid == len(self._ids):
+            self._ids.append(None)
+            self._doc_tf.append(None)
+            self._doc_len.append(0.0)
+            self._doc_facets.append(None)
+        self._ids[docid] = program_id
+        self._docids[program_id] = docid
+        self._live.add(docid)
+
+        tf: Dict[str, float] = {}
+        fields = (('name', tokenize(name)), ('description', tokenize(description)),
+                  ('domain', domain_tokens(website)), ('tags', [t for tag in tags for t in tokenize(tag)]))
+        for field, tokens in fields:
+            weight = self.FIELD_WEIGHTS[field]
+            for token in tokens:
+                tf[token] = tf.get(token, 0.0) + weight
+        length = sum(tf.values())
+        self._doc_tf[docid] = tf
+        self._doc_len[docid] = length
+        self._total_len += length
+
+        drifted = not self._avgdl or abs(self.avgdl - self._avgdl) > self.RELEVEL_DRIFT * self._avgdl
+        if drifted:
+            self._avgdl = self.avgdl
+        for term, freq in tf.items():
+            self._post(term, docid, self._level(freq, length))
+        if drifted:
+            self._relevel()
+
+        doc_facets = {}
+        for facet, values in (facets or {}).items():
+            values = [str(v).lower() for v in values if v is not None]
+            for value in values:
+                self._facets[facet].setdefault(value, Bitset()).add(docid)
+            doc_facets[facet] = values
+        self._doc_facets[docid] = doc_facets
+        for column, value in (ranges or {}).items():
+            self._ranges[column].add(docid, value)
+
+    def remove(self, program_id: str) -> bool:
+        """Drop a program from the index; False if it wasn't indexed."""
+        docid = self._docids.pop(program_id, None)
+        if docid is None:
+            return False
+        for term in self._doc_tf[docid]:
+            self._unpost(term, docid)
+        for facet, values in self._doc_facets[docid].items():
+            index = self._facets[facet]
+            for value in values:
+                index[value].discard(docid)
+                if not index[value]:
+                    del index[value]
+        for column in self._ranges.values():
+            column.discard(docid)
+        self._total_len -= self._doc_len[docid]
+        self._ids[docid] = self._doc_tf[docid] = self._doc_facets[docid] = None
+        self._doc_len[docid] = 0.0
+        self._live.discard(docid)
+        self._free.append(docid)
+        return True
+
+    @property
+    def avgdl(self) -> float:
+        return self._total_len / len(self._docids) if self._docids else 0.0
+
+    def _level(self, freq: float, length: float) -> int:
+        norm = freq * (self.k1 + 1) / (freq + self.k1 * (1 - self.b + self.b * length / self._avgdl))
+        return max(1, math.ceil(norm / (self.k1 + 1) * self.levels))
+
+    def _post(self, term: str, docid: int, level: int) -> None:
+        postings = self._postings.get(term)
+        if postings is None:
+            postings = self._postings[term] = {}
+            self._tiers[term] = {}
+            insort(self._vocab, term)
+        postings[docid] = level
+        if len(postings) == 2:
+            insort(self._common_vocab, term)
+        self._tiers[term].setdefault(level, set()).add(docid)
+
+    def _unpost(self, term: str, docid: int) -> None:
+        postings = self._postings[term]
+        level = postings.pop(docid)
+        tier = self._tiers[term][level]
+        tier.discard(docid)
+        if not tier:
+            del self._tiers[term][level]
+        if len(postings) == 1:
+            del self._common_vocab[bisect_left(self._common_vocab, term)]
+        elif not postings:
+            del self._postings[term], self._tiers[term]
+            del self._vocab[bisect_left(self._vocab, term)]
+
+    def _relevel(self) -> None:
+        logger.info(f"Re-levelling search postings (avgdl={self._avgdl:.1f}, docs={len(self)})")
+        for term, postings in self._postings.items():
+            tiers = self._tiers[term] = {}
+            for docid in postings:
+                level = postings[docid] = self._level(self._doc_tf[docid][term], self._doc_len[docid])
+                tiers.setdefault(level, set()).add(docid)
+
+    # ---------- Queries ---------- #
+    def idf(self, term: str) -> float:
+        df = len(self._postings.get(term, ()))
+        return math.log(1 + (len(self) - df + 0.5) / (df + 0.5))
+
+    def complete(self, prefix: str, limit: int = 10) -> List[str]:
+        """Indexed terms starting with `prefix`, most frequent first."""
+        prefix = prefix.lower()
+        if not prefix:
+            return []
+        common = _prefix_range(self._common_vocab, prefix)[:self.max_prefix_scan]
+        best = heapq.nlargest(limit, self._common_vocab[common.start:common.stop],
+                              key=lambda t: len(self._postings[t]))
+        if len(best) < limit:
+            rare = (self._vocab[i] for i in _prefix_range(self._vocab, prefix))
+            best += islice((t for t in rare if len(self._postings[t]) == 1), limit - len(best))
+        return best
+
+    def query_slots(self, query: Optional[str], prefix: bool = False) -> List[List[str]]:
+        """Indexed terms for `query`, one slot per query word.
+
+        With `prefix` the last word becomes a slot of its completions; a
+        document scores the best of them rather than their sum.
+        """
+        tokens = list(dict.fromkeys(tokenize(query)))
+        expansions = []
+        if prefix and tokens and not query[-1].isspace():
+            expansions = [t for t in self.complete(tokens.pop(), self.max_expansions) if t not in tokens]
+        slots = [[t] for t in tokens if t in self._postings]
+        return slots + [expansions] if expansions else slots
+
+    def filter_mask(self,
+                    categories: Optional[List[str]] = None,
+                    networks: Optional[List[str]] = None,
+                    commission_type: Optional[str] = None,
+                    min_commission: Optional[float] = None,
+                    min_cookie_duration: Optional[float] = None,
+                    ids: Optional[Iterable[str]] = None) -> Tuple[Optional[bytes], list]:
+        """(bitset bytes, residual checks) for the structured filters.
+
+        `ids` restricts the result to those programs (candidates found by
+        another index). The bytes are None when nothing is filtered.
+        Residual checks are (values, threshold) pairs a candidate must
+        also satisfy.
+        """
+        clauses = []
+        if ids is not None:
+            allowed = Bitset()
+            for program_id in ids:
+                docid = self._docids.get(program_id)
+                if docid is not None:
+                    allowed.add(docid)
+            clauses.append(allowed.as_int())
+        for facet, values in (('category', categories), ('network', networks),
+                              ('commission_type', [commission_type] if commission_type else None)):
+            if values:
+                index = self._facets[facet]
+                mask = 0
+                for value in values:
+                    bits = index.get(str(value).lower())
+                    if bits is not None:
+                        mask |= bits.as_int()
+                clauses.append(mask)
+        checks = []
+        for column, threshold in (('commission', min_commission), ('cookie_duration', min_cookie_duration)):
+            if threshold is not None:
+                mask, exact = self._ranges[column].at_least(threshold)
+                clauses.append(mask)
+                if not exact:
+                    checks.append((self._ranges[column].values, threshold))
+        if not clauses:
+            return None, checks
+        mask = clauses[0]
+        for clause in clauses[1:]:
+            mask &= clause
+        return mask.to_bytes((len(self._ids) + 7) >> 3, 'little'), checks
+
+    def search(self, query: Optional[str], limit: int = 100, offset: int = 0,
+               prefix: bool = False, **filters) -> List[Tuple[str, float]]:
+        """Top (program_id, score) pairs for `query` by BM25, best first."""
+        slots = self.query_slots(query, prefix)
+        k = offset + limit
+        if not slots or k <= 0:
+            return []
+        mask, checks = self.filter_mask(**filters)
+        scale = (self.k1 + 1) / self.levels
+        weight = {t: self.idf(t) * scale for slot in slots for t in slot}
+        weighted = [[(self._postings[t], weight[t]) for t in slot] for slot in slots]
+
+        # Highest unvisited contribution per term; an unseen doc can't beat
+        # the sum over slots of the best bound in each
+        bound = {t: w * max(self._tiers[t]) for t, w in weight.items()}
+        groups = heapq.merge(*[
+            [(-w * level, t, level) for level in sorted(self._tiers[t], reverse=True)]
+            for t, w in weight.items()
+        ])
+
+        top: List[Tuple[float, int]] = []
+        seen: Set[int] = set()
+        for neg_contribution, term, level in groups:
+            bound[term] = -neg_contribution
+            remaining = sum(max(bound[t] for t in slot) for slot in slots)
+            if len(top) >= k and top[0][0] >= remaining:
+                break
+            for n, docid in enumerate(self._tiers[term][level]):
+                if n % self.CHECK_EVERY == 0 and n and len(top) >= k and top[0][0] >= remaining:
+                    break
+                if docid in seen:
+                    continue
+                seen.add(docid)
+                if mask is not None and not mask[docid >> 3] >> (docid & 7) & 1:
+                    continue
+                if checks and not all(values.get(docid, -math.inf) >= t for values, t in checks):
+                    continue
+                score = 0.0
+                for slot in weighted:
+                    if len(slot) == 1:
+                        postings, w = slot[0]
+                        score += w * postings.get(docid, 0)
+                    else:
+                        score += max(w * postings.get(docid, 0) for postings, w in slot)
+                if len(top) < k:
+                    heapq.heappush(top, (score, -docid))
+                elif score > top[0][0]:
+                    heapq.heapreplace(top, (score, -docid))
+            bound[term] = 0.0 if level == min(self._tiers[term]) else bound[term]
+
+        ranked = sorted(top, reverse=True)[offset:]
+        return [(self._ids[-docid], score) for score, docid in ranked]
+
+    def match(self, query: Optional[str] = None, prefix: bool = False, **filters) -> Iterator[str]:
+        """Every program id matching any query term and all filters (unranked)."""
+        mask, checks = self.filter_mask(**filters)
+        terms = [t for slot in self.query_slots(query, prefix) for t in slot]
+        if query and tokenize(query):
+            docids: Iterable[int] = sorted(set().union(*[self._postings[t] for t in terms]))
+            if mask is not None:
+                docids = (d for d in docids if mask[d >> 3] >> (d & 7) & 1)
+        else:
+            docids = iter_bits(mask if mask is not None else self._live.as_int().to_bytes(
+                (len(self._ids) + 7) >> 3, 'little'))
+        for docid in docids:
+            if not checks or all(values.get(docid, -math.inf) >= t for values, t in checks):
+                yield self._ids[docid]
+
+    def facet_counts(self, facet: str) -> Dict[str, int]:
+        """Number of indexed programs per value of `facet`."""
+        return {value: len(bits) for value, bits in self._facets[facet].items()}
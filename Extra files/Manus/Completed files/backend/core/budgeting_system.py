@@ -1,11 +1,30 @@
 # backend/core/budgeting_system.py
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Mapping, Optional, Sequence, Union
 from datetime import datetime
 import logging
 from decimal import Decimal, ROUND_HALF_UP
 
+import numpy as np
+
 logger = logging.getLogger(__name__)
 
+CENT = Decimal('0.01')
+
+def to_cents(values: np.ndarray) -> np.ndarray:
+    """Amounts as integer cents, rounded half away from zero like ROUND_HALF_UP.
+
+    Values are first snapped to whole micro-units, so float noise such as
+    12.344999999999999 for 12.345 doesn't change the rounded cent.
+    """
+    micros = np.rint(np.asarray(values, dtype=float) * 1_000_000).astype(np.int64)
+    return np.sign(micros) * ((np.abs(micros) + 5_000) // 10_000)
+
+class _Money(dict):
+    """Integer cents -> Decimal, built once per distinct amount (Decimals are immutable)"""
+    def __missing__(self, cents: int) -> Decimal:
+        value = self[cents] = Decimal(cents) * CENT
+        return value
+
 class BudgetAllocationSystem:
     def __init__(self):
         self.performance_thresholds = {
@@ -90,4 +109,202 @@ class BudgetAllocationSystem:
                 'campaign_id': budget_rules['campaign_id'],
                 'error': str(e),
                 'timestamp': datetime.utcnow().isoformat()
-            }
\ No newline at end of file
+            }
+
+    def evaluate_rules_batch(
+        self,
+        campaign_metrics: Union[Mapping[str, Sequence], Sequence[Mapping[str, Any]]],
+        rule_set: Union[Mapping[str, Any], Sequence[Mapping[str, Any]]]
+    ) -> 'BudgetRuleResults':
+        """
+        Calculate budget adjustments for many campaigns at once
+        
+        Applies the same rules as calculate_budget_adjustment, but every
+        trigger of every campaign is evaluated as one array comparison and
+        adjustments are summed and clamped as array operations. The results
+        stay columnar (integer cents); per-campaign dicts with Decimal
+        amounts are only built for the campaigns that are looked at.
+        
+        Args:
+            campaign_metrics: Metrics table, either columns (name -> values)
+                or rows; needs campaign_id and current_budget, missing metrics count as 0
+            rule_set: Rules in the budgeting_rules.json shape ({'budget_rules': [...]})
+                or the list of rules itself
+            
+        Returns:
+            BudgetRuleResults, in table order; campaigns without a rule or
+            with a non-positive budget are invalid and read as error entries
+            
+        Raises:
+            ValueError: If a rule uses a metric without performance thresholds
+        """
+        columns = self._metric_columns(campaign_metrics)
+        campaign_ids = list(columns.get('campaign_id', ()))
+        n = len(campaign_ids)
+        budget = self._column(columns, 'current_budget', n)
+        
+        rules = rule_set['budget_rules'] if isinstance(rule_set, Mapping) else rule_set
+        rule_by_campaign = {rule['campaign_id']: rule for rule in rules}
+        row_rules = [rule_by_campaign.get(cid) for cid in campaign_ids]
+        has_rule = np.array([rule is not None for rule in row_rules], dtype=bool)
+        min_budget = np.array([rule['min_budget'] if rule else 0.0 for rule in row_rules], dtype=float)
+        max_budget = np.array([rule['max_budget'] if rule else 0.0 for rule in row_rules], dtype=float)
+        valid = has_rule & (budget > 0)
+        
+        # Flatten every trigger into parallel arrays (rows stay in table order)
+        metric_names = list(self.performance_thresholds)
+        metric_codes = {metric: code for code, metric in enumerate(metric_names)}
+        rows, codes, thresholds, is_percentage, values = [], [], [], [], []
+        for row, rule in enumerate(row_rules):
+            if rule is None:
+                continue
+            for trigger in rule.get('adjustment_triggers', ()):
+                code = metric_codes.get(trigger['metric'])
+                if code is None:
+                    raise ValueError(f"No performance thresholds for metric: {trigger['metric']}")
+                rows.append(row)
+                codes.append(code)
+                thresholds.append(trigger['threshold'])
+                is_percentage.append(trigger['adjustment_type'] == 'percentage')
+                values.append(trigger['adjustment_value'])
+        trigger_rows = np.array(rows, dtype=np.intp)
+        trigger_metrics = np.array(codes, dtype=np.intp)
+        thresholds = np.array(thresholds, dtype=float)
+        is_percentage = np.array(is_percentage, dtype=bool)
+        values = np.array(values, dtype=float)
+        
+        metric_values = np.stack([self._column(columns, metric, n) for metric in metric_names]) \
+            if n else np.zeros((len(metric_names), 0))
+        minimums = np.array([self.performance_thresholds[m]['min'] for m in metric_names], dtype=float)
+        
+        observed = metric_values[trigger_metrics, trigger_rows]
+        above = observed > thresholds
+        below = ~above & (observed < minimums[trigger_metrics])
+        fired = (above | below) & valid[trigger_rows]
+        amounts = np.where(is_percentage, budget[trigger_rows] * values / 100, values)
+        signed = np.where(above, amounts, -amounts) * fired
+        
+        total_adjustment = np.bincount(trigger_rows, weights=signed, minlength=n)
+        new_budget = np.maximum(min_budget, np.minimum(max_budget, budget + total_adjustment))
+        
+        fired_at = np.flatnonzero(fired)
+        results = BudgetRuleResults(
+            campaign_ids=campaign_ids,
+            metric_names=metric_names,
+            has_rule=has_rule,
+            valid=valid,
+            current_cents=to_cents(budget),
+            new_cents=to_cents(new_budget),
+            total_cents=to_cents(total_adjustment),
+            fired_rows=trigger_rows[fired_at],
+            fired_metrics=trigger_metrics[fired_at],
+            fired_above=above[fired_at],
+            fired_cents=to_cents(signed[fired_at]),
+            fired_observed=observed[fired_at],
+            fired_thresholds=thresholds[fired_at],
+        )
+        logger.info(f"Evaluated budget rules for {n} campaigns ({len(fired_at)} adjustments)")
+        return results
+
+    @staticmethod
+    def _metric_columns(campaign_metrics) -> Mapping[str, Sequence]:
+        if isinstance(campaign_metrics, Mapping):
+            return campaign_metrics
+        names = {name for row in campaign_metrics for name in row}
+        return {name: [row.get(name) for row in campaign_metrics] for name in names}
+
+    @staticmethod
+    def _column(columns: Mapping[str, Sequence], name: str, n: int) -> np.ndarray:
+        """Float column with missing values (and missing columns) as 0"""
+        if name not in columns:
+            return np.zeros(n)
+        values = np.array(columns[name], dtype=float)
+        return np.nan_to_num(values, nan=0.0)
+
+class BudgetRuleResults:
+    """
+    Columnar results of BudgetAllocationSystem.evaluate_rules_batch
+    
+    Budgets are int64 cent arrays indexed by table row; the fired triggers
+    are parallel arrays ordered by row, `fired_rows` giving each one's row.
+    Indexing or iterating builds the per-campaign result dicts of
+    calculate_budget_adjustment (Decimal amounts) on demand.
+    """
+    
+    def __init__(self, campaign_ids: List[Any], metric_names: List[str], has_rule: np.ndarray,
+                 valid: np.ndarray, current_cents: np.ndarray, new_cents: np.ndarray,
+                 total_cents: np.ndarray, fired_rows: np.ndarray, fired_metrics: np.ndarray,
+                 fired_above: np.ndarray, fired_cents: np.ndarray, fired_observed: np.ndarray,
+                 fired_thresholds: np.ndarray):
+        self.campaign_ids = campaign_ids
+        self.metric_names = metric_names
+        self.has_rule = has_rule
+        self.valid = valid
+        self.current_cents = current_cents
+        self.new_cents = new_cents
+        self.total_cents = total_cents
+        self.fired_rows = fired_rows
+        self.fired_metrics = fired_metrics
+        self.fired_above = fired_above
+        self.fired_cents = fired_cents
+        self.fired_observed = fired_observed
+        self.fired_thresholds = fired_thresholds
+        self.timestamp = datetime.utcnow().isoformat()
+        self._money = _Money()
+        self._columns: Optional[Dict[str, list]] = None
+    
+    def __len__(self) -> int:
+        return len(self.campaign_ids)
+    
+    def __getitem__(self, row: int) -> Dict[str, Any]:
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError(row)
+        return self.result(row)
+    
+    def __iter__(self):
+        return (self.result(row) for row in range(len(self)))
+    
+    def changed_rows(self) -> np.ndarray:
+        """Rows of the valid campaigns whose budget changes"""
+        return np.flatnonzero(self.valid & (self.new_cents != self.current_cents))
+    
+    def changed(self) -> List[Dict[str, Any]]:
+        """Result dicts for the campaigns whose budget changes"""
+        return [self.result(row) for row in self.changed_rows().tolist()]
+    
+    def _lists(self) -> Dict[str, list]:
+        """The arrays as Python lists (converted once, on the first dict built)"""
+        if self._columns is None:
+            names = ('has_rule', 'valid', 'current_cents', 'new_cents', 'total_cents',
+                     'fired_above', 'fired_cents', 'fired_observed', 'fired_thresholds')
+            self._columns = {name: getattr(self, name).tolist() for name in names}
+            self._columns['fired_metrics'] = [self.metric_names[code] for code in self.fired_metrics.tolist()]
+            # fired triggers of row r are [fired_start[r], fired_start[r + 1])
+            self._columns['fired_start'] = np.searchsorted(self.fired_rows, np.arange(len(self) + 1)).tolist()
+        return self._columns
+    
+    def result(self, row: int) -> Dict[str, Any]:
+        """The calculate_budget_adjustment-shaped result of one table row"""
+        c = self._lists()
+        campaign_id = self.campaign_ids[row]
+        if not c['valid'][row]:
+            error = "Current budget must be positive" if c['has_rule'][row] else "No budget rule for campaign"
+            return {'campaign_id': campaign_id, 'error': error, 'timestamp': self.timestamp}
+        money = self._money
+        metrics, above, cents = c['fired_metrics'], c['fired_above'], c['fired_cents']
+        adjustments = [{
+            'metric': metrics[i],
+            'amount': money[cents[i]],
+            'reason': (f"{metrics[i]} exceeding target ({c['fired_observed'][i]} > {c['fired_thresholds'][i]})"
+                       if above[i] else f"{metrics[i]} below minimum threshold")
+        } for i in range(c['fired_start'][row], c['fired_start'][row + 1])]
+        return {
+            'campaign_id': campaign_id,
+            'current_budget': money[c['current_cents'][row]],
+            'new_budget': money[c['new_cents'][row]],
+            'total_adjustment': money[c['total_cents'][row]],
+            'adjustments': adjustments,
+            'timestamp': self.timestamp
+        }
@@ -1,237 +1,602 @@
-```json
-{
-  "cache_code": """# backend/core/cache.py
-from typing import Any, Optional, List, Union
+# backend/core/cache.py
+"""Two-tier cache: a bounded in-process LRU (L1) in front of Redis (L2).
+
+Hot keys are served from L1 without a Redis round-trip or JSON decode.
+Writes and invalidations are broadcast on a Redis pub/sub channel so
+every worker drops its L1 copy; L1 entries also never outlive their
+Redis TTL (or `l1_ttl`, in case a broadcast is missed).
+
+Values handed out from L1 are shared between callers: treat them as
+read-only. The codec is chosen per key prefix (see serialization.py);
+`get_many`/`set_many` move a whole page of values in one round-trip.
+
+Usage:
+
+    cache = CacheManager()
+
+    @cache.cached(ttl=3600, tags=['programs'])
+    def get_program(program_id: str): ...
+
+    cache.invalidate('programs', is_tag=True)   # after a write
+"""
+from typing import Any, Dict, List, Optional, Set, Tuple
+import asyncio
 import json
-import redis
-from datetime import timedelta
 import logging
+import math
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
 from functools import wraps
 
+import redis
+
+from .serialization import JsonSerializer, Serializer, decoders_for, loads
+
 logger = logging.getLogger(__name__)
 
+INVALIDATION_CHANNEL = 'cache:invalidate'
+
+# States of a value cached by CacheManager.cached
+FRESH, EARLY, STALE, MISS = 'fresh', 'early', 'stale', 'miss'
+
+
+def _text(value) -> Optional[str]:
+    return value.decode('utf-8') if isinstance(value, bytes) else value
+
+
+class LocalCache:
+    """Bounded, thread-safe LRU with per-entry expiry and tag tracking.
+
+    Tags are tracked both ways (tag -> keys and key -> tags) so a key leaves
+    its tag sets whenever it is evicted, deleted, expires or is re-set.
+    """
+
+    def __init__(self, max_size: int = 10000):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._tags: Dict[str, Set[str]] = {}
+        self._key_tags: Dict[str, Tuple[str, ...]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _untag(self, key: str) -> None:
+        for tag in self._key_tags.pop(key, ()):
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def _drop(self, key: str) -> None:
+        self._entries.pop(key, None)
+        self._untag(key)
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                self._drop(key)
+                return False, None
+            self._entries.move_to_end(key)
+            return True, value
+
+    def set(self, key: str, value: Any, ttl: float, tags: Optional[List[str]] = None) -> None:
+        if ttl <= 0 or self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            self._untag(key)
+            if tags:
+                self._key_tags[key] = tuple(tags)
+                for tag in tags:
+                    self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_size:
+                evicted, _ = self._entries.popitem(last=False)
+                self._untag(evicted)
+
+    def delete(self, *keys: str) -> None:
+        with self._lock:
+            for key in keys:
+                self._drop(key)
+
+    def delete_tag(self, tag: str) -> None:
+        with self._lock:
+            for key in list(self._tags.get(tag, ())):
+                self._drop(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+            self._key_tags.clear()
+
+
 class CacheManager:
-    def __init__(self, redis_host: str = 'localhost', 
+    def __init__(self, redis_host: str = 'localhost',
                  redis_port: int = 6379,
-                 default_ttl: int = 3600):
-        self.client = redis.Redis(
+                 default_ttl: int = 3600,
+                 client: Optional[redis.Redis] = None,
+                 l1_max_size: int = 10000,
+                 l1_ttl: int = 60,
+                 listen: bool = True,
+                 serializers: Optional[Dict[str, Serializer]] = None,
+                 default_serializer: Optional[Serializer] = None):
+        """
+        Args:
+            client: Redis client to use instead of connecting to host/port
+                (e.g. a fakeredis instance); must not decode responses
+            l1_max_size: Entries kept in process; 0 disables L1
+            l1_ttl: Upper bound on how long L1 serves a value
+            listen: Subscribe to invalidations from other workers
+            serializers: Key prefix -> serializer; the longest match wins
+            default_serializer: For keys matching no prefix (JSON by default)
+        """
+        self.client = client or redis.Redis(
             host=redis_host,
-            port=redis_port,
-            decode_responses=True
+            port=redis_port
         )
         self.default_ttl = default_ttl
+        self.default_serializer = default_serializer or JsonSerializer()
+        self.serializers = sorted((serializers or {}).items(), key=lambda item: -len(item[0]))
+        # Payloads are only decoded with the codecs configured here
+        self.decoders = decoders_for([self.default_serializer] + [s for _, s in self.serializers])
+        self.l1 = LocalCache(l1_max_size)
+        self.l1_ttl = l1_ttl
+        self.instance_id = uuid.uuid4().hex
+        self._counts = {'l1_hits': 0, 'l1_misses': 0, 'l2_hits': 0, 'l2_misses': 0}
+        self._pubsub = None
+        self._listener = None
+
+        # Single-flight bookkeeping for the cached decorator
+        self.lock_poll_interval = 0.05
+        self._flight_lock = threading.Lock()
+        self._inflight: Dict[str, Future] = {}
+        self._async_inflight: Dict[Tuple[int, str], asyncio.Future] = {}
+        self._refreshing: Set[str] = set()
+        self._tasks: Set[asyncio.Future] = set()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        if listen and l1_max_size > 0:
+            self._subscribe()
+
+    # ---------- Cross-worker invalidation ---------- #
+    def _subscribe(self):
+        try:
+            self._pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+            self._pubsub.subscribe(**{INVALIDATION_CHANNEL: self._on_invalidation})
+            self._listener = self._pubsub.run_in_thread(sleep_time=0.01, daemon=True)
+        except Exception as e:
+            logger.error(f"Cache invalidation subscribe error: {str(e)}")
+            self._pubsub = self._listener = None
 
+    def _on_invalidation(self, message: Dict[str, Any]):
+        try:
+            payload = json.loads(message['data'])
+        except (TypeError, ValueError):
+            logger.warning(f"Ignoring malformed cache invalidation: {message.get('data')!r}")
+            return
+        if payload.get('origin') == self.instance_id:
+            return
+        self.l1.delete(*payload.get('keys', ()))
+        for tag in payload.get('tags', ()):
+            self.l1.delete_tag(tag)
+
+    def _broadcast(self, pipe, keys: List[str] = (), tags: List[str] = ()):
+        message = {'origin': self.instance_id, 'keys': list(keys), 'tags': list(tags)}
+        pipe.publish(INVALIDATION_CHANNEL, json.dumps(message))
+
+    def close(self):
+        """Stop listening for invalidations and background refreshes"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener.join(timeout=1)
+        if self._pubsub is not None:
+            self._pubsub.close()
+        self._pubsub = self._listener = None
+
+    def serializer_for(self, key: str) -> Serializer:
+        for prefix, serializer in self.serializers:
+            if key.startswith(prefix):
+                return serializer
+        return self.default_serializer
+
+    # ---------- Cache API ---------- #
     def get(self, key: str) -> Optional[Any]:
-        \"\"\"Fetch value from cache\"\"\"
+        """Fetch value from cache (L1 first, then Redis)"""
+        found, value = self.l1.get(key)
+        if found:
+            self._counts['l1_hits'] += 1
+            return value
+        self._counts['l1_misses'] += 1
+
         try:
-            value = self.client.get(key)
-            return json.loads(value) if value else None
+            # Value and remaining TTL in one round-trip
+            pipe = self.client.pipeline(transaction=False)
+            pipe.get(key)
+            pipe.pttl(key)
+            raw, ttl_ms = pipe.execute()
+            value = loads(raw, self.decoders) if raw is not None else None
         except Exception as e:
             logger.error(f"Cache get error: {str(e)}")
             return None
+        if raw is None:
+            self._counts['l2_misses'] += 1
+            return None
+        self._counts['l2_hits'] += 1
+        l1_ttl = self.l1_ttl if ttl_ms < 0 else min(self.l1_ttl, ttl_ms / 1000)
+        self.l1.set(key, value, l1_ttl)
+        return value
 
-    def set(self, key: str, value: Any, 
+    def set(self, key: str, value: Any,
             ttl: Optional[int] = None,
             tags: Optional[List[str]] = None) -> bool:
-        \"\"\"Store value in cache with optional TTL and tags\"\"\"
+        """Store value in cache with optional TTL and tags"""
         try:
             ttl = ttl or self.default_ttl
-            serialized = json.dumps(value)
-            
-            # Store value with TTL
-            self.client.setex(key, ttl, serialized)
-            
-            # Store tag associations if provided
-            if tags:
-                for tag in tags:
-                    self.client.sadd(f"tag:{tag}", key)
-            return True
+            serialized = self.serializer_for(key).dumps(value)
+
+            # Value, tag associations and the L1 broadcast in one round-trip
+            pipe = self.client.pipeline(transaction=False)
+            pipe.set(key, serialized, ex=ttl)
+            for tag in tags or ():
+                pipe.sadd(f"tag:{tag}", key)
+            self._broadcast(pipe, keys=[key])
+            pipe.execute()
         except Exception as e:
             logger.error(f"Cache set error: {str(e)}")
+            self.l1.delete(key)
             return False
+        self.l1.set(key, value, min(ttl, self.l1_ttl), tags)
+        return True
+
+    def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        """Fetch many values at once; missing keys are left out of the result.
 
-    def invalidate(self, key_or_tag: str, 
-                  is_tag: bool = False) -> bool:
-        \"\"\"Invalidate cache by key or tag\"\"\"
+        L1 misses are read with one MGET (plus their TTLs) in a single
+        round-trip.
+        """
+        found: Dict[str, Any] = {}
+        missing = []
+        for key in dict.fromkeys(keys):
+            hit, value = self.l1.get(key)
+            if hit:
+                found[key] = value
+            else:
+                missing.append(key)
+        self._counts['l1_hits'] += len(found)
+        self._counts['l1_misses'] += len(missing)
+        if not missing:
+            return found
+
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            pipe.mget(missing)
+            for key in missing:
+                pipe.pttl(key)
+            raw_values, *ttls = pipe.execute()
+        except Exception as e:
+            logger.error(f"Cache get_many error: {str(e)}")
+            return found
+        for key, raw, ttl_ms in zip(missing, raw_values, ttls):
+            if raw is None:
+                self._counts['l2_misses'] += 1
+                continue
+            try:
+                value = loads(raw, self.decoders)
+            except Exception as e:
+                logger.error(f"Cache decode error for {key}: {str(e)}")
+                continue
+            self._counts['l2_hits'] += 1
+            found[key] = value
+            self.l1.set(key, value, self.l1_ttl if ttl_ms < 0 else min(self.l1_ttl, ttl_ms / 1000))
+        return found
+
+    def set_many(self, mapping: Dict[str, Any],
+                 ttl: Optional[int] = None,
+                 tags: Optional[List[str]] = None) -> bool:
+        """Store many values in one round-trip (values, tag sets and the L1 broadcast)"""
+        if not mapping:
+            return True
+        ttl = ttl or self.default_ttl
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            for key, value in mapping.items():
+                pipe.set(key, self.serializer_for(key).dumps(value), ex=ttl)
+            for tag in tags or ():
+                pipe.sadd(f"tag:{tag}", *mapping)
+            self._broadcast(pipe, keys=list(mapping))
+            pipe.execute()
+        except Exception as e:
+            logger.error(f"Cache set_many error: {str(e)}")
+            self.l1.delete(*mapping)
+            return False
+        for key, value in mapping.items():
+            self.l1.set(key, value, min(ttl, self.l1_ttl), tags)
+        return True
+
+    def invalidate(self, key_or_tag: str,
+                   is_tag: bool = False) -> bool:
+        """Invalidate cache by key or tag, in Redis and in every worker's L1"""
         try:
             if is_tag:
                 # Get all keys for tag
                 tag_key = f"tag:{key_or_tag}"
-                keys = self.client.smembers(tag_key)
-                
-                # Delete all keys and tag set
+                keys = [_text(k) for k in self.client.smembers(tag_key)]
+                self.l1.delete_tag(key_or_tag)
+                self.l1.delete(*keys)
+
+                # Delete all keys and tag set; other workers may not know
+                # the tag for keys they loaded from Redis, so send the keys
+                pipe = self.client.pipeline(transaction=False)
                 if keys:
-                    self.client.delete(*keys)
-                self.client.delete(tag_key)
+                    pipe.delete(*keys)
+                pipe.delete(tag_key)
+                self._broadcast(pipe, keys=keys, tags=[key_or_tag])
+                pipe.execute()
             else:
-                self.client.delete(key_or_tag)
+                self.l1.delete(key_or_tag)
+                pipe = self.client.pipeline(transaction=False)
+                pipe.delete(key_or_tag)
+                self._broadcast(pipe, keys=[key_or_tag])
+                pipe.execute()
             return True
         except Exception as e:
             logger.error(f"Cache invalidation error: {str(e)}")
             return False
 
+    def stats(self) -> Dict[str, Any]:
+        """Hit counts and ratios per tier; L2 figures cover L1 misses only"""
+        counts = dict(self._counts)
+        l1_total = counts['l1_hits'] + counts['l1_misses']
+        l2_total = counts['l2_hits'] + counts['l2_misses']
+        counts['l1_hit_ratio'] = counts['l1_hits'] / l1_total if l1_total else 0.0
+        counts['l2_hit_ratio'] = counts['l2_hits'] / l2_total if l2_total else 0.0
+        hits = counts['l1_hits'] + counts['l2_hits']
+        counts['hit_ratio'] = hits / l1_total if l1_total else 0.0
+        counts['l1_size'] = len(self.l1)
+        return counts
+
+    # ---------- Decorator internals ---------- #
+    @staticmethod
+    def _make_key(func, args, kwargs) -> str:
+        # Generate cache key from function name and arguments
+        key_parts = [func.__name__]
+        key_parts.extend(str(arg) for arg in args)
+        key_parts.extend(f"{k}:{v}" for k, v in sorted(kwargs.items()))
+        return ":".join(key_parts)
+
+    @staticmethod
+    def _state(envelope: Any, beta: float) -> str:
+        """FRESH, EARLY (XFetch says refresh now), STALE or MISS"""
+        if not isinstance(envelope, dict) or 'e' not in envelope:
+            return MISS
+        now = time.time()
+        if now >= envelope['e']:
+            return STALE
+        # XFetch: the closer to expiry and the slower the recompute, the
+        # likelier a caller refreshes early, so expiries don't synchronize
+        if beta and envelope['d'] > 0:
+            if now - envelope['d'] * beta * math.log(1.0 - random.random()) >= envelope['e']:
+                return EARLY
+        return FRESH
+
+    def _store(self, key: str, value: Any, delta: float, ttl: Optional[int],
+               stale_ttl: int, tags: Optional[List[str]]):
+        ttl = ttl or self.default_ttl
+        envelope = {'v': value, 'd': delta, 'e': time.time() + ttl}
+        # Redis keeps the value through the stale window after logical expiry
+        self.set(key, envelope, ttl + stale_ttl, tags)
+
+    def _acquire_lock(self, key: str, timeout: float) -> Optional[str]:
+        """Cross-process recompute lock; None if another process holds it"""
+        token = uuid.uuid4().hex
+        try:
+            if self.client.set(f"lock:{key}", token, nx=True, px=int(timeout * 1000)):
+                return token
+            return None
+        except Exception as e:
+            # Without Redis only the in-process single flight applies
+            logger.error(f"Cache lock error: {str(e)}")
+            return token
+
+    def _release_lock(self, key: str, token: str):
+        # Compare-and-delete so an expired lock taken over by another
+        # process isn't released from under it
+        try:
+            with self.client.pipeline() as pipe:
+                pipe.watch(f"lock:{key}")
+                if _text(pipe.get(f"lock:{key}")) == token:
+                    pipe.multi()
+                    pipe.delete(f"lock:{key}")
+                    pipe.execute()
+                else:
+                    pipe.unwatch()
+        except Exception as e:
+            logger.warning(f"Cache lock release error: {str(e)}")
+
+    def _compute(self, key, func, args, kwargs, ttl, stale_ttl, tags, lock_timeout):
+        token = self._acquire_lock(key, lock_timeout)
+        if token is None:
+            # Another process is computing: wait for its result
+            deadline = time.monotonic() + lock_timeout
+            while time.monotonic() < deadline:
+                time.sleep(self.lock_poll_interval)
+                envelope = self.get(key)
+                if self._state(envelope, 0) != MISS:
+                    return envelope['v']
+            logger.warning(f"Timed out waiting for {key}; computing it here")
+        try:
+            started = time.monotonic()
+            value = func(*args, **kwargs)
+            self._store(key, value, time.monotonic() - started, ttl, stale_ttl, tags)
+            return value
+        finally:
+            if token:
+                self._release_lock(key, token)
+
+    async def _compute_async(self, key, func, args, kwargs, ttl, stale_ttl, tags, lock_timeout):
+        token = self._acquire_lock(key, lock_timeout)
+        if token is None:
+            deadline = time.monotonic() + lock_timeout
+            while time.monotonic() < deadline:
+                await asyncio.sleep(self.lock_poll_interval)
+                envelope = self.get(key)
+                if self._state(envelope, 0) != MISS:
+                    return envelope['v']
+            logger.warning(f"Timed out waiting for {key}; computing it here")
+        try:
+            started = time.monotonic()
+            value = await func(*args, **kwargs)
+            self._store(key, value, time.monotonic() - started, ttl, stale_ttl, tags)
+            return value
+        finally:
+            if token:
+                self._release_lock(key, token)
+
+    def _claim_refresh(self, key: str) -> bool:
+        with self._flight_lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def _refresh(self, key, func, args, kwargs, ttl, stale_ttl, tags, lock_timeout):
+        try:
+            token = self._acquire_lock(key, lock_timeout)
+            if token is None:
+                return                       # another process is refreshing it
+            try:
+                started = time.monotonic()
+                value = func(*args, **kwargs)
+                self._store(key, value, time.monotonic() - started, ttl, stale_ttl, tags)
+            finally:
+                self._release_lock(key, token)
+        except Exception as e:
+            logger.error(f"Cache refresh error for {key}: {str(e)}")
+        finally:
+            with self._flight_lock:
+                self._refreshing.discard(key)
+
+    async def _refresh_async(self, key, func, args, kwargs, ttl, stale_ttl, tags, lock_timeout):
+        try:
+            token = self._acquire_lock(key, lock_timeout)
+            if token is None:
+                return
+            try:
+                started = time.monotonic()
+                value = await func(*args, **kwargs)
+                self._store(key, value, time.monotonic() - started, ttl, stale_ttl, tags)
+            finally:
+                self._release_lock(key, token)
+        except Exception as e:
+            logger.error(f"Cache refresh error for {key}: {str(e)}")
+        finally:
+            with self._flight_lock:
+                self._refreshing.discard(key)
+
+    def _refresh_in_background(self, key, func, args, kwargs, *options):
+        if not self._claim_refresh(key):
+            return
+        with self._flight_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='cache-refresh')
+        self._executor.submit(self._refresh, key, func, args, kwargs, *options)
+
     def cached(self, ttl: Optional[int] = None,
-              tags: Optional[List[str]] = None):
-        \"\"\"Decorator for caching function results\"\"\"
-        def decorator(func):
-            @wraps(func)
-            def wrapper(*args, **kwargs):
-                # Generate cache key from function name and arguments
-                key_parts = [func.__name__]
-                key_parts.extend(str(arg) for arg in args)
-                key_parts.extend(f"{k}:{v}" for k, v in sorted(kwargs.items()))
-                cache_key = ":".join(key_parts)
-
-                # Try to get from cache
-                cached_value = self.get(cache_key)
-                if cached_value is not None:
-                    return cached_value
-
-                # If not in cache, execute function and cache result
-                result = func(*args, **kwargs)
-                self.set(cache_key, result, ttl, tags)
-                return result
-            return wrapper
-        return decorator""",
+              tags: Optional[List[str]] = None,
+              stale_ttl: int = 0,
+              beta: float = 1.0,
+              lock_timeout: float = 30.0):
+        """Decorator for caching function results
 
-  "cache_integration_guidance": """### Integrating the Cache Layer
+        Args:
+            ttl: Seconds a result is fresh
+            tags: Tags for invalidation
+            stale_ttl: Seconds after expiry during which the stale result is
+                still served while one worker refreshes it in the background
+            beta: XFetch aggressiveness for probabilistic early refresh
+                (0 disables it)
+            lock_timeout: Upper bound on a recompute; also how long callers
+                wait for another process's recompute before doing it themselves
 
-1. **Service Layer Integration**
+        A miss is computed once: concurrent callers in this process wait for
+        the first, and other processes wait on a Redis lock. Coroutine
+        functions are awaited and their results cached.
+        """
+        options = (ttl, stale_ttl, tags, lock_timeout)
 
-```python
-# Example integration in program_service.py
-from core.cache import CacheManager
+        def decorator(func):
+            if asyncio.iscoroutinefunction(func):
+                @wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    cache_key = self._make_key(func, args, kwargs)
+                    envelope = self.get(cache_key)
+                    state = self._state(envelope, beta)
+                    if state == FRESH:
+                        return envelope['v']
+                    if state != MISS:
+                        if self._claim_refresh(cache_key):
+                            task = asyncio.ensure_future(
+                                self._refresh_async(cache_key, func, args, kwargs, *options))
+                            self._tasks.add(task)
+                            task.add_done_callback(self._tasks.discard)
+                        return envelope['v']
 
-class ProgramService:
-    def __init__(self):
-        self.cache = CacheManager()
+                    loop_key = (id(asyncio.get_running_loop()), cache_key)
+                    leader = self._async_inflight.get(loop_key)
+                    if leader is not None:
+                        return await asyncio.shield(leader)
+                    leader = asyncio.ensure_future(
+                        self._compute_async(cache_key, func, args, kwargs, *options))
+                    self._async_inflight[loop_key] = leader
+                    try:
+                        return await asyncio.shield(leader)
+                    finally:
+                        if leader.done():
+                            self._async_inflight.pop(loop_key, None)
+                        else:
+                            leader.add_done_callback(lambda _: self._async_inflight.pop(loop_key, None))
+                return async_wrapper
 
-    @cache.cached(ttl=3600, tags=['programs'])
-    def get_program(self, program_id: str):
-        # Existing logic to fetch program
-        pass
-
-    def update_program(self, program_id: str, data: dict):
-        # Update program
-        result = self._do_update(program_id, data)
-        # Invalidate cache
-        self.cache.invalidate('programs', is_tag=True)
-        return result
-```
-
-2. **API Endpoint Integration**
-
-```python
-# Example FastAPI endpoint with caching
-from fastapi import APIRouter, Depends
-from core.cache import CacheManager
-
-router = APIRouter()
-cache = CacheManager()
-
-@router.get("/programs/{program_id}")
-@cache.cached(ttl=1800, tags=['programs'])
-async def get_program(program_id: str):
-    # Existing endpoint logic
-    pass
-```
-
-3. **Best Practices**
-
-- Use consistent tag naming across related endpoints
-- Set appropriate TTLs based on data volatility
-- Invalidate cache on write operations
-- Handle cache failures gracefully
-- Monitor cache hit/miss rates""",
-
-  "index_config_schema": """{
-  "$schema": "http://json-schema.org/draft-07/schema#",
-  "type": "object",
-  "properties": {
-    "indexes": {
-      "type": "array",
-      "items": {
-        "type": "object",
-        "properties": {
-          "name": {
-            "type": "string",
-            "description": "Name of the index"
-          },
-          "collection": {
-            "type": "string",
-            "description": "Collection/table to index"
-          },
-          "fields": {
-            "type": "array",
-            "items": {
-              "type": "object",
-              "properties": {
-                "field": {
-                  "type": "string",
-                  "description": "Field name to index"
-                },
-                "type": {
-                  "type": "string",
-                  "enum": ["ascending", "descending", "text", "hashed"],
-                  "description": "Type of index"
-                },
-                "weight": {
-                  "type": "integer",
-                  "minimum": 1,
-                  "description": "Text index weight (optional)"
-                }
-              },
-              "required": ["field", "type"]
-            }
-          },
-          "options": {
-            "type": "object",
-            "properties": {
-              "unique": {
-                "type": "boolean",
-                "default": false
-              },
-              "sparse": {
-                "type": "boolean",
-                "default": false
-              },
-              "expireAfterSeconds": {
-                "type": "integer",
-                "minimum": 0
-              }
-            }
-          }
-        },
-        "required": ["name", "collection", "fields"]
-      }
-    }
-  },
-  "required": ["indexes"]
-}""",
-
-  "execution_logs": {
-    "run_code_output": "No code execution needed - implementation code and schema generated successfully"
-  }
-}
-```
-
-The generated solution provides:
-
-1. A robust CacheManager class that:
-- Handles Redis interactions with error handling
-- Supports TTL and tag-based caching
-- Includes a decorator for easy function result caching
-- Provides methods for cache invalidation
-
-2. Integration guidance showing:
-- How to integrate with services
-- How to use with FastAPI endpoints
-- Best practices for cache management
-
-3. A comprehensive JSON schema for index configuration that:
-- Supports multiple index types
-- Allows for complex index configurations
-- Includes options for unique/sparse indexes
-- Supports text index weights
-
-The implementation follows best practices for caching and provides flexibility for different use cases.
\ No newline at end of file
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                cache_key = self._make_key(func, args, kwargs)
+                envelope = self.get(cache_key)
+                state = self._state(envelope, beta)
+                if state == FRESH:
+                    return envelope['v']
+                if state != MISS:
+                    self._refresh_in_background(cache_key, func, args, kwargs, *options)
+                    return envelope['v']
+
+                with self._flight_lock:
+                    flight = self._inflight.get(cache_key)
+                    is_leader = flight is None
+                    if is_leader:
+                        flight = self._inflight[cache_key] = Future()
+                if not is_leader:
+                    return flight.result()
+                try:
+                    result = self._compute(cache_key, func, args, kwargs, *options)
+                    flight.set_result(result)
+                    return result
+                except BaseException as e:
+                    flight.set_exception(e)
+                    raise
+                finally:
+                    with self._flight_lock:
+                        self._inflight.pop(cache_key, None)
+            return wrapper
+        return decorator
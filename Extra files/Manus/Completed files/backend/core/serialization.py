@@ -0,0 +1,117 @@
+# backend/core/serialization.py
+"""Serializers for cached values.
+
+Every payload starts with a one-byte header naming its codec (high bit
+set when zlib-compressed), so values stay readable after the codec
+configuration changes. Payloads starting with printable text are read as
+plain JSON, which is what CacheManager stored before headers existed.
+
+Only the codecs a reader is configured with are decoded; a payload with
+any other header is refused. Pickle runs arbitrary code on load: only
+configure it for keys in a Redis that nothing untrusted can write to.
+"""
+from typing import Any, Dict, Iterable, Mapping, Optional
+import json
+import logging
+import pickle
+import zlib
+
+try:
+    import msgpack
+except ImportError:  # optional dependency
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+COMPRESSED = 0x80
+
+
+class Serializer:
+    """Codec for cache values; `compress_threshold` enables zlib above that size"""
+    codec_id = 0
+
+    def __init__(self, compress_threshold: Optional[int] = None, compress_level: int = 1):
+        self.compress_threshold = compress_threshold
+        self.compress_level = compress_level
+
+    def encode(self, value: Any) -> bytes:
+        raise NotImplementedError
+
+    def decode(self, data: bytes) -> Any:
+        raise NotImplementedError
+
+    def dumps(self, value: Any) -> bytes:
+        data = self.encode(value)
+        header = self.codec_id
+        if self.compress_threshold is not None and len(data) >= self.compress_threshold:
+            data = zlib.compress(data, self.compress_level)
+            header |= COMPRESSED
+        return bytes((header,)) + data
+
+
+class JsonSerializer(Serializer):
+    codec_id = 0x01
+
+    def encode(self, value: Any) -> bytes:
+        return json.dumps(value, separators=(',', ':')).encode('utf-8')
+
+    def decode(self, data: bytes) -> Any:
+        return json.loads(data)
+
+
+class PickleSerializer(Serializer):
+    """Pickle protocol 5: fast and handles arbitrary Python objects"""
+    codec_id = 0x02
+
+    def encode(self, value: Any) -> bytes:
+        return pickle.dumps(value, protocol=5)
+
+    def decode(self, data: bytes) -> Any:
+        return pickle.loads(data)
+
+
+class MsgpackSerializer(Serializer):
+    """Compact binary encoding of JSON-like values (needs the msgpack package)"""
+    codec_id = 0x03
+
+    def __init__(self, *args, **kwargs):
+        if msgpack is None:
+            raise ImportError("msgpack package not installed")
+        super().__init__(*args, **kwargs)
+
+    def encode(self, value: Any) -> bytes:
+        return msgpack.packb(value, use_bin_type=True)
+
+    def decode(self, data: bytes) -> Any:
+        return msgpack.unpackb(data, raw=False)
+
+
+_JSON_ONLY: Dict[int, Serializer] = {JsonSerializer.codec_id: JsonSerializer()}
+
+
+def decoders_for(serializers: Iterable[Serializer]) -> Dict[int, Serializer]:
+    """Codec id -> serializer for the configured serializers (JSON is always readable)"""
+    decoders = dict(_JSON_ONLY)
+    decoders.update((serializer.codec_id, serializer) for serializer in serializers)
+    return decoders
+
+
+def loads(payload: bytes, decoders: Optional[Mapping[int, Serializer]] = None) -> Any:
+    """Decode a payload written by one of `decoders` (JSON only by default) or legacy JSON text
+
+    Raises:
+        ValueError: If the payload's header names a codec not in `decoders`
+    """
+    if isinstance(payload, str):
+        return json.loads(payload)
+    # JSON text starts with printable ASCII or whitespace; anything else is a header
+    if not payload or 0x20 <= payload[0] < COMPRESSED or payload[0] in b' \t\r\n':
+        return json.loads(payload)
+    codec = payload[0] & ~COMPRESSED
+    decoder = (decoders if decoders is not None else _JSON_ONLY).get(codec)
+    if decoder is None:
+        raise ValueError(f"Cached value uses codec {codec:#04x}, which is not configured")
+    data = payload[1:]
+    if payload[0] & COMPRESSED:
+        data = zlib.decompress(data)
+    return decoder.decode(data)
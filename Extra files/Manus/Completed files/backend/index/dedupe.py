@@ -0,0 +1,367 @@
+# backend/index/dedupe.py
+"""Fuzzy deduplication for the Master Index.
+
+The same merchant shows up once per network plus once more from dorking.
+Entries are blocked two ways so only plausible pairs are ever compared:
+
+* by normalized registrable domain (``www.shop.example.co.uk`` -> ``example.co.uk``)
+* by locality-sensitive hashing of MinHash signatures over name character
+  n-grams: signatures are split into bands, and entries sharing any band
+  land in the same bucket
+
+Candidate pairs are scored with the MinHash estimate of name similarity,
+matches are grouped with union-find, and each cluster is merged into one
+canonical entry that records every source it absorbed. Work is linear in
+the number of entries (plus the capped bucket sizes), not quadratic.
+"""
+import logging
+import re
+import unicodedata
+import zlib
+from datetime import datetime
+from random import Random
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from .models import ProgramIndexEntry, SourceRef
+from .store import MasterIndexStore
+
+logger = logging.getLogger(__name__)
+
+# Common multi-label public suffixes; enough for registrable-domain
+# blocking without pulling in the full public suffix list
+MULTI_LABEL_SUFFIXES = {
+    'co.uk', 'org.uk', 'ac.uk', 'gov.uk', 'me.uk', 'ltd.uk', 'plc.uk',
+    'com.au', 'net.au', 'org.au', 'co.nz', 'org.nz', 'co.jp', 'ne.jp', 'or.jp',
+    'com.br', 'com.mx', 'com.ar', 'com.co', 'com.tr', 'com.sg', 'com.hk', 'com.cn',
+    'co.in', 'co.za', 'co.kr', 'co.id', 'com.my', 'com.ph', 'com.tw', 'com.vn',
+}
+# Hosting platforms where each subdomain is a different merchant
+SHARED_HOSTS = {'myshopify.com', 'blogspot.com', 'wordpress.com', 'wixsite.com', 'squarespace.com'}
+
+NAME_STOPWORDS = {
+    'the', 'inc', 'llc', 'ltd', 'limited', 'gmbh', 'co', 'corp', 'company',
+    'official', 'store', 'shop', 'online', 'affiliate', 'affiliates', 'program', 'programme',
+}
+
+_MERSENNE = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+def registrable_domain(value: Optional[str]) -> Optional[str]:
+    """Lower-cased registrable domain of a host or URL, e.g. ``example.co.uk``"""
+    if not value:
+        return None
+    host = re.sub(r'^[a-z][a-z0-9+.-]*://', '', value.strip().lower())
+    host = host.split('/', 1)[0].split('?', 1)[0].split('@')[-1].split(':', 1)[0].strip('.')
+    labels = [label for label in host.split('.') if label]
+    if len(labels) < 2:
+        return host or None
+    keep = 3 if '.'.join(labels[-2:]) in MULTI_LABEL_SUFFIXES else 2
+    domain = '.'.join(labels[-keep:])
+    if domain in SHARED_HOSTS and len(labels) > keep:
+        domain = '.'.join(labels[-keep - 1:])
+    return domain
+
+
+def normalize_name(name: Optional[str]) -> str:
+    """Accent-, case- and punctuation-insensitive name without corporate noise words"""
+    if not name:
+        return ''
+    text = unicodedata.normalize('NFKD', name)
+    text = ''.join(c for c in text if not unicodedata.combining(c)).lower()
+    text = text.replace('&', ' and ')
+    words = re.findall(r'[a-z0-9]+', text)
+    return ' '.join(w for w in words if w not in NAME_STOPWORDS)
+
+
+def name_shingles(name: str, n: int = 3) -> Set[str]:
+    """Character n-grams of a normalized name (spaces removed)"""
+    compact = name.replace(' ', '')
+    if len(compact) <= n:
+        return {compact} if compact else set()
+    return {compact[i:i + n] for i in range(len(compact) - n + 1)}
+
+
+class MinHasher:
+    """MinHash signatures with `num_perm` universal hash functions"""
+
+    def __init__(self, num_perm: int = 32, seed: int = 1):
+        rng = Random(seed)
+        self.params = [(rng.randrange(1, _MERSENNE), rng.randrange(0, _MERSENNE))
+                       for _ in range(num_perm)]
+
+    def signature(self, shingles: Iterable[str]) -> Optional[Tuple[int, ...]]:
+        hashes = [zlib.crc32(s.encode()) for s in shingles]
+        if not hashes:
+            return None
+        return tuple(
+            min(((a * h + b) % _MERSENNE) & _MAX_HASH for h in hashes)
+            for a, b in self.params
+        )
+
+
+def similarity(a: Optional[Tuple[int, ...]], b: Optional[Tuple[int, ...]]) -> float:
+    """MinHash estimate of the Jaccard similarity of two signatures"""
+    if a is None or b is None:
+        return 0.0
+    return sum(x == y for x, y in zip(a, b)) / len(a)
+
+
+class _UnionFind:
+    """Union-find whose sets refuse to join across conflicting domains or networks.
+
+    Two entries listed by the same network under different merchant ids, or
+    with different registrable domains, are distinct merchants however
+    similar their names; checking this per set (not per pair) stops chains
+    of near-matches from collapsing unrelated merchants together.
+    """
+
+    def __init__(self):
+        self.parent: Dict[str, str] = {}
+        self.domains: Dict[str, Set[str]] = {}
+        self.networks: Dict[str, Set[str]] = {}
+
+    def add(self, x: str, domain: Optional[str], networks: FrozenSet[str]) -> None:
+        if x not in self.parent:
+            self.parent[x] = x
+            self.domains[x] = {domain} if domain else set()
+            self.networks[x] = set(networks)
+
+    def find(self, x: str) -> str:
+        root = x
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while x != root:                           # path compression
+            self.parent[x], x = root, self.parent[x]
+        return root
+
+    def union(self, a: str, b: str) -> bool:
+        ra, rb = self.find(a), self.find(b)
+        if ra == rb:
+            return True
+        domains = self.domains[ra] | self.domains[rb]
+        if len(domains) > 1 or not self.networks[ra].isdisjoint(self.networks[rb]):
+            return False
+        if len(self.networks[ra]) < len(self.networks[rb]):
+            ra, rb = rb, ra
+        self.parent[rb] = ra
+        self.domains[ra] = domains
+        self.networks[ra] |= self.networks.pop(rb)
+        del self.domains[rb]
+        return True
+
+
+class DedupeEngine:
+    """Blocking + MinHash/LSH candidate generation and pair scoring.
+
+    Entries are registered with `add`; `candidates` returns keys sharing a
+    domain block or an LSH bucket, and `is_match` decides a pair:
+
+    * same registrable domain: match unless both names are present and
+      clearly different (similarity below `domain_name_threshold`)
+    * otherwise: names at least `name_threshold` similar, and domains
+      compatible (same leading label, or one side has no domain)
+
+    `cluster` additionally never groups two different registrable domains,
+    or two listings from the same network, into one cluster.
+    Buckets larger than `max_bucket_size` are too generic to be useful and
+    are not expanded into pairs.
+    """
+
+    def __init__(self, num_perm: int = 32, bands: int = 8,
+                 name_threshold: float = 0.7,
+                 domain_name_threshold: float = 0.3,
+                 max_bucket_size: int = 50,
+                 ngram: int = 3):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.hasher = MinHasher(num_perm)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.name_threshold = name_threshold
+        self.domain_name_threshold = domain_name_threshold
+        self.max_bucket_size = max_bucket_size
+        self.ngram = ngram
+
+        self._features: Dict[str, Tuple[Optional[str], Optional[Tuple[int, ...]], FrozenSet[str]]] = {}
+        self._domain_blocks: Dict[str, Set[str]] = {}
+        self._lsh_buckets: Dict[Tuple[int, Tuple[int, ...]], Set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._features)
+
+    def features(self, entry: ProgramIndexEntry):
+        domain = registrable_domain(entry.domain)
+        shingles = name_shingles(normalize_name(entry.name), self.ngram)
+        # Networks this entry is listed on, including those of merged sources
+        refs = entry.provenance or [entry]
+        networks = frozenset(r.network for r in refs if r.network and r.merchant_id)
+        return domain, self.hasher.signature(shingles), networks
+
+    def _bands(self, signature: Tuple[int, ...]):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows]
+
+    def add(self, key: str, entry: ProgramIndexEntry) -> None:
+        self.remove(key)
+        domain, signature, _ = self._features[key] = self.features(entry)
+        if domain:
+            self._domain_blocks.setdefault(domain, set()).add(key)
+        if signature:
+            for bucket in self._bands(signature):
+                self._lsh_buckets.setdefault(bucket, set()).add(key)
+
+    def remove(self, key: str) -> None:
+        features = self._features.pop(key, None)
+        if features is None:
+            return
+        domain, signature, _ = features
+        buckets = [(self._domain_blocks, domain)] if domain else []
+        if signature:
+            buckets += [(self._lsh_buckets, b) for b in self._bands(signature)]
+        for index, bucket in buckets:
+            keys = index.get(bucket)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del index[bucket]
+
+    def candidates(self, key: str) -> Set[str]:
+        domain, signature, _ = self._features[key]
+        blocks = [self._domain_blocks.get(domain, ())] if domain else []
+        if signature:
+            blocks += [self._lsh_buckets.get(b, ()) for b in self._bands(signature)]
+        found = set()
+        for block in blocks:
+            if len(block) <= self.max_bucket_size:
+                found.update(block)
+        found.discard(key)
+        return found
+
+    def is_match(self, a: str, b: str) -> bool:
+        domain_a, sig_a, _ = self._features[a]
+        domain_b, sig_b, _ = self._features[b]
+        if domain_a and domain_a == domain_b:
+            if sig_a is None or sig_b is None:
+                return True
+            return similarity(sig_a, sig_b) >= self.domain_name_threshold
+        if domain_a and domain_b and domain_a.split('.')[0] != domain_b.split('.')[0]:
+            return False
+        return similarity(sig_a, sig_b) >= self.name_threshold
+
+    def _constraints(self, key: str) -> Tuple[Optional[str], FrozenSet[str]]:
+        domain, _, networks = self._features[key]
+        return domain, networks
+
+    def cluster(self, keys: Iterable[str]) -> List[List[str]]:
+        """Groups (size > 1) of matching keys reachable from `keys`"""
+        uf = _UnionFind()
+        for key in keys:
+            uf.add(key, *self._constraints(key))
+            for other in self.candidates(key):
+                if self.is_match(key, other):
+                    uf.add(other, *self._constraints(other))
+                    uf.union(key, other)
+        groups: Dict[str, List[str]] = {}
+        for key in list(uf.parent):
+            groups.setdefault(uf.find(key), []).append(key)
+        return [sorted(group) for group in groups.values() if len(group) > 1]
+
+
+def _canonical_rank(key_entry: Tuple[str, ProgramIndexEntry]):
+    """Prefer network records, then the most complete, then the freshest"""
+    _, entry = key_entry
+    from_network = bool(entry.network and entry.merchant_id)
+    filled = sum(bool(v) for v in (entry.name, entry.domain, entry.country,
+                                   entry.commission_rate, entry.tags))
+    return from_network, filled, entry.last_updated
+
+
+def merge_cluster(members: List[Tuple[str, ProgramIndexEntry]]) -> Tuple[str, ProgramIndexEntry]:
+    """Fold a cluster into (canonical key, canonical entry) with provenance"""
+    members = sorted(members, key=_canonical_rank, reverse=True)
+    canonical_key, canonical = members[0]
+
+    provenance: Dict[str, SourceRef] = {}
+    tags: Dict[str, None] = {}
+    offers, findings = {}, {}
+    fields = {name: getattr(canonical, name) for name in ('name', 'domain', 'country', 'commission_rate')}
+    for key, entry in members:
+        refs = entry.provenance or [SourceRef(
+            key=key, id=entry.id, source=entry.source, network=entry.network,
+            merchant_id=entry.merchant_id, domain=entry.domain,
+        )]
+        for ref in refs:
+            provenance.setdefault(ref.key, ref)
+        tags.update(dict.fromkeys(entry.tags))
+        for offer in entry.offers:
+            offers.setdefault(offer.id, offer)
+        for finding in entry.dorking_findings:
+            findings.setdefault((finding.query, str(finding.url)), finding)
+        for name, value in fields.items():
+            if not value:
+                fields[name] = getattr(entry, name)
+
+    merged = canonical.copy(update=dict(
+        fields,
+        tags=list(tags),
+        offers=list(offers.values()),
+        dorking_findings=list(findings.values()),
+        provenance=list(provenance.values()),
+        last_updated=datetime.utcnow(),
+    ))
+    return canonical_key, merged
+
+
+class Deduplicator:
+    """Runs a DedupeEngine over a MasterIndexStore and merges what it finds.
+
+    `run()` processes the whole store; afterwards `process(keys)` handles
+    newly ingested keys incrementally against the engine's existing blocks
+    (the first `process` call does the full run itself).
+    """
+
+    def __init__(self, store: MasterIndexStore, engine: Optional[DedupeEngine] = None):
+        self.store = store
+        self.engine = engine or DedupeEngine()
+        self._primed = False
+
+    def run(self) -> Dict[str, int]:
+        """Full pass over every entry in the store"""
+        keys = self.store.keys()
+        for key in keys:
+            self.engine.add(key, self.store.get(key))
+        self._primed = True
+        return self._merge(self.engine.cluster(keys), scanned=len(keys))
+
+    def process(self, keys: Iterable[str]) -> Dict[str, int]:
+        """Incremental pass: (re)register `keys` and merge them into matching clusters"""
+        if not self._primed:
+            return self.run()
+        resolved = []
+        for key in dict.fromkeys(self.store.resolve(k) for k in keys):
+            entry = self.store.get(key)
+            if entry is None:
+                self.engine.remove(key)
+                continue
+            self.engine.add(key, entry)
+            resolved.append(key)
+        return self._merge(self.engine.cluster(resolved), scanned=len(resolved))
+
+    def _merge(self, clusters: List[List[str]], scanned: int) -> Dict[str, int]:
+        stats = {'scanned': scanned, 'clusters': 0, 'merged': 0}
+        for cluster in clusters:
+            members = [(k, self.store.get(k)) for k in cluster]
+            members = [(k, e) for k, e in members if e is not None]
+            if len(members) < 2:
+                continue
+            canonical_key, merged = merge_cluster(members)
+            self.store.merge_entries([k for k, _ in members], canonical_key, merged)
+            for key, _ in members:
+                if key != canonical_key:
+                    self.engine.remove(key)
+            self.engine.add(canonical_key, merged)
+            stats['clusters'] += 1
+            stats['merged'] += len(members) - 1
+        logger.info(f"Deduplication: {stats}")
+        return stats
@@ -1,48 +1,177 @@
 # backend/index/ingest.py
-import uuid
+import itertools
+import logging
+import time
 from datetime import datetime
-from typing import Dict, List, Any
+from typing import Callable, Dict, Iterable, List, Any, Optional, Set
+from pydantic import ValidationError
+from .dedupe import Deduplicator
 from .models import ProgramIndexEntry, Offer, DorkingFinding
 from .store import MasterIndexStore
 
 
+# Field order of ProgramIndexEntry, for entries built without validation
+_ENTRY_FIELDS = tuple(ProgramIndexEntry.__fields__)
+
+
 class MasterIndexIngester:
-    """Transforms raw data from external sources and upserts it into the index."""
+    """Transforms raw data from external sources and upserts it into the index.
+
+    With a `deduplicator`, every ingested key is run through its incremental
+    pass, so a merchant arriving from a second network (or from dorking) is
+    merged into the existing canonical entry.
+    """
 
-    def __init__(self, store: MasterIndexStore):
+    def __init__(self, store: MasterIndexStore, deduplicator: Optional[Deduplicator] = None):
         self.store = store
+        self.deduplicator = deduplicator
+        self.logger = logging.getLogger('MasterIndexIngester')
+
+    def _deduplicate(self, keys: List[str]) -> int:
+        """Merge newly ingested keys into matching entries; returns how many were merged away"""
+        if self.deduplicator is None or not keys:
+            return 0
+        return self.deduplicator.process(keys)['merged']
 
     # ---------- Aggregator helpers ---------- #
-    def ingest_skimlinks_merchants(self, merchants: List[Dict[str, Any]]) -> None:
-        """Upsert merchants returned by the Skimlinks API."""
+    def ingest_skimlinks_merchants(self, merchants: List[Dict[str, Any]],
+                                   network: str = 'skimlinks') -> None:
+        """Upsert merchants returned by the Skimlinks API (or another network's in the same shape)."""
+        keys = []
         for m in merchants:
-            entry = self._merchant_to_entry(m)
+            entry = self._merchant_to_entry(m, network)
+            keys.append(self.store.key_for(entry.network, entry.merchant_id, entry.domain))
             self.store.upsert(entry)
+        self._deduplicate(keys)
 
     def ingest_skimlinks_offers(self, merchant_id: str, offers: List[Dict[str, Any]]) -> None:
         """Attach offers to an existing merchant entry (or create if missing)."""
         offer_models = [self._offer_from_skimlinks(o, merchant_id) for o in offers]
         self.store.append_offers(merchant_id, offer_models, network='skimlinks')
 
+    def ingest_skimlinks_merchants_bulk(self, merchants: Iterable[Dict[str, Any]],
+                                        batch_size: int = 5000,
+                                        on_batch: Optional[Callable[[Dict[str, Any]], None]] = None,
+                                        network: str = 'skimlinks') -> List[Dict[str, Any]]:
+        """Upsert merchants from any iterable/stream in batches.
+
+        Each batch is validated field by field against ProgramIndexEntry
+        (accepting and coercing exactly what ingest_skimlinks_merchants
+        would) and the entries are built without re-validation and handed
+        to the store without copying; duplicates within a batch collapse to
+        the last record. Each batch is committed under one store lock.
+        Returns one stats dict per
+        batch (also passed to `on_batch` as it completes); invalid records
+        are counted as rejected and skipped, and `merged` counts entries
+        folded into duplicates by the deduplicator.
+        """
+        merchants = iter(merchants)
+        stats = []
+        for batch_no in itertools.count(1):
+            batch = list(itertools.islice(merchants, batch_size))
+            if not batch:
+                return stats
+            started = time.perf_counter()
+
+            rows = [self._merchant_fields(m, network) for m in batch]
+            invalid = self._validate_rows(rows)
+            rejected = len(invalid)
+            entries = {}
+            now = datetime.utcnow()
+            for position, row in enumerate(rows):
+                if position not in invalid:
+                    entries[row['merchant_id']] = self._entry_from_fields(row, now)
+            keys = []
+            if self.deduplicator is not None:
+                keys = [self.store.key_for(e.network, e.merchant_id, e.domain) for e in entries.values()]
+            counts = self.store.upsert_many(entries.values())
+            counts['merged'] = self._deduplicate(keys)
+
+            elapsed = time.perf_counter() - started
+            stats.append({
+                'batch': batch_no,
+                'received': len(batch),
+                'rejected': rejected,
+                'duplicates': len(batch) - rejected - len(entries),
+                **counts,
+                'seconds': round(elapsed, 4),
+                'records_per_sec': round(len(batch) / elapsed, 1) if elapsed > 0 else 0.0,
+            })
+            if on_batch:
+                on_batch(stats[-1])
+
+    def _validate_rows(self, rows: List[Dict[str, Any]]) -> Set[int]:
+        """Validate ProgramIndexEntry field dicts in place; returns the positions of invalid rows.
+
+        Values already of the field's exact type (str, None where allowed,
+        a list of str) are taken as they are; anything else goes through the
+        model's own field validator, which coerces it or rejects the row.
+        """
+        invalid: Set[int] = set()
+        if not rows:
+            return invalid
+        fields = ProgramIndexEntry.__fields__
+        for name in rows[0]:
+            field = fields[name]
+            is_list = name == 'tags'
+            for position, row in enumerate(rows):
+                value = row[name]
+                if is_list:
+                    if type(value) is list and all(type(v) is str for v in value):
+                        row[name] = list(value)
+                        continue
+                elif type(value) is str or (value is None and field.allow_none):
+                    continue
+                value, errors = field.validate(value, row, loc=name, cls=ProgramIndexEntry)
+                if errors:
+                    if position not in invalid:
+                        invalid.add(position)
+                        self.logger.debug(f"Rejected merchant {row['merchant_id']}: "
+                                          f"{ValidationError([errors], ProgramIndexEntry)}")
+                else:
+                    row[name] = value
+        return invalid
+
+    @staticmethod
+    def _entry_from_fields(row: Dict[str, Any], now: datetime) -> ProgramIndexEntry:
+        """ProgramIndexEntry from validated _merchant_fields without re-validating.
+
+        Same result as ProgramIndexEntry.construct, which spends most of its
+        time looking up the defaults of every field per entry.
+        """
+        entry = ProgramIndexEntry.__new__(ProgramIndexEntry)
+        values = dict(row, offers=[], dorking_findings=[], provenance=[], last_updated=now)
+        object.__setattr__(entry, '__dict__', {name: values[name] for name in _ENTRY_FIELDS})
+        object.__setattr__(entry, '__fields_set__', {*row, 'last_updated'})
+        return entry
+
     # ---------- Google‑dorking helpers ---------- #
     def ingest_dorking_results(self, domain: str, findings: List[Dict[str, Any]]) -> None:
         finding_models = [DorkingFinding(**f) for f in findings]
         self.store.append_dorking(domain, finding_models)
+        self._deduplicate([self.store.key_for(None, None, domain)])
 
     # ---------- Internal adapters ---------- #
-    @staticmethod
-    def _merchant_to_entry(m: Dict[str, Any]) -> ProgramIndexEntry:
+    @classmethod
+    def _merchant_to_entry(cls, m: Dict[str, Any], network: str = 'skimlinks') -> ProgramIndexEntry:
         return ProgramIndexEntry(
-            id=str(uuid.uuid4()),
+            **cls._merchant_fields(m, network),
+            last_updated=datetime.utcnow()
+        )
+
+    @staticmethod
+    def _merchant_fields(m: Dict[str, Any], network: str = 'skimlinks') -> Dict[str, Any]:
+        # An empty id lets the store assign a uuid only to new entries
+        return dict(
+            id='',
             name=m.get('name') or m.get('merchant_name'),
             domain=m.get('domain'),
             merchant_id=str(m.get('id')),
-            network='skimlinks',
+            network=network,
             country=m.get('country'),
             commission_rate=m.get('commission_rate'),
             tags=m.get('tags', []),
-            source='aggregator',
-            last_updated=datetime.utcnow()
+            source='aggregator'
         )
 
     @staticmethod
@@ -22,6 +22,16 @@ class DorkingFinding(BaseModel):
     discovered_at: datetime = Field(default_factory=datetime.utcnow)
 
 
+class SourceRef(BaseModel):
+    """Where a merged entry's data came from."""
+    key: str                                     # store key of the original entry
+    id: str
+    source: str
+    network: Optional[str]
+    merchant_id: Optional[str]
+    domain: Optional[str]
+
+
 class ProgramIndexEntry(BaseModel):
     """The canonical record stored in the Master Index."""
     id: str                                      # internal uuid
@@ -35,4 +45,5 @@ class ProgramIndexEntry(BaseModel):
     offers: List[Offer] = []
     dorking_findings: List[DorkingFinding] = []
     source: str                                  # 'aggregator', 'dorking', ...
+    provenance: List[SourceRef] = []             # set when duplicates were merged into this entry
     last_updated: datetime = Field(default_factory=datetime.utcnow)
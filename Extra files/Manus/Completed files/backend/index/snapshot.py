@@ -0,0 +1,369 @@
+# backend/index/snapshot.py
+"""Columnar, memory-mapped snapshots of the Master Index.
+
+Layout (all integers little-endian, every section 8-byte aligned):
+
+    MAGIC | header length (u64) | header JSON | sections...
+
+Scalar fields are stored column-wise: network, country and commission_rate
+as int32 codes into dictionaries kept in the header (-1 for None), and
+last_updated as float64 epoch seconds. Tags are int32 codes addressed by a
+per-entry offsets column. Keys and ids live in a string section with
+sorted permutations for binary search, and the remaining variable-length
+fields (offers, findings, ...) are one JSON record per entry in the
+append-only blob section. The secondary indexes are written as posting
+lists of row numbers, so opening a snapshot decodes nothing but the header.
+"""
+import json
+import mmap
+import os
+import struct
+from array import array
+from bisect import bisect_left
+from collections.abc import MutableMapping
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+from .models import ProgramIndexEntry
+
+MAGIC = b'MIDXSNP1'
+VERSION = 1
+
+DICT_COLUMNS = ['network', 'country', 'commission_rate']
+# Columns with posting lists (tag is multi-valued)
+INDEXED_COLUMNS = ['network', 'country', 'tag']
+# Fields kept in the per-entry JSON record
+RECORD_FIELDS = {'name', 'domain', 'merchant_id', 'source', 'offers', 'dorking_findings', 'provenance'}
+
+_FORMATS = {
+    'network': 'i', 'country': 'i', 'commission_rate': 'i', 'tag_codes': 'i',
+    'last_updated': 'd',
+    'tag_offsets': 'Q', 'key_offsets': 'Q', 'id_offsets': 'Q', 'record_offsets': 'Q',
+    'key_order': 'I', 'id_order': 'I',
+}
+for _column in INDEXED_COLUMNS:
+    _FORMATS[f'{_column}_postings'] = 'I'
+    _FORMATS[f'{_column}_posting_offsets'] = 'Q'
+
+
+def _epoch(value: datetime) -> float:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def write_snapshot(entries: Iterable[Tuple[str, ProgramIndexEntry]], path: str,
+                   aliases: Optional[Dict[str, str]] = None) -> int:
+    """Write (key, entry) pairs to `path` atomically; returns the entry count.
+
+    `aliases` (merged-away key -> canonical key) is kept in the header.
+    """
+    dictionaries: Dict[str, Dict[str, int]] = {c: {} for c in DICT_COLUMNS + ['tag']}
+    columns = {c: array('i') for c in DICT_COLUMNS}
+    last_updated = array('d')
+    tag_offsets, tag_codes = array('Q', [0]), array('i')
+    key_offsets, id_offsets = array('Q', [0]), array('Q', [0])
+    record_offsets = array('Q', [0])
+    strings, blob = bytearray(), bytearray()
+    keys, ids = [], []
+    postings: Dict[str, List[array]] = {c: [] for c in INDEXED_COLUMNS}
+
+    def code(column: str, value: Optional[str]) -> int:
+        if value is None:
+            return -1
+        codes = dictionaries[column]
+        if value not in codes:
+            codes[value] = len(codes)
+            if column in postings:
+                postings[column].append(array('I'))
+        return codes[value]
+
+    row = 0
+    for key, entry in entries:
+        for column in DICT_COLUMNS:
+            value = code(column, getattr(entry, column))
+            columns[column].append(value)
+            if column in postings and value >= 0:
+                postings[column][value].append(row)
+        last_updated.append(_epoch(entry.last_updated))
+        for tag in dict.fromkeys(entry.tags):
+            value = code('tag', tag)
+            tag_codes.append(value)
+            postings['tag'][value].append(row)
+        tag_offsets.append(len(tag_codes))
+
+        # Keys and ids are interleaved: key_i ends where id_i starts
+        keys.append(key.encode())
+        ids.append(entry.id.encode())
+        strings += keys[-1]
+        key_offsets.append(len(strings))
+        strings += ids[-1]
+        id_offsets.append(len(strings))
+
+        blob += entry.json(include=RECORD_FIELDS).encode()
+        record_offsets.append(len(blob))
+        row += 1
+
+    sections = [(c, columns[c]) for c in DICT_COLUMNS] + [
+        ('last_updated', last_updated),
+        ('tag_offsets', tag_offsets), ('tag_codes', tag_codes),
+        ('key_offsets', key_offsets), ('id_offsets', id_offsets),
+        ('record_offsets', record_offsets),
+        ('key_order', array('I', sorted(range(row), key=keys.__getitem__))),
+        ('id_order', array('I', sorted(range(row), key=ids.__getitem__))),
+    ]
+    for column in INDEXED_COLUMNS:
+        offsets, rows = array('Q', [0]), array('I')
+        for posting in postings[column]:
+            rows.extend(posting)
+            offsets.append(len(rows))
+        sections += [(f'{column}_postings', rows), (f'{column}_posting_offsets', offsets)]
+    sections += [('strings', strings), ('blob', blob)]
+
+    # Section offsets depend on the header length, so lay out relative
+    # positions first and shift them once the header size is known
+    relative, position = {}, 0
+    for name, data in sections:
+        size = len(data) * (data.itemsize if isinstance(data, array) else 1)
+        relative[name] = (position, size)
+        position += size + (-size % 8)
+
+    header = {
+        'version': VERSION,
+        'count': row,
+        'dictionaries': {c: list(d) for c, d in dictionaries.items()},
+        'aliases': aliases or {},
+        'sections': {},
+    }
+    header_bytes = b''
+    # Offsets change the header length; repeat until the layout is stable
+    while True:
+        base = len(MAGIC) + 8 + len(header_bytes)
+        base += -base % 8
+        header['sections'] = {n: [base + off, size] for n, (off, size) in relative.items()}
+        encoded = json.dumps(header).encode()
+        stable = len(encoded) == len(header_bytes)
+        header_bytes = encoded
+        if stable:
+            break
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<Q', len(header_bytes)))
+        f.write(header_bytes)
+        f.write(b'\0' * (-f.tell() % 8))
+        for name, data in sections:
+            f.write(data.tobytes() if isinstance(data, array) else bytes(data))
+            f.write(b'\0' * (-f.tell() % 8))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return row
+
+
+class _SortedStrings(Sequence):
+    """Strings in sort order, decoded on access, for bisect"""
+
+    def __init__(self, order: memoryview, getter):
+        self.order = order
+        self.getter = getter
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    def __getitem__(self, i):
+        return self.getter(self.order[i])
+
+
+class Snapshot:
+    """Read-only view over a snapshot file; columns are memoryviews into the mmap"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._views = {}
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a Master Index snapshot")
+        (header_len,) = struct.unpack_from('<Q', self._mmap, len(MAGIC))
+        start = len(MAGIC) + 8
+        header = json.loads(self._mmap[start:start + header_len])
+        if header['version'] != VERSION:
+            self.close()
+            raise ValueError(f"Unsupported snapshot version {header['version']}")
+
+        self.count: int = header['count']
+        self.dictionaries: Dict[str, List[str]] = header['dictionaries']
+        self.aliases: Dict[str, str] = header.get('aliases', {})
+        self._codes = {c: {v: i for i, v in enumerate(values)}
+                       for c, values in self.dictionaries.items()}
+        buffer = memoryview(self._mmap)
+        for name, (offset, size) in header['sections'].items():
+            view = buffer[offset:offset + size]
+            self._views[name] = view.cast(_FORMATS[name]) if name in _FORMATS else view
+        buffer.release()
+
+        self._sorted_keys = _SortedStrings(self._views['key_order'], self._key_bytes)
+        self._sorted_ids = _SortedStrings(self._views['id_order'], self._id_bytes)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _key_bytes(self, row: int) -> bytes:
+        views = self._views
+        return bytes(views['strings'][views['id_offsets'][row]:views['key_offsets'][row + 1]])
+
+    def _id_bytes(self, row: int) -> bytes:
+        views = self._views
+        return bytes(views['strings'][views['key_offsets'][row + 1]:views['id_offsets'][row + 1]])
+
+    def key(self, row: int) -> str:
+        return self._key_bytes(row).decode()
+
+    def entry_id(self, row: int) -> str:
+        return self._id_bytes(row).decode()
+
+    @staticmethod
+    def _find(sorted_strings: _SortedStrings, value: str) -> Optional[int]:
+        target = value.encode()
+        i = bisect_left(sorted_strings, target)
+        if i < len(sorted_strings) and sorted_strings[i] == target:
+            return sorted_strings.order[i]
+        return None
+
+    def find_key(self, key: str) -> Optional[int]:
+        """Row holding `key`, by binary search"""
+        return self._find(self._sorted_keys, key)
+
+    def find_id(self, entry_id: str) -> Optional[int]:
+        return self._find(self._sorted_ids, entry_id)
+
+    def value(self, column: str, row: int) -> Optional[str]:
+        code = self._views[column][row]
+        return None if code < 0 else self.dictionaries[column][code]
+
+    def tags(self, row: int) -> List[str]:
+        offsets = self._views['tag_offsets']
+        names = self.dictionaries['tag']
+        return [names[c] for c in self._views['tag_codes'][offsets[row]:offsets[row + 1]]]
+
+    def postings(self, column: str, value: str) -> Sequence[int]:
+        """Ascending rows whose `column` (network, country or tag) equals `value`"""
+        code = self._codes[column].get(value)
+        if code is None:
+            return ()
+        offsets = self._views[f'{column}_posting_offsets']
+        return self._views[f'{column}_postings'][offsets[code]:offsets[code + 1]]
+
+    def entry(self, row: int) -> ProgramIndexEntry:
+        """Materialize one entry"""
+        offsets = self._views['record_offsets']
+        record = json.loads(bytes(self._views['blob'][offsets[row]:offsets[row + 1]]))
+        record.update(
+            id=self.entry_id(row),
+            network=self.value('network', row),
+            country=self.value('country', row),
+            commission_rate=self.value('commission_rate', row),
+            tags=self.tags(row),
+            last_updated=datetime.utcfromtimestamp(self._views['last_updated'][row]),
+        )
+        return ProgramIndexEntry.parse_obj(record)
+
+    def close(self):
+        for view in self._views.values():
+            view.release()
+        self._views = {}
+        self._mmap.close()
+        self._file.close()
+
+
+def contains_row(rows: Sequence[int], row: int) -> bool:
+    """Membership test on an ascending posting list"""
+    i = bisect_left(rows, row)
+    return i < len(rows) and rows[i] == row
+
+
+class SnapshotEntries(MutableMapping):
+    """key -> ProgramIndexEntry mapping backed by a Snapshot.
+
+    Rows are materialized (and cached) the first time they are read. Writes
+    go to an in-memory overlay and shadow the snapshot row for that key, so
+    the snapshot's posting lists stay valid for every row not shadowed.
+    """
+
+    def __init__(self, snapshot: Snapshot):
+        self.snapshot = snapshot
+        self._written: Dict[str, ProgramIndexEntry] = {}
+        self._cache: Dict[int, ProgramIndexEntry] = {}
+        self._shadowed: Set[int] = set()
+
+    def row(self, key: str) -> Optional[int]:
+        """Snapshot row still serving `key`, if any"""
+        row = self.snapshot.find_key(key)
+        return None if row is None or row in self._shadowed else row
+
+    def is_shadowed(self, row: int) -> bool:
+        return row in self._shadowed
+
+    def entry_at(self, row: int) -> ProgramIndexEntry:
+        entry = self._cache.get(row)
+        if entry is None:
+            entry = self._cache[row] = self.snapshot.entry(row)
+        return entry
+
+    def __getitem__(self, key: str) -> ProgramIndexEntry:
+        entry = self._written.get(key)
+        if entry is not None:
+            return entry
+        row = self.row(key)
+        if row is None:
+            raise KeyError(key)
+        return self.entry_at(row)
+
+    def __setitem__(self, key: str, entry: ProgramIndexEntry) -> None:
+        row = self.row(key)
+        if row is not None:
+            self._shadowed.add(row)
+            self._cache.pop(row, None)
+        self._written[key] = entry
+
+    def __delitem__(self, key: str) -> None:
+        row = self.row(key)
+        if row is not None:
+            self._shadowed.add(row)
+            self._cache.pop(row, None)
+            self._written.pop(key, None)
+        elif self._written.pop(key, None) is None:
+            raise KeyError(key)
+
+    def __contains__(self, key) -> bool:
+        return key in self._written or self.row(key) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        for row in range(len(self.snapshot)):
+            if row not in self._shadowed:
+                yield self.snapshot.key(row)
+        yield from list(self._written)
+
+    def __len__(self) -> int:
+        return len(self.snapshot) - len(self._shadowed) + len(self._written)
+
+    def values(self):
+        # One pass over the rows instead of a key lookup per entry
+        for row in range(len(self.snapshot)):
+            if row not in self._shadowed:
+                yield self.entry_at(row)
+        yield from list(self._written.values())
+
+    def iter_entries(self) -> Iterator[Tuple[str, ProgramIndexEntry]]:
+        """(key, entry) pairs without caching rows that weren't already loaded"""
+        for row in range(len(self.snapshot)):
+            if row not in self._shadowed:
+                yield self.snapshot.key(row), self._cache.get(row) or self.snapshot.entry(row)
+        yield from list(self._written.items())
+
+    @property
+    def materialized(self) -> int:
+        return len(self._cache) + len(self._written)
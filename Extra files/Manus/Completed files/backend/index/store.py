@@ -1,8 +1,12 @@
 # backend/index/store.py
-from typing import Dict, List, Optional
+import threading
+import uuid
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Set
 from datetime import datetime
 from fastapi.encoders import jsonable_encoder
 from .models import ProgramIndexEntry, Offer, DorkingFinding
+from .snapshot import Snapshot, SnapshotEntries, contains_row, write_snapshot
 
 
 class MasterIndexStore:
@@ -11,65 +15,250 @@ class MasterIndexStore:
     def __init__(self):
         # key = (network, merchant_id)  OR fallback to domain
         self._store: Dict[str, ProgramIndexEntry] = {}
+        self._snapshot: Optional[Snapshot] = None
+        # Writers hold this so batches are applied atomically w.r.t. each other
+        self._lock = threading.RLock()
+
+        # Secondary indexes, kept in step with _store by _index/_unindex
+        self._by_id: Dict[str, str] = {}
+        self._by_network: Dict[str, Set[str]] = {}
+        self._by_country: Dict[str, Set[str]] = {}
+        self._by_tag: Dict[str, Set[str]] = {}
+
+        # Keys merged away by deduplication -> their canonical key, and back
+        self._aliases: Dict[str, str] = {}
+        self._aliased_by: Dict[str, Set[str]] = {}
 
     # ------------ Low‑level helpers ------------ #
     @staticmethod
-    def _make_key(network: Optional[str], merchant_id: Optional[str], domain: Optional[str]) -> str:
+    def _make_key(network: Optional[str], merchant_id: Optional[str], domain: Optional[str],
+                  entry_id: Optional[str] = None) -> str:
         if network and merchant_id:
             return f"{network}:{merchant_id}"
-        return f"domain:{domain.lower()}" if domain else str(id)
+        return f"domain:{domain.lower()}" if domain else f"id:{entry_id}"
+
+    def resolve(self, key: str) -> str:
+        """Canonical key for `key` (differs once duplicates were merged)"""
+        return self._aliases.get(key, key)
+
+    def key_for(self, network: Optional[str], merchant_id: Optional[str], domain: Optional[str],
+                entry_id: Optional[str] = None) -> str:
+        """Key an entry with these fields is (or would be) stored under"""
+        return self.resolve(self._make_key(network, merchant_id, domain, entry_id))
+
+    def _index(self, key: str, entry: ProgramIndexEntry) -> None:
+        self._by_id[entry.id] = key
+        if entry.network:
+            self._by_network.setdefault(entry.network, set()).add(key)
+        if entry.country:
+            self._by_country.setdefault(entry.country, set()).add(key)
+        for tag in entry.tags:
+            self._by_tag.setdefault(tag, set()).add(key)
+
+    def _unindex(self, key: str, entry: ProgramIndexEntry) -> None:
+        if self._by_id.get(entry.id) == key:
+            del self._by_id[entry.id]
+        postings = [(self._by_network, entry.network), (self._by_country, entry.country)]
+        postings += [(self._by_tag, tag) for tag in entry.tags]
+        for index, value in postings:
+            keys = index.get(value)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del index[value]
+
+    def _put(self, key: str, entry: ProgramIndexEntry) -> None:
+        existing = self._store.get(key)
+        if existing is not None:
+            self._unindex(key, existing)
+        self._store[key] = entry
+        self._index(key, entry)
 
     # ------------ CRUD‑like API --------------- #
-    def upsert(self, entry: ProgramIndexEntry) -> None:
-        key = self._make_key(entry.network, entry.merchant_id, entry.domain)
+    def _merge(self, entry: ProgramIndexEntry, now: datetime) -> bool:
+        """Merge `entry` into the store in place; returns True if it was new"""
+        key = self.key_for(entry.network, entry.merchant_id, entry.domain, entry.id)
         existing = self._store.get(key)
         if existing:
             # naive merge – prefer freshest data
             entry.offers = existing.offers or entry.offers
             entry.dorking_findings = existing.dorking_findings or entry.dorking_findings
+            entry.provenance = existing.provenance or entry.provenance
             entry.id = existing.id                         # keep stable uuid
-        self._store[key] = entry.copy(update={'last_updated': datetime.utcnow()})
+        elif not entry.id:
+            entry.id = str(uuid.uuid4())
+        entry.last_updated = now
+        self._put(key, entry)
+        return existing is None
+
+    def upsert(self, entry: ProgramIndexEntry) -> None:
+        with self._lock:
+            self._merge(entry.copy(), datetime.utcnow())
+
+    def upsert_many(self, entries: Iterable[ProgramIndexEntry]) -> Dict[str, int]:
+        """Merge a batch of entries under one lock acquisition.
+
+        Entries are taken over rather than copied, so callers must not reuse
+        them. Entries with an empty id get a uuid only if they are new.
+        """
+        counts = {'inserted': 0, 'updated': 0}
+        now = datetime.utcnow()
+        with self._lock:
+            for entry in entries:
+                counts['inserted' if self._merge(entry, now) else 'updated'] += 1
+        return counts
 
     def append_offers(self, merchant_id: str, offers: List[Offer], network: str) -> None:
-        key = self._make_key(network, merchant_id, None)
-        entry = self._store.get(key)
-        if not entry:
-            # create minimal entry if not present
-            entry = ProgramIndexEntry(id=key, name='', merchant_id=merchant_id, network=network)
-        # de‑duplicate by offer id
-        existing_ids = {o.id for o in entry.offers}
-        entry.offers.extend([o for o in offers if o.id not in existing_ids])
-        entry.last_updated = datetime.utcnow()
-        self._store[key] = entry
+        with self._lock:
+            key = self.resolve(self._make_key(network, merchant_id, None))
+            entry = self._store.get(key)
+            if not entry:
+                # create minimal entry if not present
+                entry = ProgramIndexEntry(id=key, name='', merchant_id=merchant_id, network=network,
+                                          source='aggregator')
+            # de‑duplicate by offer id
+            existing_ids = {o.id for o in entry.offers}
+            entry.offers.extend([o for o in offers if o.id not in existing_ids])
+            entry.last_updated = datetime.utcnow()
+            self._put(key, entry)
 
     def append_dorking(self, domain: str, findings: List[DorkingFinding]) -> None:
-        key = self._make_key(None, None, domain)
-        entry = self._store.get(key)
-        if not entry:
-            entry = ProgramIndexEntry(id=key, name='', domain=domain, network=None, merchant_id=None)
-        entry.dorking_findings.extend(findings)
-        entry.last_updated = datetime.utcnow()
-        self._store[key] = entry
+        with self._lock:
+            key = self.resolve(self._make_key(None, None, domain))
+            entry = self._store.get(key)
+            if not entry:
+                entry = ProgramIndexEntry(id=key, name='', domain=domain, network=None, merchant_id=None,
+                                          source='dorking')
+            entry.dorking_findings.extend(findings)
+            entry.last_updated = datetime.utcnow()
+            self._put(key, entry)
+
+    def merge_entries(self, keys: Iterable[str], canonical_key: str, entry: ProgramIndexEntry) -> None:
+        """Replace the entries at `keys` with one canonical `entry`.
+
+        Later writes addressed to any of the merged keys land on the
+        canonical entry, and the merged entries' ids keep resolving to it.
+        """
+        with self._lock:
+            merged_ids = []
+            for key in keys:
+                existing = self._store.get(key)
+                if existing is None:
+                    continue
+                self._unindex(key, existing)
+                del self._store[key]
+                merged_ids.append(existing.id)
+                if key != canonical_key:
+                    self._alias(key, canonical_key)
+            self._unalias(canonical_key)
+            self._put(canonical_key, entry)
+            for entry_id in merged_ids:
+                self._by_id.setdefault(entry_id, canonical_key)
+
+    def _alias(self, key: str, canonical_key: str) -> None:
+        # Keep aliases flat: whatever pointed at `key` now points at the canonical key
+        moved = self._aliased_by.pop(key, set())
+        moved.add(key)
+        for alias in moved:
+            self._aliases[alias] = canonical_key
+        self._aliased_by.setdefault(canonical_key, set()).update(moved)
+
+    def _unalias(self, key: str) -> None:
+        target = self._aliases.pop(key, None)
+        if target is not None:
+            self._aliased_by[target].discard(key)
 
     # ------------ Query Helpers --------------- #
+    def get(self, key: str) -> Optional[ProgramIndexEntry]:
+        return self._store.get(self.resolve(key))
+
+    def keys(self) -> List[str]:
+        return list(self._store)
+
     def get_by_id(self, entry_id: str) -> Optional[ProgramIndexEntry]:
-        for v in self._store.values():
-            if v.id == entry_id:
-                return v
+        key = self._by_id.get(entry_id)
+        if key is not None:
+            return self._store.get(key)
+        if self._snapshot is not None:
+            row = self._snapshot.find_id(entry_id)
+            if row is not None and not self._store.is_shadowed(row):
+                return self._store.entry_at(row)
         return None
 
     def list(self,
              network: Optional[str] = None,
              country: Optional[str] = None,
-             tag: Optional[str] = None) -> List[ProgramIndexEntry]:
-        results = list(self._store.values())
-        if network:
-            results = [e for e in results if e.network == network]
-        if country:
-            results = [e for e in results if e.country == country]
-        if tag:
-            results = [e for e in results if tag in e.tags]
-        return results
+             tag: Optional[str] = None,
+             limit: Optional[int] = None,
+             offset: int = 0) -> Iterator[ProgramIndexEntry]:
+        """Lazily yield entries matching every given filter.
+
+        Filters are answered from the secondary indexes: the smallest
+        posting set is walked and checked against the others. With a
+        snapshot loaded, its on-disk posting lists cover the rows that
+        haven't been rewritten since.
+        """
+        postings = []
+        for column, index, value in (('network', self._by_network, network),
+                                     ('country', self._by_country, country),
+                                     ('tag', self._by_tag, tag)):
+            if value:
+                rows = self._snapshot.postings(column, value) if self._snapshot else ()
+                postings.append((index.get(value, set()), rows))
+
+        if not postings:
+            entries = iter(self._store.values())
+        else:
+            postings.sort(key=lambda p: len(p[0]) + len(p[1]))
+            entries = self._intersect(postings)
+
+        stop = offset + limit if limit is not None else None
+        return islice(entries, offset, stop)
+
+    def _intersect(self, postings) -> Iterator[ProgramIndexEntry]:
+        (keys, rows), others = postings[0], postings[1:]
+        # Snapshot the (small) driving set so writers can't break iteration
+        for k in list(keys):
+            if all(k in other_keys for other_keys, _ in others) and k in self._store:
+                yield self._store[k]
+        for row in rows:
+            if (not self._store.is_shadowed(row)
+                    and all(contains_row(other_rows, row) for _, other_rows in others)):
+                yield self._store.entry_at(row)
+
+    def __len__(self) -> int:
+        return len(self._store)
+
+    # ------------ Persistence ---------------- #
+    def save_snapshot(self, path: str) -> int:
+        """Persist the index as a columnar snapshot; returns the entry count"""
+        if isinstance(self._store, SnapshotEntries):
+            return write_snapshot(self._store.iter_entries(), path, self._aliases)
+        return write_snapshot(self._store.items(), path, self._aliases)
+
+    @classmethod
+    def from_snapshot(cls, path: str) -> 'MasterIndexStore':
+        """Open a snapshot via mmap.
+
+        Nothing is decoded up front: lookups binary-search the snapshot's
+        key/id columns, filters use its posting lists, and entries are
+        materialized on first access. Entries written afterwards live in
+        memory and are indexed as usual.
+        """
+        store = cls()
+        store._snapshot = Snapshot(path)
+        store._store = SnapshotEntries(store._snapshot)
+        store._aliases = dict(store._snapshot.aliases)
+        for alias, target in store._aliases.items():
+            store._aliased_by.setdefault(target, set()).add(alias)
+        return store
+
+    def close(self) -> None:
+        """Release the snapshot mapping; the store must not be used afterwards"""
+        if self._snapshot is not None:
+            self._store = {}
+            self._snapshot.close()
+            self._snapshot = None
 
     # Convenience JSON‑ready output
     def dump(self) -> List[dict]:
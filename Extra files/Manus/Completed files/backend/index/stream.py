@@ -0,0 +1,239 @@
+# backend/index/stream.py
+"""Streaming ingestion of large JSON / NDJSON aggregator dumps.
+
+Records are parsed incrementally from a file or HTTP body and fed to
+MasterIndexIngester in bounded batches, so memory stays flat regardless of
+dump size. After every committed batch the byte offset just past its last
+record is checkpointed, and a restarted run resumes from there.
+"""
+import codecs
+import json
+import logging
+import os
+import time
+from itertools import groupby, islice
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+from .ingest import MasterIndexIngester
+
+CHUNK_SIZE = 1 << 20
+# A record this large without parsing means the dump is malformed
+MAX_RECORD_CHARS = 64 << 20
+
+# Top-level layouts
+ARRAY = 'array'        # [ {...}, {...} ]
+NDJSON = 'ndjson'      # one object per line (or any whitespace-separated sequence)
+
+# Includes the BOM so a leading one is skipped (and counted as its 3 bytes)
+_WHITESPACE = ' \t\r\n\ufeff'
+
+
+def detect_format(head: bytes) -> str:
+    """ARRAY if the first non-whitespace character opens a list, else NDJSON"""
+    stripped = head.lstrip()
+    if stripped.startswith(codecs.BOM_UTF8):
+        stripped = stripped[len(codecs.BOM_UTF8):].lstrip()
+    return ARRAY if stripped[:1] == b'[' else NDJSON
+
+
+def iter_json_records(chunks: Iterable[bytes], fmt: str,
+                      start_offset: int = 0) -> Iterator[Tuple[Any, int]]:
+    """Yield (record, end_offset) pairs from a byte stream.
+
+    `chunks` must start at byte `start_offset` of the document: either the
+    beginning, or an offset previously yielded here. `end_offset` is the
+    byte offset just past the record and is a valid resume point.
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder('utf-8')()
+    chunks = iter(chunks)
+    buf, pos = '', 0
+    offset = start_offset            # byte offset of buf[pos]
+    opened = start_offset > 0 or fmt != ARRAY
+    eof = False
+
+    def advance(to: int):
+        nonlocal pos, offset
+        segment = buf[pos:to]
+        offset += len(segment) if segment.isascii() else len(segment.encode('utf-8'))
+        pos = to
+
+    while True:
+        # Skip whitespace plus, in arrays, the opening bracket and separators
+        while pos < len(buf):
+            char = buf[pos]
+            if char in _WHITESPACE or (fmt == ARRAY and (char == ',' or (char == '[' and not opened))):
+                opened = opened or char == '['
+                advance(pos + 1)
+            else:
+                break
+
+        if pos < len(buf):
+            if fmt == ARRAY and buf[pos] == ']':
+                return
+            try:
+                record, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof or len(buf) - pos > MAX_RECORD_CHARS:
+                    raise
+            else:
+                # A record ending exactly at the buffer edge may be truncated
+                # (e.g. a bare number), so only trust it once more data arrives
+                if end < len(buf) or eof:
+                    advance(end)
+                    yield record, offset
+                    continue
+        elif eof:
+            return
+
+        # Need more data: drop what's consumed and read the next chunk
+        buf, pos = buf[pos:], 0
+        chunk = next(chunks, None)
+        if chunk is None:
+            buf += utf8.decode(b'', final=True)
+            eof = True
+        else:
+            buf += utf8.decode(chunk)
+
+
+def file_chunks(path: str, offset: int = 0, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        yield from iter(lambda: f.read(chunk_size), b'')
+
+
+def http_chunks(url: str, offset: int = 0, chunk_size: int = CHUNK_SIZE,
+                headers: Optional[Dict[str, str]] = None) -> Iterator[bytes]:
+    import httpx
+
+    headers = dict(headers or {})
+    if offset:
+        headers['Range'] = f'bytes={offset}-'
+    with httpx.stream('GET', url, headers=headers, timeout=None) as response:
+        response.raise_for_status()
+        if offset and response.status_code != 206:
+            raise RuntimeError(f"{url} ignored the Range header; cannot resume at byte {offset}")
+        yield from response.iter_bytes(chunk_size)
+
+
+class StreamingIngester:
+    """Feeds JSON/NDJSON dumps to a MasterIndexIngester in bounded batches.
+
+    Progress (records/sec) is logged every `progress_interval` seconds and
+    passed to `on_progress`. With `checkpoint_path` set, the resume offset
+    is saved after each committed batch; pair it with
+    MasterIndexStore.save_snapshot so the store survives the crash too.
+    """
+
+    def __init__(self, ingester: MasterIndexIngester,
+                 checkpoint_path: Optional[str] = None,
+                 batch_size: int = 5000,
+                 chunk_size: int = CHUNK_SIZE,
+                 progress_interval: float = 5.0,
+                 on_progress: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self.ingester = ingester
+        self.checkpoint_path = checkpoint_path
+        self.batch_size = batch_size
+        self.chunk_size = chunk_size
+        self.progress_interval = progress_interval
+        self.on_progress = on_progress
+        self.logger = logging.getLogger('StreamingIngester')
+
+    # ---------- Public API ---------- #
+    def ingest_merchants(self, source: str, resume: bool = True) -> Dict[str, Any]:
+        """Stream a merchant dump (path or http(s) URL) into the index"""
+        def apply(records):
+            self.ingester.ingest_skimlinks_merchants_bulk(records, batch_size=len(records))
+        return self._run(source, resume, apply)
+
+    def ingest_offers(self, source: str, merchant_id: Optional[str] = None,
+                      resume: bool = True) -> Dict[str, Any]:
+        """Stream an offer dump; records carry `merchant_id` unless one is given"""
+        def apply(records):
+            key = lambda o: str(o.get('merchant_id', merchant_id))
+            for mid, offers in groupby(records, key=key):
+                self.ingester.ingest_skimlinks_offers(mid, list(offers))
+        return self._run(source, resume, apply)
+
+    # ---------- Internals ---------- #
+    def _load_checkpoint(self, source: str) -> Dict[str, Any]:
+        if not self.checkpoint_path:
+            return {}
+        try:
+            with open(self.checkpoint_path, 'r') as f:
+                checkpoint = json.load(f)
+        except FileNotFoundError:
+            return {}
+        return checkpoint if checkpoint.get('source') == source else {}
+
+    def _save_checkpoint(self, checkpoint: Dict[str, Any]):
+        if not self.checkpoint_path:
+            return
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(checkpoint, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def _chunks(self, source: str, offset: int) -> Iterator[bytes]:
+        if source.startswith(('http://', 'https://')):
+            return http_chunks(source, offset, self.chunk_size)
+        return file_chunks(source, offset, self.chunk_size)
+
+    def _run(self, source: str, resume: bool, apply: Callable) -> Dict[str, Any]:
+        checkpoint = self._load_checkpoint(source) if resume else {}
+        offset = checkpoint.get('offset', 0)
+        records_done = checkpoint.get('records', 0)
+        if checkpoint.get('done'):
+            self.logger.info(f"{source} already ingested ({records_done} records)")
+            return dict(checkpoint, records_this_run=0)
+
+        chunks = self._chunks(source, offset)
+        fmt = checkpoint.get('format')
+        if fmt is None:
+            head = next(chunks, b'')
+            fmt = detect_format(head)
+            chunks = _prepend(head, chunks)
+        if offset:
+            self.logger.info(f"Resuming {source} at byte {offset} ({records_done} records done)")
+
+        started = last_report = time.monotonic()
+        run_records = 0
+        stream = iter_json_records(chunks, fmt, offset)
+        while True:
+            batch = list(islice(stream, self.batch_size))
+            if not batch:
+                break
+            apply([record for record, _ in batch])
+            offset = batch[-1][1]
+            run_records += len(batch)
+            self._save_checkpoint({'source': source, 'format': fmt, 'offset': offset,
+                                   'records': records_done + run_records, 'done': False})
+
+            now = time.monotonic()
+            if now - last_report >= self.progress_interval:
+                last_report = now
+                self._report(source, offset, records_done + run_records, run_records, now - started)
+
+        elapsed = time.monotonic() - started
+        result = {'source': source, 'format': fmt, 'offset': offset,
+                  'records': records_done + run_records, 'done': True}
+        self._save_checkpoint(result)
+        self._report(source, offset, result['records'], run_records, elapsed)
+        return dict(result, records_this_run=run_records)
+
+    def _report(self, source: str, offset: int, records: int, run_records: int, elapsed: float):
+        progress = {
+            'source': source,
+            'offset': offset,
+            'records': records,
+            'records_per_sec': round(run_records / elapsed, 1) if elapsed > 0 else 0.0,
+        }
+        self.logger.info(f"Ingest progress: {progress}")
+        if self.on_progress:
+            self.on_progress(progress)
+
+
+def _prepend(head: bytes, chunks: Iterator[bytes]) -> Iterator[bytes]:
+    if head:
+        yield head
+    yield from chunks
@@ -31,14 +31,18 @@ class ProgramService:
     handling program metrics.
     """
     
-    def __init__(self, db: Session = None):
+    def __init__(self, db: Session = None, dynamic_index=None):
         """
         Initialize the program service.
         
         Args:
             db: Database session
+            dynamic_index: Optional DynamicIndex that records the filter and
+                sort patterns of program listings; once programs are loaded
+                into it, listings are served from it
         """
         self.db = db
+        self.dynamic_index = dynamic_index
         logger.info("ProgramService initialized")
     
     async def get_programs_list(
@@ -94,6 +98,17 @@ class ProgramService:
             
             logger.info(f"Retrieving programs list (page={page}, limit={limit})")
             
+            if self.dynamic_index is not None:
+                params = dict(
+                    page=page, limit=limit, sort=sort, order=order, status=status,
+                    category=category, tag=tag, source=source, search=search,
+                    min_commission=min_commission, max_commission=max_commission,
+                    min_epc=min_epc, min_conversion_rate=min_conversion_rate,
+                )
+                self.dynamic_index.record_query(params)
+                if len(self.dynamic_index):
+                    return self.dynamic_index.list_programs(params)
+            
             # In a real implementation, this would query the database
             # For now, we'll return mock data
             
@@ -0,0 +1,50 @@
+# benchmarks/dedupe_bench.py
+"""Deduplication scaling: time per entry should stay flat as N grows.
+
+Run from this directory:  python -m benchmarks.dedupe_bench [max_entries]
+"""
+import random
+import sys
+import time
+
+from backend.index.dedupe import Deduplicator
+from backend.index.models import ProgramIndexEntry
+from backend.index.store import MasterIndexStore
+
+SYLLABLES = ['ka', 'lo', 'mi', 'ra', 'to', 'ven', 'sol', 'dri', 'pex', 'nu', 'zor', 'bel', 'quin', 'tas']
+NETWORKS = ['skimlinks', 'awin', 'cj', 'impact']
+
+
+def build_store(n: int, duplicate_rate: float = 0.2) -> MasterIndexStore:
+    """n merchants; a share of them re-listed on a second network and via dorking"""
+    rng = random.Random(7)
+    store = MasterIndexStore()
+    i = 0
+    while len(store) < n:
+        word = ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(3, 5)))
+        name = f"{word.title()} {rng.choice(['Outdoor', 'Beauty', 'Tech', 'Home', 'Pets'])}"
+        domain = f"{word}{i}.com"
+        store.upsert(ProgramIndexEntry(id='', name=name, domain=domain, network=rng.choice(NETWORKS),
+                                       merchant_id=str(i), source='aggregator'))
+        if rng.random() < duplicate_rate:
+            store.upsert(ProgramIndexEntry(id='', name=f"{name} Ltd", domain=None, network='second',
+                                           merchant_id=str(i), source='aggregator'))
+            store.append_dorking(f"www.{domain}", [])
+        i += 1
+    return store
+
+
+def main(max_n: int = 100000):
+    n = max_n // 8
+    while n <= max_n:
+        store = build_store(n)
+        started = time.perf_counter()
+        stats = Deduplicator(store).run()
+        elapsed = time.perf_counter() - started
+        print(f"{stats['scanned']:>8} entries  {elapsed:>7.2f} s  {elapsed / stats['scanned'] * 1e6:>7.1f} us/entry"
+              f"  merged {stats['merged']}")
+        n *= 2
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,80 @@
+# benchmarks/index_store_bench.py
+"""Compare indexed MasterIndexStore lookups with the previous full scans.
+
+Run from this directory:  python -m benchmarks.index_store_bench [entries]
+"""
+import random
+import sys
+import time
+
+from backend.index.models import ProgramIndexEntry
+from backend.index.store import MasterIndexStore
+
+NETWORKS = ['skimlinks', 'shareasale', 'awin', 'cj', 'impact']
+COUNTRIES = ['US', 'GB', 'DE', 'FR', 'CA', 'AU', 'NL', 'ES', 'IT', 'SE']
+TAGS = [f"tag{i}" for i in range(200)]
+
+
+def build_store(n: int) -> MasterIndexStore:
+    rng = random.Random(42)
+    store = MasterIndexStore()
+    for i in range(n):
+        store.upsert(ProgramIndexEntry(
+            id=f"uuid-{i}", name=f"Merchant {i}", domain=f"m{i}.com", merchant_id=str(i),
+            network=rng.choice(NETWORKS), country=rng.choice(COUNTRIES),
+            tags=rng.sample(TAGS, 3), source='aggregator'
+        ))
+    return store
+
+
+# Previous implementation, kept here as the baseline
+def scan_get_by_id(store, entry_id):
+    for v in store._store.values():
+        if v.id == entry_id:
+            return v
+    return None
+
+
+def scan_list(store, network=None, country=None, tag=None):
+    results = list(store._store.values())
+    if network:
+        results = [e for e in results if e.network == network]
+    if country:
+        results = [e for e in results if e.country == country]
+    if tag:
+        results = [e for e in results if tag in e.tags]
+    return results
+
+
+def timed(label, fn, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    per_call = (time.perf_counter() - started) / repeat
+    print(f"{label:<40} {per_call * 1e6:>12.1f} us/call")
+    return per_call
+
+
+def main(n: int = 100000):
+    print(f"Building store with {n} entries...")
+    store = build_store(n)
+    target = f"uuid-{n - 1}"
+    filters = {'network': 'awin', 'country': 'GB', 'tag': 'tag7'}
+
+    cases = [
+        ('get_by_id', lambda: scan_get_by_id(store, target), lambda: store.get_by_id(target)),
+        ('list(network, country, tag)', lambda: scan_list(store, **filters),
+         lambda: list(store.list(**filters))),
+        ('list(country) first page of 50', lambda: scan_list(store, country='US')[:50],
+         lambda: list(store.list(country='US', limit=50))),
+        ('list() first page of 50', lambda: scan_list(store)[:50],
+         lambda: list(store.list(limit=50))),
+    ]
+    for name, scan, indexed in cases:
+        before = timed(f"scan    {name}", scan, 5)
+        after = timed(f"indexed {name}", indexed, 50)
+        print(f"{'speedup':<40} {before / after:>12.1f}x")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
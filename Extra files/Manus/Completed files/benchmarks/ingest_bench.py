@@ -0,0 +1,60 @@
+# benchmarks/ingest_bench.py
+"""Merchant ingest throughput: per-record upsert vs the batched bulk path.
+
+GC is paused while timing so both paths are measured on equal footing.
+
+Run from this directory:  python -m benchmarks.ingest_bench [merchants]
+"""
+import gc
+import sys
+import time
+
+from backend.index.ingest import MasterIndexIngester
+from backend.index.store import MasterIndexStore
+
+
+def merchants(n: int):
+    for i in range(n):
+        yield {
+            'id': i, 'name': f"Merchant {i}", 'domain': f"m{i}.com",
+            'country': ('US', 'GB', 'DE')[i % 3], 'commission_rate': '5%',
+            'tags': [f"tag{i % 50}", f"tag{i % 7}"],
+        }
+
+
+def best_of(ingest_method: str, records, repeat: int = 3):
+    """Best insert and update times over `repeat` runs on fresh stores"""
+    insert, update = float('inf'), float('inf')
+    for _ in range(repeat):
+        ingester = MasterIndexIngester(MasterIndexStore())
+        ingest = getattr(ingester, ingest_method)
+        gc.collect()
+        gc.disable()
+        try:
+            started = time.perf_counter()
+            ingest(records)
+            # Second pass measures updates of existing entries
+            middle = time.perf_counter()
+            ingest(records)
+            finished = time.perf_counter()
+        finally:
+            gc.enable()
+        insert, update = min(insert, middle - started), min(update, finished - middle)
+        del ingester
+    return insert, update
+
+
+def main(n: int = 200000):
+    records = list(merchants(n))
+    results = {
+        'per-record': best_of('ingest_skimlinks_merchants', records),
+        'bulk': best_of('ingest_skimlinks_merchants_bulk', records),
+    }
+    for label, (insert, update) in results.items():
+        print(f"{label:<12} insert {n / insert:>9.0f} rec/s   update {n / update:>9.0f} rec/s")
+    before, after = sum(results['per-record']), sum(results['bulk'])
+    print(f"speedup {before / after:.2f}x")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
@@ -0,0 +1,69 @@
+# benchmarks/search_bench.py
+"""Search latency over a synthetic catalogue: p50/p99 per query mix.
+
+Run from this directory:  python -m benchmarks.search_bench [num_programs]
+"""
+import random
+import sys
+import time
+from itertools import accumulate
+
+from affiliate_matrix_developer_enablement.search_index import ProgramSearchIndex
+
+CATEGORIES = ['outdoor', 'beauty', 'tech', 'home', 'pets', 'fashion', 'travel', 'finance', 'toys', 'food']
+NETWORKS = ['awin', 'cj', 'impact', 'skimlinks', 'rakuten', 'shareasale']
+
+
+def vocabulary(rng: random.Random, size: int = 50000):
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    return list(dict.fromkeys(''.join(rng.choice(letters) for _ in range(rng.randint(3, 9)))
+                              for _ in range(size)))
+
+
+def build_index(n: int, seed: int = 3):
+    rng = random.Random(seed)
+    words = vocabulary(rng)
+    # Zipf-like term popularity, as in real catalogue text
+    cum_weights = list(accumulate(1 / (rank + 1) for rank in range(len(words))))
+    index = ProgramSearchIndex()
+    for i in range(n):
+        name = rng.choices(words, cum_weights=cum_weights, k=rng.randint(1, 4))
+        description = rng.choices(words, cum_weights=cum_weights, k=rng.randint(5, 20))
+        categories = rng.sample(CATEGORIES, rng.randint(1, 2))
+        index.add(str(i), ' '.join(name), ' '.join(description), f"https://{name[0]}{i}.com", categories,
+                  facets={'category': categories, 'network': [rng.choice(NETWORKS)]},
+                  ranges={'commission': rng.uniform(1, 30), 'cookie_duration': rng.choice([1, 7, 30, 60, 90])})
+    return index, words
+
+
+def percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+def main(n: int = 1000000, queries: int = 500):
+    started = time.perf_counter()
+    index, words = build_index(n)
+    print(f"indexed {n} programs in {time.perf_counter() - started:.1f} s")
+
+    rng = random.Random(11)
+    mixes = {
+        'common term': lambda: dict(query=rng.choice(words[:20])),
+        'two terms': lambda: dict(query=f"{rng.choice(words[:200])} {rng.choice(words[:2000])}"),
+        'rare + common': lambda: dict(query=f"{rng.choice(words[:20])} {rng.choice(words[5000:])}"),
+        'prefix': lambda: dict(query=rng.choice(words[:5000])[:3], prefix=True),
+        'filtered': lambda: dict(query=rng.choice(words[:200]), categories=[rng.choice(CATEGORIES)],
+                                 networks=rng.sample(NETWORKS, 2), min_commission=12.5, min_cookie_duration=30),
+    }
+    for label, make in mixes.items():
+        timings = []
+        for _ in range(queries):
+            kwargs = make()
+            t0 = time.perf_counter()
+            index.search(limit=20, **kwargs)
+            timings.append((time.perf_counter() - t0) * 1000)
+        print(f"{label:>14}: p50 {percentile(timings, 0.5):6.2f} ms  p99 {percentile(timings, 0.99):6.2f} ms")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
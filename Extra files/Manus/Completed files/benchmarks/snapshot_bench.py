@@ -0,0 +1,60 @@
+# benchmarks/snapshot_bench.py
+"""Cold start and memory: rebuilding the Master Index vs opening a snapshot.
+
+Run from this directory:  python -m benchmarks.snapshot_bench [entries]
+"""
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from backend.index.models import Offer
+from backend.index.store import MasterIndexStore
+from benchmarks.index_store_bench import build_store
+
+
+def measure(label, fn, n):
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - started
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<28} {elapsed:>8.2f} s   {current / n:>8.0f} bytes/program")
+    return result, elapsed, current
+
+
+def main(n: int = 100000):
+    def rebuild():
+        store = build_store(n)
+        for i in range(0, n, 10):
+            offers = [Offer(id=f"o{i}-{j}", title='Offer', url=f"https://m{i}.com/{j}") for j in range(3)]
+            store.append_offers(str(i), offers, network=store.get_by_id(f"uuid-{i}").network)
+        return store
+
+    store, rebuild_time, rebuild_mem = measure('rebuild (re-ingest)', rebuild, n)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'index.snap')
+        started = time.perf_counter()
+        store.save_snapshot(path)
+        print(f"{'write snapshot':<28} {time.perf_counter() - started:>8.2f} s   "
+              f"{os.path.getsize(path) / n:>8.0f} bytes/program on disk")
+        del store
+
+        loaded, load_time, load_mem = measure('open snapshot (mmap)', lambda: MasterIndexStore.from_snapshot(path), n)
+        print(f"startup speedup {rebuild_time / load_time:.1f}x, memory reduction {rebuild_mem / load_mem:.1f}x")
+
+        def touch():
+            # A warm-up workload: 1000 lookups plus a filtered page
+            for i in range(0, n, max(n // 1000, 1)):
+                loaded.get_by_id(f"uuid-{i}")
+            return list(loaded.list(network='awin', country='GB', limit=50))
+        measure('1000 lookups + 1 page', touch, n)
+        loaded.close()
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,62 @@
+# tests/core/test_budgeting_system.py
+from decimal import Decimal
+
+import numpy as np
+import pytest
+
+from backend.core.budgeting_system import CENT, BudgetAllocationSystem, to_cents
+from benchmarks.budget_rules_bench import make_table
+
+def to_money(value):
+    return Decimal(int(to_cents(value))) * CENT
+
+def test_batch_matches_single_campaign_evaluation():
+    system = BudgetAllocationSystem()
+    rows, rule_set = make_table(500)
+    batch = system.evaluate_rules_batch(rows, rule_set)
+    columns = {name: [row[name] for row in rows] for name in rows[0]}
+    without_time = lambda results: [{k: v for k, v in r.items() if k != 'timestamp'} for r in results]
+    assert without_time(system.evaluate_rules_batch(columns, rule_set)) == without_time(batch)
+
+    for row, rule, result in zip(rows, rule_set['budget_rules'], batch):
+        single = system.calculate_budget_adjustment(row, rule)
+        assert result['campaign_id'] == single['campaign_id']
+        for key in ('current_budget', 'new_budget', 'total_adjustment'):
+            # Same cents as rounding the exact Decimal result of the per-campaign path
+            assert result[key] == to_money(single[key])
+        assert [(a['metric'], a['reason']) for a in result['adjustments']] == \
+            [(a['metric'], a['reason']) for a in single['adjustments']]
+
+    # Columnar view: cents arrays, and dicts only for the campaigns that change
+    assert batch.new_cents.dtype == np.int64 and len(batch.new_cents) == len(rows)
+    assert [r['campaign_id'] for r in batch.changed()] == \
+        [r['campaign_id'] for r in batch if 'error' not in r and r['new_budget'] != r['current_budget']]
+    assert batch[-1] == batch[len(rows) - 1]
+
+def test_batch_rounding_clamping_and_errors():
+    system = BudgetAllocationSystem()
+    rule_set = {'budget_rules': [
+        {'id': 'r1', 'campaign_id': 'a', 'min_budget': 50, 'max_budget': 1000, 'adjustment_triggers': [
+            {'metric': 'roi', 'threshold': 2.5, 'adjustment_type': 'percentage', 'adjustment_value': 12.345}]},
+        {'id': 'r2', 'campaign_id': 'b', 'min_budget': 50, 'max_budget': 60, 'adjustment_triggers': [
+            {'metric': 'roi', 'threshold': 2.5, 'adjustment_type': 'fixed', 'adjustment_value': 100}]},
+        {'id': 'r3', 'campaign_id': 'zero', 'min_budget': 0, 'max_budget': 10},
+    ]}
+    results = system.evaluate_rules_batch({
+        'campaign_id': ['a', 'b', 'zero', 'orphan'],
+        'current_budget': [100, 55, 0, 10],
+        'roi': [3.0, 3.0, None, 1.0],
+    }, rule_set)
+
+    # 12.345% of 100 is exactly 12.345: rounded half-up to cents despite float noise
+    assert results[0]['adjustments'][0]['amount'] == Decimal('12.35')
+    assert results[0]['new_budget'] == Decimal('112.35')
+    assert results[1]['new_budget'] == Decimal('60.00') and results[1]['total_adjustment'] == Decimal('100.00')
+    assert results[2]['error'] == 'Current budget must be positive'
+    assert results[3]['error'] == 'No budget rule for campaign'
+
+    with pytest.raises(ValueError):
+        system.evaluate_rules_batch([{'campaign_id': 'a', 'current_budget': 1}], [
+            {'id': 'r', 'campaign_id': 'a', 'min_budget': 0, 'max_budget': 1,
+             'adjustment_triggers': [{'metric': 'epc', 'threshold': 1, 'adjustment_type': 'fixed',
+                                      'adjustment_value': 1}]}])
@@ -0,0 +1,256 @@
+# tests/core/test_cache.py
+import asyncio
+import threading
+import time
+
+import fakeredis
+import pytest
+import redis
+
+from backend.core.cache import CacheManager, LocalCache
+from backend.core.serialization import JsonSerializer, PickleSerializer, decoders_for, loads
+
+
+@pytest.fixture
+def server():
+    return fakeredis.FakeServer()
+
+@pytest.fixture
+def make_cache(server):
+    caches = []
+    def make(**kwargs):
+        client = fakeredis.FakeRedis(server=server)
+        cache = CacheManager(client=client, **kwargs)
+        caches.append(cache)
+        return cache
+    yield make
+    for cache in caches:
+        cache.close()
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not met in time"
+        time.sleep(0.01)
+
+def test_l1_serves_hot_keys(make_cache):
+    cache = make_cache()
+    cache.set('program:1', {'name': 'Acme'})
+    cache.l1.clear()
+    assert cache.get('program:1') == {'name': 'Acme'}      # from Redis, fills L1
+    cache.client.set('program:1', '"changed behind our back"')
+    assert cache.get('program:1') == {'name': 'Acme'}      # from L1
+    assert cache.get('missing') is None
+
+    stats = cache.stats()
+    assert (stats['l1_hits'], stats['l1_misses'], stats['l2_hits'], stats['l2_misses']) == (1, 2, 1, 1)
+    assert stats['l1_hit_ratio'] == pytest.approx(1 / 3)
+    assert stats['l2_hit_ratio'] == 0.5
+
+def test_l1_is_bounded_and_respects_redis_ttl(make_cache):
+    cache = make_cache(l1_max_size=2, l1_ttl=60)
+    for i in range(3):
+        cache.set(f'k{i}', i)
+    assert len(cache.l1) == 2
+    cache.client.set('short', '1', ex=1)
+    cache.get('short')
+    expires_at, _ = cache.l1._entries['short']
+    assert expires_at - time.monotonic() <= 1
+
+def test_l1_tag_map_stays_bounded():
+    l1 = LocalCache(max_size=10)
+    for i in range(1000):
+        l1.set(f'k{i}', i, ttl=60, tags=['programs', f'program:{i}'])
+    assert len(l1) == 10
+    assert len(l1._tags['programs']) == 10
+    assert len(l1._tags) == 11 and len(l1._key_tags) == 10
+
+    l1.set('k999', 'retagged', ttl=60, tags=['other'])
+    l1.delete('k998')
+    l1.set('k997', 'short', ttl=0.001, tags=['programs'])
+    time.sleep(0.01)
+    assert l1.get('k997') == (False, None)
+    assert 'program:999' not in l1._tags and 'program:998' not in l1._tags
+    assert l1._tags['programs'] == {f'k{i}' for i in range(990, 997)}
+
+    l1.delete_tag('programs')
+    assert len(l1) == 1 and set(l1._tags) == {'other'}
+
+def test_invalidation_reaches_other_workers(make_cache):
+    worker_a, worker_b = make_cache(), make_cache()
+    worker_a.set('program:1', 'v1', tags=['programs'])
+    worker_a.set('program:2', 'v2', tags=['programs'])
+    assert worker_b.get('program:1') == 'v1' and worker_b.get('program:2') == 'v2'
+
+    # B loaded these from Redis without tag info; the broadcast carries the keys
+    worker_a.invalidate('programs', is_tag=True)
+    wait_for(lambda: len(worker_b.l1) == 0)
+    assert worker_b.get('program:1') is None
+
+    worker_b.set('program:3', 'old')
+    assert worker_a.get('program:3') == 'old'
+    worker_b.set('program:3', 'new')                   # writes invalidate other L1s too
+    wait_for(lambda: worker_a.get('program:3') == 'new')
+    worker_b.invalidate('program:3')
+    wait_for(lambda: worker_a.get('program:3') is None)
+
+def test_redis_errors_degrade_gracefully(make_cache, monkeypatch):
+    cache = make_cache(listen=False)
+    cache.set('k', 1)
+    def outage(*args, **kwargs):
+        raise redis.ConnectionError('down')
+    monkeypatch.setattr(cache.client, 'pipeline', outage)
+    assert cache.get('k') == 1              # still served by L1
+    assert cache.get('other') is None
+    assert cache.set('k', 2) is False
+    assert cache.get('k') is None           # a failed write must not leave a stale L1 value
+
+def test_cached_single_flight_within_process(make_cache):
+    cache = make_cache()
+    calls = []
+
+    @cache.cached(ttl=60)
+    def listing(page):
+        calls.append(page)
+        time.sleep(0.2)
+        return [f'program-{page}']
+
+    threads = [threading.Thread(target=lambda: results.append(listing(1))) for _ in range(8)]
+    results = []
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert calls == [1]
+    assert results == [['program-1']] * 8
+
+def test_cached_waits_for_other_process(make_cache):
+    worker_a, worker_b = make_cache(), make_cache()
+    worker_b.lock_poll_interval = 0.01
+    calls = []
+
+    @worker_b.cached(ttl=60)
+    def listing(page):
+        calls.append(page)
+        return 'computed by b'
+
+    # Worker A holds the recompute lock and publishes its result shortly
+    worker_a.client.set('lock:listing:1', 'a-token', px=5000)
+    def finish():
+        time.sleep(0.1)
+        worker_a._store('listing:1', 'computed by a', 0.1, 60, 0, None)
+    threading.Thread(target=finish).start()
+
+    assert listing(1) == 'computed by a'
+    assert calls == []
+
+def test_stale_while_revalidate_and_early_refresh(make_cache):
+    cache = make_cache()
+    calls = []
+
+    @cache.cached(ttl=60, stale_ttl=300, beta=0)
+    def listing(page):
+        calls.append(page)
+        return f'fresh-{len(calls)}'
+
+    # Logically expired but inside the stale window
+    cache.set('listing:1', {'v': 'stale', 'd': 0.5, 'e': time.time() - 1}, 300)
+    assert listing(1) == 'stale'
+    wait_for(lambda: listing(1) == 'fresh-1')
+    assert calls == [1]
+
+    @cache.cached(ttl=60, beta=1e9)
+    def report(day):
+        calls.append(day)
+        return 'recomputed'
+
+    # Still fresh, but XFetch with a huge beta always refreshes early
+    cache.set('report:mon', {'v': 'cached', 'd': 0.5, 'e': time.time() + 30}, 60)
+    assert report('mon') == 'cached'
+    wait_for(lambda: cache.get('report:mon')['v'] == 'recomputed')
+
+def test_cached_coroutines(make_cache):
+    cache = make_cache()
+    calls = []
+
+    @cache.cached(ttl=60)
+    async def listing(page):
+        calls.append(page)
+        await asyncio.sleep(0.05)
+        return {'page': page}
+
+    async def main():
+        return await asyncio.gather(*[listing(2) for _ in range(5)])
+
+    assert asyncio.run(main()) == [{'page': 2}] * 5
+    assert asyncio.run(listing(2)) == {'page': 2}
+    assert calls == [2]
+    assert cache.get('listing:2')['v'] == {'page': 2}
+
+def test_get_many_and_set_many_use_one_round_trip(make_cache, monkeypatch):
+    writer, reader = make_cache(listen=False), make_cache(listen=False)
+    pipelines = []
+    for cache in (writer, reader):
+        original = cache.client.pipeline
+        monkeypatch.setattr(cache.client, 'pipeline', lambda *a, _o=original, **kw: pipelines.append(1) or _o(*a, **kw))
+
+    page = {f'program:{i}': {'id': i, 'name': f'Program {i}'} for i in range(100)}
+    assert writer.set_many(page, ttl=60, tags=['programs', 'page:1'])
+    assert len(pipelines) == 1
+    assert writer.client.scard('tag:programs') == 100
+
+    pipelines.clear()
+    keys = list(page) + ['program:missing']
+    assert reader.get_many(keys) == page
+    assert len(pipelines) == 1
+    assert reader.get_many(keys) == page              # now all from L1
+    assert len(pipelines) == 2                        # only the missing key went to Redis
+    stats = reader.stats()
+    assert (stats['l1_hits'], stats['l2_hits'], stats['l2_misses']) == (100, 100, 2)
+
+def test_serializer_per_key_prefix(make_cache):
+    cache = make_cache(listen=False, serializers={
+        'programs:': PickleSerializer(compress_threshold=256),
+        'programs:raw:': JsonSerializer(),
+    })
+    listing = [{'id': i, 'name': 'x' * 50, 'tags': ('a', 'b')} for i in range(20)]
+    cache.set('programs:page:1', listing)
+    cache.set('programs:raw:1', {'id': 1})
+    cache.set('other', [1, 2])
+
+    raw = cache.client.get('programs:page:1')
+    assert raw[0] == 0x82 and len(raw) < len(repr(listing))   # pickle + zlib
+    assert cache.client.get('programs:raw:1')[0] == 0x01
+    cache.l1.clear()
+    assert cache.get('programs:page:1') == listing            # tuples survive pickling
+    assert cache.get_many(['programs:raw:1', 'other']) == {'programs:raw:1': {'id': 1}, 'other': [1, 2]}
+
+    # Values written before serializer headers existed are plain JSON text
+    cache.client.set('legacy', '{"name": "Acme"}')
+    assert cache.get('legacy') == {'name': 'Acme'}
+    assert loads(b'"text"') == 'text'
+
+UNPICKLED = []
+
+def record_unpickle():
+    UNPICKLED.append(True)
+
+class Exploit:
+    """Calls record_unpickle when unpickled"""
+    def __reduce__(self):
+        return (record_unpickle, ())
+
+def test_unconfigured_codecs_are_refused(make_cache):
+    cache = make_cache(listen=False)
+    cache.client.set('programs:page:1', PickleSerializer().dumps(Exploit()))
+
+    assert cache.get('programs:page:1') is None
+    assert cache.get_many(['programs:page:1']) == {}
+    assert UNPICKLED == []
+    with pytest.raises(ValueError):
+        loads(PickleSerializer().dumps([1]))
+    assert loads(PickleSerializer().dumps([1]), decoders_for([PickleSerializer()])) == [1]
+
+    # Sanity check: the payload does run code when pickle is configured
+    loads(PickleSerializer().dumps(Exploit()), decoders_for([PickleSerializer()]))
+    assert UNPICKLED == [True]
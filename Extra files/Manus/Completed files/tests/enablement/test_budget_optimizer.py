@@ -0,0 +1,81 @@
+# tests/enablement/test_budget_optimizer.py
+import time
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from affiliate_matrix_developer_enablement.budget_optimizer import change_bounds, water_fill
+from affiliate_matrix_developer_enablement.budgeting_system import (
+    AllocationStrategy, BudgetingSystem, Campaign, PerformanceMetric)
+
+
+def campaign(cid, budget, roi, **kwargs):
+    return Campaign(id=cid, name=cid, affiliate_program_id='p', current_budget=budget,
+                    start_date=datetime(2025, 1, 1), performance={'roi': roi}, **kwargs)
+
+def budgets(allocations):
+    return {a.campaign_id: round(a.new_budget, 6) for a in allocations}
+
+def test_equal_and_proportional_are_special_cases():
+    system = BudgetingSystem(1000.0)
+    system.add_campaign(campaign('a', 100, 0.5))
+    system.add_campaign(campaign('b', 100, 1.0))
+    system.add_campaign(campaign('c', 100, 2.5, max_budget=300))
+    system.add_campaign(campaign('paused', 100, 9.0, status='paused'))
+
+    equal = system.allocate_budget(allocation_strategy=AllocationStrategy.EQUAL)
+    assert budgets(equal) == pytest.approx({'a': 350, 'b': 350, 'c': 300})    # c is capped
+
+    # Proportional to 1 + roi = 1.5 : 2 : 3.5, with c capped at 300 and its excess shared by the rest
+    proportional = budgets(system.allocate_budget(PerformanceMetric.ROI))
+    assert proportional['c'] == pytest.approx(300)
+    assert proportional['a'] == pytest.approx(300) and proportional['b'] == pytest.approx(400)
+    assert sum(proportional.values()) == pytest.approx(1000)
+
+    assert system.allocate_budget(allocation_strategy=AllocationStrategy.MANUAL) == []
+    system.apply_allocations(equal)
+    assert system.get_campaign('a').current_budget == pytest.approx(350)
+    assert len(system.get_allocation_history('a')) == 1
+
+def test_optimizer_respects_bounds_and_rate_limits():
+    system = BudgetingSystem(1000.0, max_change_ratio=0.25, min_campaign_budget=50)
+    system.add_campaign(campaign('star', 250, 3.0))
+    system.add_campaign(campaign('good', 250, 1.0))
+    system.add_campaign(campaign('dud', 250, -0.5))
+    system.add_campaign(campaign('new', 0, 1.0, max_budget=100))
+
+    result = system.optimize_budget_distribution(PerformanceMetric.ROI)
+    new = budgets(result['recommended_allocations'])
+    assert new['star'] == pytest.approx(312.5)           # +25% cap
+    assert new['dud'] == pytest.approx(187.5)            # -25% floor: loses money but can't be cut further
+    assert 50 <= new['new'] <= 100
+    assert sum(new.values()) <= 1000 + 1e-6
+    assert result['optimized_performance'] > result['current_performance']
+    assert result['improvement_percentage'] > 0
+
+def test_water_fill_optimality_and_scale():
+    rng = np.random.default_rng(3)
+    n = 100_000
+    weights = rng.uniform(10, 300, n)
+    saturation = rng.uniform(50, 500, n)
+    lower, upper = change_bounds(rng.uniform(0, 200, n), np.full(n, 5.0), rng.uniform(100, 1000, n), 0.5)
+
+    started = time.perf_counter()
+    spend = water_fill(weights, saturation, lower, upper, 10_000_000.0)
+    assert time.perf_counter() - started < 1.0
+
+    assert spend.sum() == pytest.approx(10_000_000.0)
+    assert (spend >= lower - 1e-9).all() and (spend <= upper + 1e-9).all()
+    # KKT: equal marginal returns inside the bounds, lower at the bounds they hit from above
+    marginal = weights / (saturation + spend)
+    inside = (spend > lower + 1e-6) & (spend < upper - 1e-6)
+    lam = np.median(marginal[inside])
+    assert np.allclose(marginal[inside], lam, rtol=1e-6)
+    free = upper > lower + 1e-6
+    assert (marginal[free & (spend >= upper - 1e-6)] >= lam * (1 - 1e-6)).all()
+    assert (marginal[free & (spend <= lower + 1e-6)] <= lam * (1 + 1e-6)).all()
+
+    # Minimums that don't fit are scaled down to the total
+    assert water_fill(np.ones(2), np.zeros(2), np.array([60.0, 60.0]), np.full(2, np.inf), 100) \
+        == pytest.approx([50, 50])
@@ -0,0 +1,106 @@
+# tests/enablement/test_dynamic_cache.py
+import asyncio
+import random
+
+import pytest
+
+from affiliate_matrix_developer_enablement import dynamic_index
+from affiliate_matrix_developer_enablement.dynamic_index import CacheConfig, DynamicCache, cached
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(dynamic_index.time, 'monotonic', lambda: now[0])
+    return now
+
+def test_lru_lfu_fifo_eviction():
+    def survivors(strategy):
+        cache = DynamicCache(CacheConfig(strategy=strategy, max_size=3))
+        for key in 'abc':
+            cache.set(key, key)
+        cache.get('a')
+        cache.set('d', 'd')
+        first = sorted(cache._cache)
+        cache.get('c'); cache.get('c')
+        cache.set('e', 'e')
+        return first, sorted(cache._cache), cache.get_stats().evictions
+
+    assert survivors('lru') == (['a', 'c', 'd'], ['c', 'd', 'e'], 2)
+    assert survivors('fifo') == (['b', 'c', 'd'], ['c', 'd', 'e'], 2)
+    assert survivors('lfu') == (['a', 'c', 'd'], ['a', 'c', 'e'], 2)
+
+def test_lfu_victim_after_deletes_matches_brute_force():
+    rng = random.Random(3)
+    policy = dynamic_index.LFUPolicy()
+    counts, order = {}, {}
+    for step in range(3000):
+        key = rng.choice('abcdefgh')
+        action = rng.random()
+        if key not in counts:
+            policy.insert(key)
+            counts[key], order[key] = 1, step
+        elif action < 0.2:
+            # Deleting a key can empty the minimum bucket outside an eviction
+            policy.remove(key)
+            del counts[key], order[key]
+        else:
+            policy.touch(key)
+            counts[key] += 1
+            order[key] = step
+        expected = min(counts, key=lambda k: (counts[k], order[k])) if counts else None
+        assert policy.victim() == expected
+
+def test_max_bytes_limit():
+    cache = DynamicCache(CacheConfig(max_bytes=2000))
+    cache.set('small', 'x' * 100)
+    cache.set('big', 'y' * 1500)
+    cache.set('huge', 'z' * 5000)          # larger than the whole cache: not stored
+    assert cache.get('huge') is None
+    cache.set('other', 'w' * 900)          # pushes out the least recently used
+    assert cache.get('small') is None and cache.get('big') is None
+    assert cache.get('other') is not None
+    assert cache.get_stats().bytes <= 2000
+
+def test_ttl_expiry_lazy_and_periodic(clock):
+    cache = DynamicCache(CacheConfig(ttl_seconds=10, cleanup_interval_seconds=30))
+    cache.set('a', 1)
+    cache.set('b', 2, ttl_seconds=100)
+    clock[0] += 11
+    assert cache.get('a') is None                  # lazily expired on access
+    cache.set('c', 3, ttl_seconds=5)
+    clock[0] += 40                                 # next access triggers the periodic purge
+    assert cache.get('b') == 2
+    assert 'c' not in cache._cache
+    assert cache.get_stats().expirations == 2
+
+def test_namespace_clear_and_stats():
+    cache = DynamicCache()
+    cache.set('p1', 1, namespace='programs')
+    cache.set('p2', 2, namespace='programs')
+    cache.set('s1', 3)
+    assert cache.clear('programs') == 2
+    assert cache.get('s1') == 3 and cache.get('p1') is None
+    stats = cache.get_stats()
+    assert (stats.hits, stats.misses, stats.size) == (1, 1, 1)
+    assert stats.hit_rate == 0.5 and stats.avg_lookup_time_ms > 0
+    assert cache.clear() == 1 and len(cache) == 0
+
+def test_cached_decorator_sync_and_async():
+    cache = DynamicCache()
+    calls = []
+
+    @cached(key_prefix='t:', cache=cache)
+    def lookup(x, y=0):
+        calls.append(x)
+        return None if x == 0 else x + y
+
+    @cached(cache=cache)
+    async def alookup(x):
+        calls.append(('async', x))
+        return x * 2
+
+    assert lookup(1, y=2) == 3 and lookup(1, y=2) == 3
+    assert lookup(0) is None and lookup(0) is None     # cached None is a hit
+    assert asyncio.run(alookup(4)) == 8 and asyncio.run(alookup(4)) == 8
+    assert calls == [1, 0, ('async', 4)]
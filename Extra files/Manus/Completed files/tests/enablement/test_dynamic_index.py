@@ -0,0 +1,167 @@
+# tests/enablement/test_dynamic_index.py
+import random
+
+import pytest
+
+from affiliate_matrix_developer_enablement import dynamic_index
+from affiliate_matrix_developer_enablement.dynamic_index import DynamicIndex
+from affiliate_matrix_developer_enablement.master_index import MasterIndex
+from tests.enablement.test_master_index_search import program
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(dynamic_index.time, 'monotonic', lambda: now[0])
+    return now
+
+def make_records(n=500, seed=7):
+    rng = random.Random(seed)
+    return {f'p{i}': {
+        'id': f'p{i}',
+        'category': rng.sample(['retail', 'travel', 'finance', 'beauty', 'tech'], 2),
+        'network': rng.choice(['awin', 'cj', 'impact']),
+        'status': rng.choice(['active', 'active', 'paused']),
+        'commission': {'type': 'percentage', 'value': round(rng.uniform(1, 30), 1)},
+        'epc': rng.choice([None, round(rng.uniform(0, 3), 2)]),
+    } for i in range(n)}
+
+QUERIES = [
+    {'status': 'active', 'category': 'travel', 'sort': 'commission', 'limit': 10},
+    {'network': 'cj', 'min_commission': 10, 'max_commission': 20, 'sort': 'epc', 'order': 'desc'},
+    {'min_epc': 1.5, 'sort': 'commission', 'order': 'asc', 'limit': 5, 'page': 2},
+    {'category': ['beauty', 'tech'], 'status': 'paused'},
+]
+
+def test_indexed_results_match_full_scan():
+    records = make_records()
+    scan = DynamicIndex(analyze_every=10 ** 6)
+    scan.load(records)
+    indexed = DynamicIndex(analyze_every=10 ** 6)
+    indexed.load(records)
+    for field in dynamic_index.INDEXABLE_FIELDS:
+        assert indexed.create_index(field)
+    assert not indexed.create_index('commission', 'hash')
+    assert not indexed.create_index('name')
+
+    for params in QUERIES:
+        plan = indexed.optimize_query(params)
+        assert plan['driving_index'] or plan['sort_index']
+        assert [r['id'] for r in indexed.query(params)] == [r['id'] for r in scan.query(params)]
+
+    # Updates keep the indexes in step and invalidate cached results
+    params = QUERIES[0]
+    indexed.remove(indexed.query(params)[0]['id'])
+    scan.remove(scan.query(params)[0]['id'])
+    indexed.add('new', dict(records['p1'], id='new', status='active', category=['travel'],
+                            commission={'value': 99}))
+    scan.add('new', indexed._records['new'])
+    assert indexed.query(params)[0]['id'] == 'new'
+    assert [r['id'] for r in indexed.query(params)] == [r['id'] for r in scan.query(params)]
+
+    with pytest.raises(ValueError):
+        indexed.query({'search': 'hotel'})
+
+def test_hot_patterns_build_indexes_and_cold_ones_are_dropped(clock):
+    index = DynamicIndex(build_threshold=5, drop_threshold=1, half_life_seconds=60, analyze_every=10)
+    index.load(make_records())
+    for i in range(10):
+        index.query({'category': 'travel', 'min_commission': 5 + i, 'sort': 'commission'})
+    assert {i['field']: i['index_type'] for i in index.list_indexes()} == {
+        'category': 'hash', 'commission': 'sorted'}
+
+    for i in range(20):
+        index.query({'category': 'travel', 'min_commission': 5 + i, 'sort': 'commission'})
+    stats = {i['field']: i for i in index.list_indexes()}
+    assert stats['commission']['hits'] >= 10
+    assert all(s['latency_saved_ms'] >= 0 for s in stats.values())
+
+    # An hour later only network/status traffic is hot: the old indexes go cold
+    clock[0] += 3600
+    for i in range(10):
+        index.record_query({'network': 'cj', 'status': 'active', 'search': f'q{i}'})
+    assert {i['field'] for i in index.list_indexes()} == {'network', 'status'}
+    report = index.analyze_query_patterns(apply=False)
+    assert {f['field'] for f in report['common_fields'][:3]} == {'network', 'status', 'search'}
+
+def test_warm_cache_after_restart():
+    master_a = MasterIndex(dynamic_index=DynamicIndex())
+    for i in range(20):
+        master_a.add_program(program(str(i), f'Program {i}', category=['outdoor' if i % 2 else 'beauty'],
+                                     commission=float(i)))
+    for _ in range(5):
+        master_a.search_programs(categories=['outdoor'], sort_by='commission', limit=3)
+    master_a.search_programs(min_commission=15)
+    state = master_a._dynamic.export_patterns()
+
+    # A fresh process: import the history, then warm before traffic arrives
+    restarted = DynamicIndex()
+    master_b = MasterIndex(dynamic_index=restarted)
+    for i in range(20):
+        master_b.add_program(program(str(i), f'Program {i}', category=['outdoor' if i % 2 else 'beauty'],
+                                     commission=float(i)))
+    restarted.import_patterns(state)
+    top = restarted.top_queries(1)[0]
+    assert top['categories'] == ['outdoor'] and top['sort_by'] == 'commission'
+    assert restarted.warm_cache(top_k=2, loader=master_b.search_programs) == 2
+
+    hits = restarted.cache.get_stats().hits
+    assert [p.id for p in master_b.search_programs(categories=['outdoor'], sort_by='commission', limit=3)] \
+        == ['19', '17', '15']
+    assert restarted.cache.get_stats().hits == hits + 1
+
+def test_search_programs_is_answered_from_built_indexes(monkeypatch):
+    index = DynamicIndex(build_threshold=2.5, analyze_every=3)
+    master, plain = MasterIndex(dynamic_index=index), MasterIndex()
+    for i in range(200):
+        for target in (master, plain):
+            target.add_program(program(str(i), f'Program {i}', category=['Outdoor' if i % 4 else 'beauty'],
+                                       network='cj' if i % 2 else 'awin', commission=float(i % 40)))
+    search = dict(categories=['outdoor'], networks=['cj'], sort_by='commission')
+    for _ in range(3):
+        master.search_programs(min_commission=30, **search)
+    assert {i['field'] for i in index.list_indexes()} == {'category', 'network', 'commission'}
+
+    results = master.search_programs(min_commission=35, **search)
+    assert [p.id for p in results] == [p.id for p in plain.search_programs(min_commission=35, **search)]
+    assert len(results) == 15
+    stats = {i['field']: i for i in index.list_indexes()}
+    assert stats['commission']['hits'] == 1
+    assert stats['commission']['latency_saved_ms'] >= 0
+
+    # A batch of adds invalidates the cached searches once, at the next read
+    cleared = []
+    clear = index.cache.clear
+    monkeypatch.setattr(index.cache, 'clear', lambda namespace=None: cleared.append(namespace) or clear(namespace))
+    for i in range(200, 210):
+        master.add_program(program(str(i), f'Program {i}', category=['outdoor'], network='cj', commission=39.5))
+    assert cleared == []
+    assert master.search_programs(min_commission=35, **search)[0].id == '200'
+    assert cleared == [dynamic_index.CACHE_NAMESPACE]
+
+def test_list_programs_matches_brute_force_filtering():
+    records = make_records()
+    for i, record in enumerate(records.values()):
+        record.update(name=f'Program {i}', tags=['Deal'] if i % 3 else [], source='Feed' if i % 2 else 'manual')
+    index = DynamicIndex(analyze_every=10 ** 6)
+    index.load(records)
+    for field in ('status', 'commission'):
+        assert index.create_index(field)
+
+    params = dict(page=2, limit=7, sort='commission', order='desc', status='ACTIVE',
+                  tag='deal', source='feed', search='program 1', min_commission=5)
+    expected = [r for r in records.values()
+                if r['status'] == 'active' and r['tags'] and r['source'] == 'Feed'
+                and 'Program 1' in r['name'] and r['commission']['value'] >= 5]
+    expected.sort(key=lambda r: r['commission']['value'], reverse=True)
+    result = index.list_programs(params)
+    assert [p['id'] for p in result['data']] == [r['id'] for r in expected[7:14]]
+    assert result['pagination'] == {'page': 2, 'limit': 7, 'total': len(expected),
+                                    'total_pages': (len(expected) + 6) // 7}
+    assert sum(i['hits'] for i in index.list_indexes()) == 1
+
+    # Programs without a sort value come last
+    result = index.list_programs(dict(page=1, limit=500, sort='epc', min_epc=None))
+    epcs = [p['epc'] for p in result['data']]
+    assert None in epcs and epcs[epcs.index(None):] == [None] * (len(epcs) - epcs.index(None))
+    assert epcs[:epcs.index(None)] == sorted(epcs[:epcs.index(None)])
@@ -0,0 +1,95 @@
+# tests/enablement/test_master_index_search.py
+from datetime import datetime
+
+from affiliate_matrix_developer_enablement.master_index import AffiliateProgram, MasterIndex
+from affiliate_matrix_developer_enablement.search_index import ProgramSearchIndex
+from backend.index.dedupe import DedupeEngine
+
+
+def program(pid, name, description=None, website='https://example.com', category=(), network='awin',
+            commission=5.0, cookie=30, source='offervault', **kwargs):
+    now = datetime(2025, 1, 1)
+    return AffiliateProgram(id=pid, name=name, description=description, website=website,
+                            category=list(category), network=network, commission_type='percentage',
+                            commission_value=commission, cookie_duration=cookie,
+                            created_at=now, updated_at=now, source=source, **kwargs)
+
+def build_index():
+    index = MasterIndex()
+    index.add_program(program('1', 'Acme Outdoor Gear', 'Tents and camping equipment',
+                              'https://www.acme-outdoor.com', ['outdoor', 'camping'], commission=8.0, cookie=45))
+    index.add_program(program('2', 'Camping World', 'Camping supplies and RVs', 'https://campingworld.com',
+                              ['outdoor'], network='cj', commission=4.5, cookie=7))
+    index.add_program(program('3', 'Beauty Box', 'Monthly beauty subscription', 'https://beautybox.com',
+                              ['beauty'], commission={'standard': 10.0, 'new': 20.0}, cookie=60))
+    index.add_program(program('4', 'Outdoor Voices', 'Activewear', 'https://outdoorvoices.com',
+                              ['apparel'], network='impact', commission=6.0, cookie=30))
+    return index
+
+def test_bm25_ranking_and_filters():
+    index = build_index()
+    ids = lambda programs: [p.id for p in programs]
+
+    assert ids(index.search_programs('camping'))[:2] == ['2', '1']
+    assert set(ids(index.search_programs('outdoor'))) == {'1', '2', '4'}
+    assert ids(index.search_programs('outdoor', networks=['cj'])) == ['2']
+    assert ids(index.search_programs('outdoor', categories=['camping', 'apparel'])) in (['1', '4'], ['4', '1'])
+    # 4.5 sits in the same 1.0-wide bucket as 4.9, so the boundary is checked exactly
+    assert set(ids(index.search_programs('outdoor', min_commission=4.9))) == {'1', '4'}
+    assert ids(index.search_programs(min_commission=15)) == ['3']
+    assert ids(index.search_programs(min_cookie_duration=45, sort_by='cookie_duration')) == ['3', '1']
+    assert ids(index.search_programs('outdoor', limit=1, offset=1)) == ids(index.search_programs('outdoor'))[1:2]
+
+def test_prefix_search_and_suggestions():
+    index = build_index()
+    assert index.suggest('camp') == ['camping', 'campingworld']
+    assert {p.id for p in index.search_programs('beau', prefix=True)} == {'3'}
+    assert index.search_programs('beau') == []
+
+def test_incremental_updates():
+    index = build_index()
+    index.add_program(program('5', 'Camping Deals', source_id='x1'))
+    # Same source record under a new id updates the existing program
+    index.add_program(program('6', 'Glamping Deals', source_id='x1'))
+    assert index.get_program('6') is None
+    assert index.get_program('5').name == 'Glamping Deals'
+    assert '5' not in {p.id for p in index.search_programs('camping')}
+
+    assert index.delete_program('2')
+    assert not index.delete_program('2')
+    assert [p.id for p in index.search_programs('camping')] == ['1']
+    stats = index.get_stats()
+    assert stats['total_programs'] == 4
+    assert stats['programs_by_network'] == {'awin': 3, 'impact': 1}
+
+def test_duplicates_from_other_sources_are_merged():
+    index = MasterIndex(dedupe_engine=DedupeEngine())
+    index.add_program(program('a1', 'Acme Outdoor Gear', website='https://acme-outdoor.com', category=['outdoor'],
+                              source_id='100'))
+    index.add_program(program('c7', 'ACME Outdoor Gear Ltd', website='https://www.acme-outdoor.com/aff',
+                              category=['camping'], network='cj', source='cj', source_id='7'))
+    index.add_program(program('a2', 'Acme Outdoor Gear', website='https://acme-outdoor.co.uk', source_id='200'))
+
+    assert index.get_stats()['total_programs'] == 2
+    assert index.get_program('c7') is index.get_program('a1')
+    assert index.get_program('a1').category == ['outdoor', 'camping']
+    assert [s['source'] for s in index.get_program_sources('c7')] == ['offervault', 'cj']
+    assert [p.id for p in index.search_programs('camping')] == ['a1']
+
+    # Later updates from the merged source still land on the canonical program
+    index.add_program(program('c7-new', 'ACME Outdoor', category=['tents'], source='cj', source_id='7'))
+    assert index.get_stats()['total_programs'] == 2
+    assert 'tents' in index.get_program('a1').category
+
+def test_top_k_matches_exhaustive_scoring():
+    index = ProgramSearchIndex()
+    words = ['red', 'blue', 'shoes', 'shop', 'garden', 'tools', 'pets', 'food']
+    for i in range(2000):
+        name = ' '.join(words[(i * p) % len(words)] for p in (1, 3, 5)[:1 + i % 3])
+        index.add(str(i), name, description=words[i % 7], facets={'network': ['n%d' % (i % 3)]})
+    ranked = index.search('shoes garden', limit=2000)
+    scores = [score for _, score in ranked]
+    assert scores == sorted(scores, reverse=True)
+    top = index.search('shoes garden', limit=25, networks=['n1'])
+    expected = [(pid, s) for pid, s in ranked if int(pid) % 3 == 1][:25]
+    assert [s for _, s in top] == [s for _, s in expected]
@@ -0,0 +1,90 @@
+# tests/index/test_dedupe.py
+from backend.index.dedupe import Deduplicator, normalize_name, registrable_domain
+from backend.index.ingest import MasterIndexIngester
+from backend.index.models import DorkingFinding, Offer, ProgramIndexEntry
+from backend.index.store import MasterIndexStore
+
+
+def entry(i, name, domain=None, network=None, merchant_id=None, **kwargs):
+    return ProgramIndexEntry(id=f"uuid-{i}", name=name, domain=domain, network=network,
+                             merchant_id=merchant_id, source='aggregator', **kwargs)
+
+def test_normalization():
+    assert registrable_domain('https://www.Shop.Example.co.uk/path?q=1') == 'example.co.uk'
+    assert registrable_domain('outdoor.myshopify.com') == 'outdoor.myshopify.com'
+    assert registrable_domain('nike.com:443') == 'nike.com'
+    assert normalize_name('Café Noir, Inc. — Official Store') == 'cafe noir'
+
+def test_merges_cross_network_and_dorking_duplicates():
+    store = MasterIndexStore()
+    store.upsert(entry(1, 'Acme Outdoor Gear', 'www.acme-outdoor.com', 'skimlinks', '1', tags=['outdoor'],
+                       country='US'))
+    store.upsert(entry(2, 'ACME Outdoor Gear Ltd', None, 'awin', '77', tags=['camping']))
+    store.append_offers('77', [Offer(id='o1', title='Sale', url='https://acme-outdoor.com/sale')], network='awin')
+    store.append_dorking('acme-outdoor.com', [DorkingFinding(query='acme affiliate', url='https://acme-outdoor.com/aff')])
+    store.upsert(entry(3, 'Totally Different Co', 'different.com', 'skimlinks', '2'))
+
+    stats = Deduplicator(store).run()
+
+    assert (stats['clusters'], stats['merged']) == (1, 2)
+    assert len(store) == 2
+    merged = store.get('skimlinks:1')
+    assert set(merged.tags) == {'outdoor', 'camping'}
+    assert [o.id for o in merged.offers] == ['o1']
+    assert len(merged.dorking_findings) == 1
+    assert {ref.key for ref in merged.provenance} == {'skimlinks:1', 'awin:77', 'domain:acme-outdoor.com'}
+    # Old ids and keys resolve to the canonical entry
+    assert store.get_by_id('uuid-2') is merged
+    assert store.get('awin:77') is merged
+
+def test_incremental_mode_merges_new_records():
+    store = MasterIndexStore()
+    store.upsert(entry(1, 'Blue Widget Company', 'bluewidget.com', 'skimlinks', '1'))
+    dedupe = Deduplicator(store)
+    assert dedupe.run()['merged'] == 0
+
+    store.upsert(entry(2, 'Blue Widget', 'https://bluewidget.com', 'cj', '5'))
+    stats = dedupe.process(['cj:5'])
+    assert stats['merged'] == 1
+    assert len(store) == 1
+
+    # Writes to a merged-away key now update the canonical entry
+    store.append_offers('5', [Offer(id='o9', title='Deal', url='https://bluewidget.com/deal')], network='cj')
+    assert [o.id for o in store.get('skimlinks:1').offers] == ['o9']
+    assert len(store) == 1
+
+def test_similar_names_never_chain_distinct_merchants():
+    store = MasterIndexStore()
+    store.upsert(entry(1, 'Nova Pets', 'novapets.com', 'skimlinks', '1'))
+    store.upsert(entry(2, 'Nova Pets', None, 'awin', '2'))
+    store.upsert(entry(3, 'Nova Pets', 'novapets.co.uk', 'cj', '3'))
+    store.upsert(entry(4, 'Nova Pets', None, 'skimlinks', '4'))
+
+    Deduplicator(store).run()
+
+    # Name matches may join either side, but never both domains or both skimlinks ids
+    assert store.get('skimlinks:1') is not store.get('cj:3')
+    assert store.get('skimlinks:1') is not store.get('skimlinks:4')
+    for key in store.keys():
+        domains = {ref.domain for ref in store.get(key).provenance if ref.domain}
+        assert len(domains) <= 1
+
+def test_ingest_merges_a_merchant_listed_on_two_networks():
+    store = MasterIndexStore()
+    ingester = MasterIndexIngester(store, deduplicator=Deduplicator(store))
+    ingester.ingest_skimlinks_merchants_bulk([
+        {'id': 1, 'name': 'Acme Outdoor Gear', 'domain': 'acme-outdoor.com', 'tags': ['outdoor']},
+        {'id': 2, 'name': 'Beauty Box', 'domain': 'beautybox.com'},
+    ])
+
+    stats = ingester.ingest_skimlinks_merchants_bulk(
+        [{'id': 77, 'name': 'ACME Outdoor Gear Ltd', 'domain': 'www.acme-outdoor.com', 'tags': ['camping']}],
+        network='awin')
+    ingester.ingest_dorking_results('acme-outdoor.com', [{'query': 'acme affiliate', 'url': 'https://acme-outdoor.com/aff'}])
+
+    assert stats[0]['merged'] == 1
+    assert len(store) == 2
+    canonical = store.get('awin:77')
+    assert canonical is store.get('skimlinks:1') is store.get('domain:acme-outdoor.com')
+    assert set(canonical.tags) == {'outdoor', 'camping'}
+    assert {ref.key for ref in canonical.provenance} == {'skimlinks:1', 'awin:77', 'domain:acme-outdoor.com'}
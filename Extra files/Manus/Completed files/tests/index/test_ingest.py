@@ -0,0 +1,67 @@
+# tests/index/test_ingest.py
+from pydantic import ValidationError
+
+from backend.index.ingest import MasterIndexIngester
+from backend.index.store import MasterIndexStore
+
+
+def merchants(n, name='Merchant'):
+    return ({'id': i, 'name': f"{name} {i}", 'domain': f"m{i}.com", 'country': 'US', 'tags': ['t']}
+            for i in range(n))
+
+def test_bulk_ingest_batches_and_stats():
+    store = MasterIndexStore()
+    ingester = MasterIndexIngester(store)
+    seen = []
+    records = list(merchants(5)) + [{'id': 1, 'name': 'Dup'}, {'id': 99, 'name': None}]
+
+    stats = ingester.ingest_skimlinks_merchants_bulk(records, batch_size=4, on_batch=seen.append)
+
+    assert seen == stats
+    assert [s['received'] for s in stats] == [4, 3]
+    assert stats[1]['rejected'] == 1
+    assert sum(s['inserted'] for s in stats) == 5
+    assert stats[1]['updated'] == 1
+    assert len(store) == 5
+    assert next(store.list(tag='t', country='US')).id
+
+def test_bulk_ingest_keeps_ids_and_offers():
+    store = MasterIndexStore()
+    ingester = MasterIndexIngester(store)
+    ingester.ingest_skimlinks_merchants(list(merchants(2)))
+    ingester.ingest_skimlinks_offers('1', [{'id': 'o1', 'title': 'Sale', 'url': 'https://m1.com/sale'}])
+    before = {e.merchant_id: e.id for e in store.list()}
+
+    stats = ingester.ingest_skimlinks_merchants_bulk(merchants(3, name='Renamed'))
+
+    assert (stats[0]['inserted'], stats[0]['updated']) == (1, 2)
+    entry = store.get_by_id(before['1'])
+    assert entry.name == 'Renamed 1'
+    assert [o.id for o in entry.offers] == ['o1']
+
+
+EDGE_MERCHANTS = [
+    {'id': 1, 'name': 'Tuple tags', 'tags': ('a', 'b')},
+    {'id': 2, 'name': b'Bytes name'},
+    {'id': 3, 'name': 'Bool country', 'country': True},
+    {'id': 4, 'name': 'Numeric rate', 'commission_rate': 7.5},
+    {'id': 5, 'name': None},
+    {'id': 6, 'name': 'Bad tags', 'tags': 5},
+    {'id': 7, 'name': 'Nested tag', 'tags': [['x']]},
+]
+
+def test_bulk_ingest_accepts_what_single_ingest_accepts():
+    expected = {}
+    for m in EDGE_MERCHANTS:
+        try:
+            entry = MasterIndexIngester._merchant_to_entry(m)
+        except ValidationError:
+            continue
+        expected[entry.merchant_id] = entry.dict(exclude={'id', 'last_updated'})
+
+    store = MasterIndexStore()
+    stats = MasterIndexIngester(store).ingest_skimlinks_merchants_bulk(EDGE_MERCHANTS)
+
+    assert stats[0]['rejected'] == len(EDGE_MERCHANTS) - len(expected)
+    assert {e.merchant_id: e.dict(exclude={'id', 'last_updated'}) for e in store.list()} == expected
+    assert expected['1']['tags'] == ['a', 'b']
@@ -0,0 +1,65 @@
+# tests/index/test_snapshot.py
+from datetime import datetime
+from backend.index.models import ProgramIndexEntry, Offer
+from backend.index.store import MasterIndexStore
+
+
+def build_store():
+    store = MasterIndexStore()
+    for i in range(20):
+        store.upsert(ProgramIndexEntry(
+            id=f"uuid-{i}", name=f"Merchant {i}", domain=f"m{i}.com", merchant_id=str(i),
+            network='awin' if i % 2 else 'skimlinks', country='US' if i < 10 else None,
+            commission_rate='5%', tags=[f"tag{i % 3}"], source='aggregator'
+        ))
+    store.append_offers('3', [Offer(id='o1', title='Sale', url='https://m3.com/sale')], network='awin')
+    store.append_dorking('found.com', [])
+    return store
+
+def test_snapshot_round_trip(tmp_path):
+    original = build_store()
+    path = str(tmp_path / 'index.snap')
+    assert original.save_snapshot(path) == 21
+
+    store = MasterIndexStore.from_snapshot(path)
+    try:
+        assert len(store) == 21
+        assert store._store.materialized == 0
+
+        entry = store.get_by_id('uuid-3')
+        assert entry == original.get_by_id('uuid-3')
+        assert entry.offers[0].title == 'Sale'
+        assert store._store.materialized == 1
+
+        ids = {e.id for e in store.list(network='awin', country='US', tag='tag0')}
+        assert ids == {e.id for e in original.list(network='awin', country='US', tag='tag0')}
+        assert store.get_by_id('domain:found.com').source == 'dorking'
+    finally:
+        store.close()
+
+def test_writes_on_loaded_snapshot(tmp_path):
+    path = str(tmp_path / 'index.snap')
+    build_store().save_snapshot(path)
+    store = MasterIndexStore.from_snapshot(path)
+    try:
+        store.upsert(ProgramIndexEntry(id='new', name='Renamed', merchant_id='1', network='awin',
+                                       country='DE', source='aggregator'))
+        store.upsert(ProgramIndexEntry(id='x', name='Extra', merchant_id='99', network='cj',
+                                       source='aggregator'))
+        assert len(store) == 22
+        assert store.get_by_id('uuid-1').country == 'DE'
+        assert 'uuid-1' not in {e.id for e in store.list(country='US')}
+
+        # Re-snapshotting over the mapped file keeps untouched rows intact
+        store.save_snapshot(path)
+    finally:
+        store.close()
+
+    reloaded = MasterIndexStore.from_snapshot(path)
+    try:
+        assert len(reloaded) == 22
+        assert reloaded.get_by_id('uuid-1').name == 'Renamed'
+        assert reloaded.get_by_id('uuid-7').last_updated <= datetime.utcnow()
+        assert [e.id for e in reloaded.list(network='cj')] == ['x']
+    finally:
+        reloaded.close()
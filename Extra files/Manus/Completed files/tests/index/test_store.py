@@ -0,0 +1,48 @@
+# tests/index/test_store.py
+import pytest
+from backend.index.models import ProgramIndexEntry, Offer
+from backend.index.store import MasterIndexStore
+
+
+def make_entry(i, network='skimlinks', country='US', tags=None):
+    return ProgramIndexEntry(
+        id=f"uuid-{i}", name=f"Merchant {i}", domain=f"m{i}.com", merchant_id=str(i),
+        network=network, country=country, tags=tags or [], source='aggregator'
+    )
+
+@pytest.fixture
+def store():
+    store = MasterIndexStore()
+    store.upsert(make_entry(1, country='US', tags=['fashion']))
+    store.upsert(make_entry(2, country='GB', tags=['fashion', 'shoes']))
+    store.upsert(make_entry(3, network='awin', country='US', tags=['shoes']))
+    return store
+
+def test_get_by_id(store):
+    assert store.get_by_id('uuid-2').name == 'Merchant 2'
+    assert store.get_by_id('missing') is None
+
+def test_list_intersects_filters(store):
+    assert [e.id for e in store.list(network='skimlinks', tag='fashion', country='GB')] == ['uuid-2']
+    assert {e.id for e in store.list(tag='shoes')} == {'uuid-2', 'uuid-3'}
+    assert list(store.list(network='unknown')) == []
+    assert len(list(store.list(limit=2))) == 2
+    assert len(list(store.list(tag='fashion', offset=1))) == 1
+
+def test_upsert_reindexes_changed_fields(store):
+    # Same network/merchant key with a new country and tags keeps its id
+    store.upsert(make_entry(1, country='DE', tags=['toys']))
+    assert [e.id for e in store.list(country='DE', tag='toys')] == ['uuid-1']
+    assert 'uuid-1' not in {e.id for e in store.list(country='US')}
+    assert 'fashion' in store._by_tag and store._by_tag['fashion'] == {'skimlinks:2'}
+
+def test_append_offers_and_dorking_are_indexed(store):
+    offer = Offer(id='o1', title='Sale', url='https://m9.com/sale')
+    store.append_offers('9', [offer], network='skimlinks')
+    store.append_offers('9', [offer], network='skimlinks')
+    entry = store.get_by_id('skimlinks:9')
+    assert len(entry.offers) == 1
+    assert entry in list(store.list(network='skimlinks'))
+
+    store.append_dorking('Example.com', [])
+    assert store.get_by_id('domain:example.com').domain == 'Example.com'
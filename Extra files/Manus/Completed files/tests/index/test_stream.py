@@ -0,0 +1,55 @@
+# tests/index/test_stream.py
+import json
+import pytest
+from backend.index.ingest import MasterIndexIngester
+from backend.index.store import MasterIndexStore
+from backend.index.stream import ARRAY, NDJSON, StreamingIngester, detect_format, iter_json_records
+
+RECORDS = [{'id': i, 'name': f"Marché {i}", 'tags': ['ü']} for i in range(12)]
+
+
+def chunked(data: bytes, size: int):
+    return (data[i:i + size] for i in range(0, len(data), size))
+
+@pytest.mark.parametrize('fmt,data', [
+    (ARRAY, ('﻿[\n' + ',\n'.join(json.dumps(r, ensure_ascii=False) for r in RECORDS) + '\n]\n').encode()),
+    (NDJSON, ''.join(json.dumps(r, ensure_ascii=False) + '\n' for r in RECORDS).encode()),
+])
+def test_records_and_resume_offsets(fmt, data):
+    assert detect_format(data[:16]) == fmt
+    parsed = list(iter_json_records(chunked(data, 7), fmt))
+    assert [r for r, _ in parsed] == RECORDS
+
+    # Every yielded offset is a valid place to resume from
+    for i, (_, offset) in enumerate(parsed):
+        rest = [r for r, _ in iter_json_records(chunked(data[offset:], 5), fmt, offset)]
+        assert rest == RECORDS[i + 1:]
+
+def test_streaming_ingest_resumes_after_crash(tmp_path):
+    path = tmp_path / 'merchants.ndjson'
+    path.write_text(''.join(json.dumps(r) + '\n' for r in RECORDS))
+    checkpoint = str(tmp_path / 'checkpoint.json')
+    store = MasterIndexStore()
+    ingester = MasterIndexIngester(store)
+
+    calls = []
+    original = ingester.ingest_skimlinks_merchants_bulk
+    def crash_on_second_batch(records, **kwargs):
+        calls.append(len(records))
+        if len(calls) == 2:
+            raise RuntimeError('crash')
+        return original(records, **kwargs)
+    ingester.ingest_skimlinks_merchants_bulk = crash_on_second_batch
+
+    streaming = StreamingIngester(ingester, checkpoint_path=checkpoint, batch_size=5, chunk_size=16)
+    with pytest.raises(RuntimeError):
+        streaming.ingest_merchants(str(path))
+    assert len(store) == 5
+
+    progress = []
+    streaming.on_progress = progress.append
+    result = streaming.ingest_merchants(str(path))
+    assert (result['records'], result['records_this_run'], result['done']) == (12, 7, True)
+    assert len(store) == 12
+    assert progress[-1]['records'] == 12
+    assert streaming.ingest_merchants(str(path))['records_this_run'] == 0
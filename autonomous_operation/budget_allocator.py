@@ -1,8 +1,10 @@
 
+import os
+import time
 import numpy as np
-from typing import Dict, List
+from typing import Dict, Iterable, List, Optional
 from dataclasses import dataclass
-from scipy.stats import beta
+from scipy.special import ndtr
 
 @dataclass
 class Campaign:
@@ -13,94 +15,245 @@ class Campaign:
     revenue: float
     cost: float
 
+STAT_FIELDS = ('budget', 'impressions', 'conversions', 'revenue', 'cost')
+# Counters that fade when time decay is enabled
+DECAYED_FIELDS = ('impressions', 'conversions', 'revenue', 'cost')
+MAX_DRAWS_PER_CHUNK = 2_000_000  # Monte-Carlo draws held in memory at once
+
 class BudgetAllocator:
-    def __init__(self, total_budget: float):
+    """Thompson-sampling budget allocation over campaign stats kept in NumPy arrays.
+
+    Row i of every stat array belongs to campaign_ids[i]; sampling, scoring
+    and the budget constraints run on whole arrays at once.
+
+    With half_life_seconds set, counters are exponentially weighted: an
+    event counts half as much after each half-life, so allocation follows
+    recent performance. Rows are decayed lazily (on their next event, or
+    all at once when the stats are read).
+    """
+
+    def __init__(self, total_budget: float, seed: Optional[int] = None,
+                 half_life_seconds: Optional[float] = None):
         self.total_budget = total_budget
-        self.campaigns = {}
-        self.min_budget_ratio = 0.1  # Minimum budget allocation per campaign
+        self.min_budget_ratio = 0.1  # Minimum allocation per campaign, as a share of an equal split
         self.exploration_ratio = 0.2  # Budget reserved for exploration
+        self.half_life_seconds = half_life_seconds
+        self.rng = np.random.default_rng(seed)
+
+        self.campaign_ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._size = 0
+        self._stats = {field: np.zeros(16) for field in STAT_FIELDS}
+        self._updated_at = np.zeros(16)  # when each row was last decayed
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _column(self, field: str) -> np.ndarray:
+        if self.half_life_seconds and field in DECAYED_FIELDS:
+            self._decay_all(time.time())
+        return self._stats[field][:self._size]
+
+    def _decay_all(self, now: float):
+        updated_at = self._updated_at[:self._size]
+        factor = 0.5 ** ((now - updated_at) / self.half_life_seconds)
+        for field in DECAYED_FIELDS:
+            self._stats[field][:self._size] *= factor
+        updated_at[:] = now
+
+    def _event_row(self, campaign_id: str) -> int:
+        """Row of a campaign, decayed to now so an event can be added to it"""
+        row = self._row(campaign_id)
+        if self.half_life_seconds:
+            now = time.time()
+            elapsed = now - self._updated_at[row]
+            if elapsed:
+                factor = 0.5 ** (elapsed / self.half_life_seconds)
+                for field in DECAYED_FIELDS:
+                    self._stats[field][row] *= factor
+                self._updated_at[row] = now
+        return row
+
+    def record_impressions(self, campaign_id: str, n: int = 1):
+        """Count n impressions for a campaign (created on first sight)"""
+        row = self._event_row(campaign_id)
+        self._stats['impressions'][row] += n
+
+    def record_conversion(self, campaign_id: str, revenue: float = 0.0, n: int = 1):
+        """Count n conversions worth `revenue` in total"""
+        row = self._event_row(campaign_id)
+        self._stats['conversions'][row] += n
+        self._stats['revenue'][row] += revenue
+
+    def record_cost(self, campaign_id: str, amount: float):
+        """Add spend to a campaign"""
+        row = self._event_row(campaign_id)
+        self._stats['cost'][row] += amount
+
+    @property
+    def impressions(self) -> np.ndarray:
+        return self._column('impressions')
+
+    @property
+    def conversions(self) -> np.ndarray:
+        return self._column('conversions')
+
+    @property
+    def revenue(self) -> np.ndarray:
+        return self._column('revenue')
+
+    @property
+    def cost(self) -> np.ndarray:
+        return self._column('cost')
+
+    @property
+    def campaigns(self) -> Dict[str, Campaign]:
+        """Campaign objects rebuilt from the arrays"""
+        columns = [self._column(field).tolist() for field in STAT_FIELDS]
+        return {cid: Campaign(cid, budget, int(impressions), int(conversions), revenue, cost)
+                for cid, budget, impressions, conversions, revenue, cost in zip(self.campaign_ids, *columns)}
+
+    def _reserve(self, size: int):
+        capacity = len(self._stats['cost'])
+        if size > capacity:
+            capacity = max(size, capacity * 2)
+            for field, column in self._stats.items():
+                self._stats[field] = self._grow(column, capacity)
+            self._updated_at = self._grow(self._updated_at, capacity)
+
+    def _grow(self, column: np.ndarray, capacity: int) -> np.ndarray:
+        grown = np.zeros(capacity)
+        grown[:self._size] = column[:self._size]
+        return grown
+
+    def _row(self, campaign_id: str) -> int:
+        row = self._rows.get(campaign_id)
+        if row is None:
+            self._reserve(self._size + 1)
+            row = self._rows[campaign_id] = self._size
+            self.campaign_ids.append(campaign_id)
+            self._updated_at[row] = time.time()
+            self._size += 1
+        return row
 
     def add_campaign(self, campaign: Campaign):
         """Add or update campaign data"""
-        self.campaigns[campaign.id] = campaign
+        row = self._row(campaign.id)
+        for field in STAT_FIELDS:
+            self._stats[field][row] = getattr(campaign, field)
+        self._updated_at[row] = time.time()
 
-    def thompson_sampling(self) -> Dict[str, float]:
-        """Perform Thompson sampling for budget allocation"""
-        samples = {}
+    def add_campaigns(self, campaigns: Iterable[Campaign]):
+        """Add or update many campaigns"""
+        for campaign in campaigns:
+            self.add_campaign(campaign)
 
-        for campaign_id, campaign in self.campaigns.items():
-            alpha = campaign.conversions + 1
-            beta_param = campaign.impressions - campaign.conversions + 1
+    def update_stats(self, campaign_ids: List[str], **columns: np.ndarray):
+        """Overwrite stat columns (impressions=..., cost=..., ...) for many campaigns at once"""
+        rows = np.fromiter((self._row(cid) for cid in campaign_ids), dtype=np.intp, count=len(campaign_ids))
+        if self.half_life_seconds:
+            self._decay_all(time.time())
+        for field, values in columns.items():
+            if field not in self._stats:
+                raise ValueError(f"Unknown campaign stat: {field}")
+            self._stats[field][rows] = values
+        self._updated_at[rows] = time.time()
 
-            # Sample from beta distribution
-            sample = beta.rvs(alpha, beta_param)
-            samples[campaign_id] = sample
+    def save(self, path: str):
+        """Snapshot the campaign stats to `path` (.npz), replacing it atomically"""
+        if self.half_life_seconds:
+            self._decay_all(time.time())
+        columns = {field: self._stats[field][:self._size] for field in STAT_FIELDS}
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, campaign_ids=np.array(self.campaign_ids, dtype=str),
+                     updated_at=self._updated_at[:self._size],
+                     half_life_seconds=np.array(self.half_life_seconds or 0.0), **columns)
+        os.replace(tmp_path, path)
 
-        return samples
+    @classmethod
+    def restore(cls, path: str, total_budget: float, seed: Optional[int] = None) -> 'BudgetAllocator':
+        """Allocator with the stats saved by `save`; decay resumes from the saved timestamps"""
+        with np.load(path, allow_pickle=False) as data:
+            allocator = cls(total_budget, seed, float(data['half_life_seconds']) or None)
+            campaign_ids = data['campaign_ids'].tolist()
+            allocator.update_stats(campaign_ids, **{field: data[field] for field in STAT_FIELDS})
+            allocator._updated_at[:allocator._size] = data['updated_at']
+        return allocator
 
-    def calculate_roi_confidence(self, campaign: Campaign) -> float:
-        """Calculate ROI confidence interval"""
-        if campaign.cost == 0:
-            return 0
+    def sample_conversion_rates(self, n_samples: int = 1) -> np.ndarray:
+        """Posterior conversion-rate draws: shape (campaigns,), or (n_samples, campaigns)"""
+        alpha = self.conversions + 1
+        beta_param = np.maximum(self.impressions - self.conversions, 0) + 1
+        if n_samples == 1:
+            return self.rng.beta(alpha, beta_param)
+        return self.rng.beta(alpha, beta_param, size=(n_samples, self._size))
 
-        roi = (campaign.revenue - campaign.cost) / campaign.cost
-        n = campaign.impressions
+    def thompson_sampling(self) -> Dict[str, float]:
+        """Perform Thompson sampling for budget allocation"""
+        return dict(zip(self.campaign_ids, self.sample_conversion_rates().tolist()))
 
-        # Standard error calculation
-        se = np.sqrt((roi * (1 - roi)) / n) if n > 0 else float('inf')
+    def roi_confidence(self) -> np.ndarray:
+        """Confidence that each campaign's ROI differs from zero (0 without cost or impressions)"""
+        cost, n = self.cost, self.impressions
+        with np.errstate(divide='ignore', invalid='ignore'):
+            roi = np.where(cost > 0, (self.revenue - cost) / cost, 0.0)
+            # Standard error; |.| keeps it defined for ROI outside [0, 1]
+            se = np.sqrt(np.abs(roi * (1 - roi)) / n)
+            confidence = 1 - 2 * ndtr(-np.abs(roi) / se)
+        valid = (cost > 0) & (n > 0) & (roi != 0)
+        return np.where(valid, np.nan_to_num(confidence, nan=0.0), 0.0)
+
+    def calculate_roi_confidence(self, campaign: Campaign) -> float:
+        """Calculate ROI confidence interval"""
+        single = BudgetAllocator(self.total_budget)
+        single.add_campaign(campaign)
+        return float(single.roi_confidence()[0])
 
-        # 95% confidence interval
-        confidence = 1 - (2 * stats.norm.cdf(-abs(roi) / se)) if se != float('inf') else 0
+    def _apply_min_budget(self, allocations: np.ndarray) -> np.ndarray:
+        """Raise allocations to the floor, taking the difference from the campaigns above it"""
+        # A floor above an equal split can't be met within the total; cap it there
+        floor = min(self.min_budget_ratio, 1.0) * self.total_budget / self._size
+        pinned = np.zeros(self._size, dtype=bool)
+        while True:
+            below = ~pinned & (allocations < floor)
+            if not below.any():
+                return allocations
+            pinned |= below
+            free = ~pinned
+            remaining = self.total_budget - floor * pinned.sum()
+            allocations = np.where(pinned, floor, allocations)
+            free_total = allocations[free].sum()
+            if free_total <= 0:
+                return np.where(pinned, floor, remaining / max(free.sum(), 1))
+            allocations[free] *= remaining / free_total
 
-        return confidence
+    def allocate(self, n_samples: int = 1) -> np.ndarray:
+        """Budget per campaign, aligned with campaign_ids.
 
-    def allocate_budget(self) -> Dict[str, float]:
-        """Allocate budget using Thompson sampling and ROI confidence"""
-        if not self.campaigns:
-            return {}
+        With n_samples > 1 the exploitation share is the Monte-Carlo mean
+        of the shares each posterior draw would give.
+        """
+        if not self._size:
+            return np.zeros(0)
 
-        # Exploration budget
         exploration_budget = self.total_budget * self.exploration_ratio
         exploitation_budget = self.total_budget - exploration_budget
 
-        # Get Thompson sampling scores
-        samples = self.thompson_sampling()
-
-        # Calculate ROI confidence scores
-        roi_confidence = {
-            cid: self.calculate_roi_confidence(campaign)
-            for cid, campaign in self.campaigns.items()
-        }
-
-        # Combine scores
-        final_scores = {
-            cid: samples[cid] * roi_confidence[cid]
-            for cid in self.campaigns.keys()
-        }
-
-        # Normalize scores
-        score_sum = sum(final_scores.values())
-        if score_sum > 0:
-            normalized_scores = {
-                cid: score / score_sum
-                for cid, score in final_scores.items()
-            }
-        else:
-            # Equal distribution if no scores
-            normalized_scores = {
-                cid: 1 / len(self.campaigns)
-                for cid in self.campaigns.keys()
-            }
-
-        # Allocate exploitation budget
-        allocations = {
-            cid: exploitation_budget * score
-            for cid, score in normalized_scores.items()
-        }
-
-        # Distribute exploration budget equally
-        exploration_per_campaign = exploration_budget / len(self.campaigns)
-        for cid in allocations:
-            allocations[cid] += exploration_per_campaign
-
-        return allocations
+        confidence = self.roi_confidence()
+        share_sum = np.zeros(self._size)
+        # Draw in chunks so many samples over many campaigns stay within memory
+        chunk = max(1, MAX_DRAWS_PER_CHUNK // self._size)
+        for start in range(0, n_samples, chunk):
+            draws = min(chunk, n_samples - start)
+            scores = np.atleast_2d(self.sample_conversion_rates(draws)) * confidence
+            totals = scores.sum(axis=1, keepdims=True)
+            # Equal distribution for draws where nothing scored
+            shares = np.where(totals > 0, scores / np.where(totals > 0, totals, 1), 1 / self._size)
+            share_sum += shares.sum(axis=0)
+        allocations = exploitation_budget * share_sum / n_samples + exploration_budget / self._size
+        return self._apply_min_budget(allocations)
+
+    def allocate_budget(self, n_samples: int = 1) -> Dict[str, float]:
+        """Allocate budget using Thompson sampling and ROI confidence"""
+        return dict(zip(self.campaign_ids, self.allocate(n_samples).tolist()))
@@ -0,0 +1,45 @@
+# benchmarks/budget_allocator_bench.py
+"""Allocation round time at 1k/10k/100k campaigns.
+
+Run from the repository root:  python -m benchmarks.budget_allocator_bench [monte_carlo_samples]
+"""
+import sys
+import time
+
+import numpy as np
+
+from autonomous_operation.budget_allocator import BudgetAllocator
+
+
+def build_allocator(n: int) -> BudgetAllocator:
+    rng = np.random.default_rng(7)
+    allocator = BudgetAllocator(total_budget=1_000_000.0, seed=7)
+    impressions = rng.integers(0, 100_000, n)
+    conversions = rng.binomial(impressions, rng.uniform(0.001, 0.05, n))
+    cost = impressions * rng.uniform(0.001, 0.01, n)
+    allocator.update_stats([f"campaign-{i}" for i in range(n)], impressions=impressions,
+                           conversions=conversions, revenue=conversions * rng.uniform(1, 20, n), cost=cost)
+    return allocator
+
+
+def timed(fn, repeat: int = 5) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def main(samples: int = 100):
+    for n in (1_000, 10_000, 100_000):
+        allocator = build_allocator(n)
+        single = timed(allocator.allocate)
+        as_dict = timed(allocator.allocate_budget)
+        monte_carlo = timed(lambda: allocator.allocate(samples), repeat=2)
+        print(f"{n:>7} campaigns  allocate {single:>8.2f} ms  allocate_budget {as_dict:>8.2f} ms"
+              f"  {samples} samples {monte_carlo:>9.2f} ms")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100)
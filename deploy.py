@@ -52,17 +52,26 @@ class Deployer:
         return True
 
     def setup_database(self) -> bool:
-        """Setup database schema"""
+        """Setup database schema and apply pending migrations"""
         try:
-            # Execute schema file
-            with open('foundation/index_schema.sql', 'r') as f:
-                schema = f.read()
+            import psycopg2
+            from foundation.migrate import MigrationRunner
 
-            subprocess.run(
-                ['psql', '-d', self.config['database']['name'], '-f', '-'],
-                input=schema.encode(),
-                check=True
+            db = self.config['database']
+            conn = psycopg2.connect(
+                host=db.get('host', 'localhost'),
+                port=db.get('port', 5432),
+                dbname=db['name'],
+                user=db.get('user'),
+                password=db.get('password')
             )
+            try:
+                runner = MigrationRunner(conn)
+                applied = runner.run()
+                runner.maintain()
+            finally:
+                conn.close()
+            self.logger.info(f"Applied migrations: {', '.join(applied) or 'none'}")
             return True
         except Exception as e:
             self.logger.error(f"Database setup failed: {str(e)}")
@@ -112,5 +121,8 @@ class Deployer:
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
     deployer = Deployer()
-    success = deployer.deploy()
+    if '--migrate' in sys.argv:
+        success = deployer.setup_database()
+    else:
+        success = deployer.deploy()
     sys.exit(0 if success else 1)
@@ -0,0 +1,126 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+import dns.asyncresolver
+import dns.exception
+import dns.resolver
+
+# A lookup backend resolves (name, rdtype) to (addresses, ttl_seconds).
+# It raises dns.resolver.NXDOMAIN / NoAnswer when the name has no records.
+LookupBackend = Callable[[str, str], Awaitable[Tuple[List[str], int]]]
+
+
+class DnspythonBackend:
+    """Lookup backend built on dnspython's async resolver"""
+
+    def __init__(self, timeout: float = 3.0, nameservers: Optional[List[str]] = None):
+        self.resolver = dns.asyncresolver.Resolver()
+        self.resolver.lifetime = timeout
+        if nameservers:
+            self.resolver.nameservers = nameservers
+
+    async def __call__(self, name: str, rdtype: str) -> Tuple[List[str], int]:
+        answer = await self.resolver.resolve(name, rdtype)
+        return [record.to_text() for record in answer], answer.rrset.ttl
+
+
+class AsyncDNSResolver:
+    """Concurrent DNS resolution with a TTL-respecting LRU cache.
+
+    Concurrent lookups of the same name share a single query. Names that
+    do not exist are cached for `negative_ttl` seconds; timeouts and other
+    transient errors are not cached at all.
+    """
+
+    def __init__(self, backend: Optional[LookupBackend] = None,
+                 max_entries: int = 100000,
+                 negative_ttl: int = 300,
+                 min_ttl: int = 0,
+                 max_ttl: int = 86400):
+        self.backend = backend or DnspythonBackend()
+        self.max_entries = max_entries
+        self.negative_ttl = negative_ttl
+        self.min_ttl = min_ttl
+        self.max_ttl = max_ttl
+
+        self._cache: OrderedDict = OrderedDict()
+        self._inflight: Dict[Tuple[str, str], asyncio.Future] = {}
+        self.stats = {'hits': 0, 'misses': 0, 'coalesced': 0, 'errors': 0}
+
+    def cached(self, name: str, rdtype: str = 'A') -> Optional[List[str]]:
+        """Return cached addresses without querying (None if unknown or expired)"""
+        key = (name.lower(), rdtype)
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        expires_at, addresses = entry
+        if expires_at <= time.monotonic():
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return addresses
+
+    def _store(self, key: Tuple[str, str], addresses: List[str], ttl: int):
+        ttl = min(max(ttl, self.min_ttl), self.max_ttl)
+        self._cache[key] = (time.monotonic() + ttl, addresses)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+
+    async def resolve(self, name: str, rdtype: str = 'A') -> List[str]:
+        """Resolve a name; an empty list means it has no records"""
+        key = (name.lower(), rdtype)
+        addresses = self.cached(*key)
+        if addresses is not None:
+            self.stats['hits'] += 1
+            return addresses
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.stats['coalesced'] += 1
+            return await asyncio.shield(inflight)
+
+        self.stats['misses'] += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            try:
+                addresses, ttl = await self.backend(*key)
+            except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer):
+                addresses, ttl = [], self.negative_ttl
+            self._store(key, addresses, ttl)
+            future.set_result(addresses)
+            return addresses
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            self.stats['errors'] += 1
+            future.set_exception(e)
+            # Mark retrieved so failures nobody else awaited don't warn
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+    async def resolve_many(self, names: Iterable[str], rdtype: str = 'A',
+                           concurrency: int = 500) -> Dict[str, Optional[List[str]]]:
+        """Resolve many names concurrently.
+
+        Returns a mapping of name to addresses; names whose lookup failed
+        with a transient error map to None.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        results: Dict[str, Optional[List[str]]] = {}
+
+        async def lookup(name: str):
+            async with semaphore:
+                try:
+                    results[name] = await self.resolve(name, rdtype)
+                except (dns.exception.DNSException, OSError):
+                    results[name] = None
+
+        await asyncio.gather(*(lookup(name) for name in dict.fromkeys(names)))
+        return results
@@ -0,0 +1,148 @@
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Set
+
+# Seconds each check stays fresh once it has succeeded
+DEFAULT_TTLS = {
+    'whois': 30 * 24 * 3600,   # domain age rarely changes
+    'ssl': 7 * 24 * 3600,      # re-check certificates weekly
+    'dns': 3600,               # DNS hourly
+    'reputation': 24 * 3600
+}
+
+# Failed checks are retried soon so transient errors don't stick
+NEGATIVE_TTL = 300
+
+
+class ValidationCache:
+    """SQLite-backed cache of domain validation results.
+
+    Every check (whois, ssl, dns, reputation) is stored per domain with its
+    own expiry, alongside the full deep_validation result dict, so a restart
+    does not re-run network checks that are still fresh. The default
+    ':memory:' cache lasts for the process; pass a file path to persist it.
+    """
+
+    def __init__(self, path: str = ':memory:',
+                 ttls: Optional[Dict[str, int]] = None,
+                 negative_ttl: int = NEGATIVE_TTL):
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.negative_ttl = negative_ttl
+        self.hits: Dict[str, int] = {}
+        self.misses: Dict[str, int] = {}
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS validation_cache (
+                    domain TEXT NOT NULL,
+                    check_name TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    PRIMARY KEY (domain, check_name)
+                )
+            """)
+
+    def _fetch(self, domain: str, check: str) -> Optional[str]:
+        row = self._conn.execute(
+            'SELECT value FROM validation_cache '
+            'WHERE domain = ? AND check_name = ? AND expires_at > ?',
+            (domain, check, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def get(self, domain: str, check: str) -> Optional[Any]:
+        """Return the cached value of `check` for `domain`, or None if stale"""
+        with self._lock:
+            value = self._fetch(domain, check)
+            if value is None:
+                self.misses[check] = self.misses.get(check, 0) + 1
+                return None
+
+            self.hits[check] = self.hits.get(check, 0) + 1
+            return json.loads(value)
+
+    def peek(self, domain: str, check: str) -> Optional[Any]:
+        """Like get, without counting a hit or miss"""
+        with self._lock:
+            value = self._fetch(domain, check)
+        return None if value is None else json.loads(value)
+
+    def domains(self, check: str, predicate: Callable[[Any], bool] = bool) -> Set[str]:
+        """Domains whose fresh `check` value satisfies `predicate`"""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT domain, value FROM validation_cache '
+                'WHERE check_name = ? AND expires_at > ?',
+                (check, time.time())
+            ).fetchall()
+        return {domain for domain, value in rows if predicate(json.loads(value))}
+
+    def set(self, domain: str, check: str, value: Any,
+            ok: bool = True, ttl: Optional[int] = None):
+        """Store a check result; failed checks (`ok=False`) get the negative TTL"""
+        if ttl is None:
+            ttl = self.ttls.get(check, self.negative_ttl) if ok else self.negative_ttl
+
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO validation_cache '
+                '(domain, check_name, value, expires_at) VALUES (?, ?, ?, ?)',
+                (domain, check, json.dumps(value), time.time() + ttl)
+            )
+
+    def set_many(self, check: str, values: Dict[str, Any], ok: Dict[str, bool]):
+        """Store one check for many domains in a single transaction"""
+        now = time.time()
+        rows = [
+            (domain, check, json.dumps(value),
+             now + (self.ttls.get(check, self.negative_ttl) if ok[domain] else self.negative_ttl))
+            for domain, value in values.items()
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO validation_cache '
+                '(domain, check_name, value, expires_at) VALUES (?, ?, ?, ?)',
+                rows
+            )
+
+    def get_result(self, domain: str) -> Optional[Dict]:
+        """Full deep_validation result, if still fresh"""
+        return self.get(domain, 'result')
+
+    def set_result(self, domain: str, results: Dict):
+        """Cache a deep_validation result until its shortest-lived check expires"""
+        if results.get('valid'):
+            ttl = min(self.ttls[check] for check in ('whois', 'ssl', 'reputation'))
+        else:
+            ttl = self.negative_ttl
+        self.set(domain, 'result', results, ttl=ttl)
+
+    def purge_expired(self) -> int:
+        """Delete expired rows, returning how many were removed"""
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                'DELETE FROM validation_cache WHERE expires_at <= ?', (time.time(),)
+            )
+            return cursor.rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters, overall and per check"""
+        hits = sum(self.hits.values())
+        misses = sum(self.misses.values())
+        total = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / total if total else 0.0,
+            'by_check': {
+                check: {'hits': self.hits.get(check, 0), 'misses': self.misses.get(check, 0)}
+                for check in sorted(set(self.hits) | set(self.misses))
+            }
+        }
+
+    def close(self):
+        self._conn.close()
@@ -1,33 +1,128 @@
 
+import asyncio
+import os
+import time
 import requests
-from typing import Dict, List
+from collections.abc import MutableSet
+from datetime import datetime
+from typing import AsyncIterator, Dict, Iterable, Iterator, List, Optional, Set
 import whois
 import dns.resolver
 from concurrent.futures import ThreadPoolExecutor
 
+from discovery.dns_resolver import AsyncDNSResolver
+from discovery.validation_cache import ValidationCache
+
+class TrustedDomains(MutableSet):
+    """Manually trusted domains plus those with a fresh valid result in the cache.
+
+    Domains added by hand stay trusted; validated ones drop out when their
+    cached result expires.
+    """
+
+    def __init__(self, cache: ValidationCache):
+        self.cache = cache
+        self.manual: Set[str] = set()
+
+    def _validated(self) -> Set[str]:
+        return self.cache.domains('result', lambda result: result.get('valid'))
+
+    def __contains__(self, domain) -> bool:
+        if domain in self.manual:
+            return True
+        result = self.cache.peek(domain, 'result')
+        return bool(result and result.get('valid'))
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.manual | self._validated())
+
+    def __len__(self) -> int:
+        return len(self.manual | self._validated())
+
+    def add(self, domain: str):
+        self.manual.add(domain)
+
+    def discard(self, domain: str):
+        self.manual.discard(domain)
+
 class ValidationPipeline:
-    def __init__(self):
-        self.trusted_domains = set()
-        self.blacklist = set()
+    def __init__(self, max_workers: int = 32,
+                 cache: Optional[ValidationCache] = None,
+                 resolver: Optional[AsyncDNSResolver] = None,
+                 cache_path: Optional[str] = None):
+        # Check results expire per check; they only outlive the process
+        # when a cache file is configured
+        self.cache = cache or ValidationCache(
+            cache_path or os.getenv('VALIDATION_CACHE_PATH', ':memory:')
+        )
+        # Trusted sources skip validation entirely
+        self.trusted_domains = TrustedDomains(self.cache)
+        self.resolver = resolver or AsyncDNSResolver()
+        # whois, SSL and DNS checks block, so they run on this pool
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    async def _run_blocking(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, lambda: func(*args, **kwargs))
+
+    @property
+    def blacklist(self) -> Set[str]:
+        """Domains that failed DNS or deep validation and are not yet due for a retry"""
+        return (self.cache.domains('dns', lambda resolves: not resolves)
+                | self.cache.domains('result', lambda result: not result.get('valid')))
 
     def fast_validation(self, domain: str) -> bool:
         """Quick validation for trusted sources"""
         if domain in self.trusted_domains:
             return True
 
-        if domain in self.blacklist:
+        # Failed deep validation blacklists a domain until its result expires
+        result = self.cache.get(domain, 'result')
+        if result is not None and not result.get('valid'):
             return False
 
+        addresses = self.resolver.cached(domain)
+        if addresses is not None:
+            return bool(addresses)
+
+        resolves = self.cache.get(domain, 'dns')
+        if resolves is not None:
+            return resolves
+
         try:
             # Basic DNS check
             dns.resolver.resolve(domain, 'A')
+            self.cache.set(domain, 'dns', True)
             return True
-        except:
-            self.blacklist.add(domain)
+        except Exception:
+            self.cache.set(domain, 'dns', False, ok=False)
             return False
 
+    async def prefilter(self, domains: Iterable[str], concurrency: int = 500) -> List[str]:
+        """Keep the domains that resolve, checking them concurrently.
+
+        This is the batch form of fast_validation for large candidate lists
+        such as dorking dumps. Lookups that fail transiently are dropped but
+        not cached, so they are retried next time.
+        """
+        domains = list(dict.fromkeys(domains))
+        trusted = set(self.trusted_domains)
+        resolved = await self.resolver.resolve_many(
+            [d for d in domains if d not in trusted],
+            concurrency=concurrency
+        )
+
+        values = {d: bool(a) for d, a in resolved.items() if a is not None}
+        self.cache.set_many('dns', values, ok=values)
+
+        return [d for d in domains if d in trusted or resolved.get(d)]
+
     async def deep_validation(self, domain: str) -> Dict:
         """Comprehensive validation for new discoveries"""
+        cached = self.cache.get_result(domain)
+        if cached is not None:
+            return cached
+
         results = {
             'domain': domain,
             'valid': False,
@@ -38,19 +133,37 @@ class ValidationPipeline:
 
         try:
             # Domain age check
-            domain_info = whois.whois(domain)
-            if domain_info.creation_date:
-                age = (datetime.now() - domain_info.creation_date).days
-                results['whois_age'] = age
-                if age < 90:  # Domain younger than 90 days
-                    return results
+            age = self.cache.get(domain, 'whois')
+            if age is None:
+                domain_info = await self._run_blocking(whois.whois, domain)
+                age = 0
+                if domain_info.creation_date:
+                    age = (datetime.now() - domain_info.creation_date).days
+                self.cache.set(domain, 'whois', age)
+            results['whois_age'] = age
+            if 0 < age < 90:  # Domain younger than 90 days
+                self.cache.set_result(domain, results)
+                return results
 
             # SSL check
-            ssl_response = requests.get(f'https://{domain}', timeout=5)
-            results['ssl_valid'] = True
+            ssl_valid = self.cache.get(domain, 'ssl')
+            if ssl_valid is None:
+                try:
+                    await self._run_blocking(
+                        requests.get, f'https://{domain}', timeout=5
+                    )
+                    ssl_valid = True
+                    self.cache.set(domain, 'ssl', True)
+                except requests.RequestException:
+                    ssl_valid = False
+                    self.cache.set(domain, 'ssl', False, ok=False)
+            results['ssl_valid'] = ssl_valid
 
             # Reputation check via API
-            reputation = await self.check_domain_reputation(domain)
+            reputation = self.cache.get(domain, 'reputation')
+            if reputation is None:
+                reputation = await self.check_domain_reputation(domain)
+                self.cache.set(domain, 'reputation', reputation, ok=reputation is not None)
             results['reputation_score'] = reputation
 
             results['valid'] = (
@@ -59,15 +172,47 @@ class ValidationPipeline:
                 results['reputation_score'] >= 50
             )
 
-            if results['valid']:
-                self.trusted_domains.add(domain)
-
         except Exception as e:
             print(f"Validation error for {domain}: {str(e)}")
-            self.blacklist.add(domain)
 
+        self.cache.set_result(domain, results)
         return results
 
+    async def validate_many(self, domains: Iterable[str],
+                            concurrency: int = 50) -> AsyncIterator[Dict]:
+        """Deep-validate many domains concurrently.
+
+        At most `concurrency` validations are in flight at once. Results are
+        yielded as they complete (not in input order), each with the time
+        spent on that domain in `elapsed`.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def validate(domain: str) -> Dict:
+            async with semaphore:
+                started = time.monotonic()
+                results = await self.deep_validation(domain)
+                results['elapsed'] = time.monotonic() - started
+                return results
+
+        pending = set()
+        for domain in dict.fromkeys(domains):
+            pending.add(asyncio.ensure_future(validate(domain)))
+            # Bound the number of scheduled tasks as well as running ones
+            if len(pending) >= concurrency * 2:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    yield task.result()
+
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                yield task.result()
+
     async def check_domain_reputation(self, domain: str) -> int:
         """Check domain reputation using various APIs"""
         # Implementation of reputation checking
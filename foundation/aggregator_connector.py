@@ -1,17 +1,45 @@
-
+import asyncio
 import requests
-from typing import Dict, List
+from requests.adapters import HTTPAdapter
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple
 import json
-from utils.api_key_manager import APIKeyManager
+import aiohttp
+from foundation.api_key_manager import APIKeyManager
+
+DEFAULT_NETWORKS = {
+    'shareasale': 'https://api.shareasale.com/x.cfm',
+    'cj': 'https://commission-junction.com/api',
+    'impact': 'https://api.impact.com'
+}
+
+class DeltaSyncUnavailable(Exception):
+    """The network cannot serve changes since the given watermark"""
 
 class AffiliateAggregator:
-    def __init__(self):
-        self.key_manager = APIKeyManager()
-        self.networks = {
-            'shareasale': 'https://api.shareasale.com/x.cfm',
-            'cj': 'https://commission-junction.com/api',
-            'impact': 'https://api.impact.com'
-        }
+    def __init__(self,
+                 key_manager: Optional[APIKeyManager] = None,
+                 networks: Optional[Dict[str, str]] = None,
+                 connection_limits: Optional[Dict[str, int]] = None,
+                 default_connection_limit: int = 10,
+                 timeout: float = 30,
+                 page_size: int = 100):
+        self.key_manager = key_manager or APIKeyManager()
+        # Pass `networks` to point one or more networks elsewhere,
+        # e.g. a local fake server in tests
+        self.networks = dict(DEFAULT_NETWORKS, **(networks or {}))
+        self.connection_limits = connection_limits or {}
+        self.default_connection_limit = default_connection_limit
+        self.timeout = timeout
+        self.page_size = page_size
+
+        # Keep-alive connection pool shared by the blocking helpers
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_maxsize=default_connection_limit)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        # One aiohttp session per network so each gets its own connection limit
+        self._async_sessions: Dict[str, aiohttp.ClientSession] = {}
 
     def get_auth_headers(self, network: str) -> Dict:
         token = self.key_manager.get_token(network)
@@ -22,16 +50,191 @@ class AffiliateAggregator:
 
     def fetch_programs(self, network: str) -> List[Dict]:
         headers = self.get_auth_headers(network)
-        response = requests.get(
+        response = self.session.get(
             f"{self.networks[network]}/programs",
-            headers=headers
+            headers=headers,
+            timeout=self.timeout
         )
         return response.json()
 
     def fetch_offers(self, network: str, program_id: str) -> List[Dict]:
         headers = self.get_auth_headers(network)
-        response = requests.get(
+        response = self.session.get(
             f"{self.networks[network]}/offers/{program_id}",
-            headers=headers
+            headers=headers,
+            timeout=self.timeout
         )
         return response.json()
+
+    # ---------- Async, pooled client ---------- #
+    def _get_async_session(self, network: str) -> aiohttp.ClientSession:
+        session = self._async_sessions.get(network)
+        if session is None or session.closed:
+            limit = self.connection_limits.get(network, self.default_connection_limit)
+            session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=limit),
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+            self._async_sessions[network] = session
+        return session
+
+    async def _request(self, network: str, path: str,
+                       params: Optional[Dict] = None,
+                       extra_headers: Optional[Dict] = None):
+        """GET a network endpoint, returning (status, payload, response headers)"""
+        loop = asyncio.get_running_loop()
+        # Token lookup may hit Vault, which blocks
+        headers = await loop.run_in_executor(None, self.get_auth_headers, network)
+        headers.update(extra_headers or {})
+        session = self._get_async_session(network)
+        async with session.get(f"{self.networks[network]}{path}",
+                               headers=headers, params=params) as response:
+            if response.status == 304:
+                return response.status, None, response.headers
+            response.raise_for_status()
+            return response.status, await response.json(content_type=None), response.headers
+
+    async def _get_json(self, network: str, path: str, params: Optional[Dict] = None):
+        _, payload, _ = await self._request(network, path, params)
+        return payload
+
+    @staticmethod
+    def _page_items(payload) -> Tuple[List[Dict], Optional[str]]:
+        """Split a page response into its items and the next-page cursor.
+
+        Networks answer either with a bare list (page-number pagination) or
+        with an object holding the items under `programs`/`data` and an
+        optional `next_cursor`.
+        """
+        if isinstance(payload, list):
+            return payload, None
+        items = payload.get('programs', payload.get('data', []))
+        return items, payload.get('next_cursor')
+
+    async def iter_program_pages(self, network: str,
+                                 page_size: Optional[int] = None) -> AsyncIterator[List[Dict]]:
+        """Stream a network's program catalog one page at a time"""
+        page_size = page_size or self.page_size
+        page = 1
+        cursor = None
+        while True:
+            params = {'page_size': page_size}
+            if cursor:
+                params['cursor'] = cursor
+            else:
+                params['page'] = page
+
+            items, cursor = self._page_items(
+                await self._get_json(network, '/programs', params)
+            )
+            if items:
+                yield items
+
+            if cursor is None and len(items) < page_size:
+                return
+            page += 1
+
+    @staticmethod
+    def _query_key(params: Dict) -> str:
+        return json.dumps(params, sort_keys=True)
+
+    async def iter_program_changes(self, network: str,
+                                   watermark: Dict,
+                                   page_size: Optional[int] = None) -> AsyncIterator[List[Dict]]:
+        """Stream only the programs changed since `watermark`.
+
+        `watermark` holds the network's high-water mark and is updated in
+        place as pages arrive, so once iteration finishes it describes the
+        new sync position:
+        - `updated_at`: newest change seen, sent as `updated_since`
+        - `sync_token`: change-feed token, for networks that return
+          `next_sync_token` (used only when there is no `updated_at`)
+        - `etag`/`etag_query`: ETag of the first page and the query it
+          answered; it is only replayed for that same query
+        Page cursors (`next_cursor`) only page through the current response
+        and are never stored, since they mark a position in the listing
+        rather than in the change history.
+        Nothing is yielded when the network answers 304 Not Modified.
+        Raises DeltaSyncUnavailable when the network rejects the watermark
+        (e.g. an expired token); callers should then resync in full.
+        """
+        page_size = page_size or self.page_size
+        params = {'page_size': page_size}
+        if watermark.get('updated_at'):
+            params['updated_since'] = watermark['updated_at']
+        elif watermark.get('sync_token'):
+            params['sync_token'] = watermark['sync_token']
+        query_key = self._query_key(params)
+        headers = {}
+        if watermark.get('etag') and watermark.get('etag_query') == query_key:
+            headers['If-None-Match'] = watermark['etag']
+
+        page = 1
+        cursor = None
+        while True:
+            if cursor:
+                params['cursor'] = cursor
+                params.pop('page', None)
+            else:
+                params['page'] = page
+            try:
+                status, payload, response_headers = await self._request(
+                    network, '/programs', params, headers
+                )
+            except aiohttp.ClientResponseError as e:
+                if e.status in (400, 409, 410, 422):
+                    raise DeltaSyncUnavailable(f"{network}: {e.status} {e.message}") from e
+                raise
+            if status == 304:
+                return
+
+            if page == 1:
+                if response_headers.get('ETag'):
+                    watermark['etag'] = response_headers['ETag']
+                    watermark['etag_query'] = query_key
+                else:
+                    watermark.pop('etag', None)
+                    watermark.pop('etag_query', None)
+            # Conditional headers only apply to the first page
+            headers = {}
+
+            items, cursor = self._page_items(payload)
+            for item in items:
+                updated_at = item.get('updated_at')
+                if updated_at and updated_at > (watermark.get('updated_at') or ''):
+                    watermark['updated_at'] = updated_at
+            if isinstance(payload, dict) and payload.get('next_sync_token'):
+                watermark['sync_token'] = payload['next_sync_token']
+            if items:
+                yield items
+
+            if cursor is None and len(items) < page_size:
+                return
+            page += 1
+
+    async def fetch_offers_many(self, network: str, program_ids: Iterable[str],
+                                concurrency: Optional[int] = None) -> Dict[str, List[Dict]]:
+        """Fetch offers for many programs concurrently.
+
+        Programs whose request fails are left out of the result.
+        """
+        limit = concurrency or self.connection_limits.get(network, self.default_connection_limit)
+        semaphore = asyncio.Semaphore(limit)
+        offers = {}
+
+        async def fetch(program_id: str):
+            async with semaphore:
+                try:
+                    offers[program_id] = await self._get_json(network, f"/offers/{program_id}")
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    print(f"Error fetching offers for {network}/{program_id}: {str(e)}")
+
+        await asyncio.gather(*(fetch(pid) for pid in dict.fromkeys(program_ids)))
+        return offers
+
+    async def close(self):
+        """Close pooled connections"""
+        for session in self._async_sessions.values():
+            await session.close()
+        self._async_sessions.clear()
+        self.session.close()
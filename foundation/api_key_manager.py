@@ -1,33 +1,129 @@
-
 import hvac
-from typing import Dict
+import threading
+import time
+from typing import Dict, Optional
 import os
 
 class APIKeyManager:
-    def __init__(self):
-        self.client = hvac.Client(
+    def __init__(self, client=None, ttl: float = 300,
+                 refresh_margin: float = 30, background_refresh: bool = True):
+        # `client` may be any object exposing hvac's secrets.kv.v2 API,
+        # e.g. a local stand-in KV backend in tests
+        self.client = client or hvac.Client(
             url='http://localhost:8200',
             token=os.getenv('VAULT_TOKEN')
         )
         self.mount_point = 'affiliate-keys'
 
-    def get_token(self, network: str) -> str:
+        # Tokens are cached for `ttl` seconds (or the secret's own `ttl`
+        # field) and refreshed in the background `refresh_margin` seconds
+        # before they expire, as long as they are still being used
+        self.ttl = ttl
+        self.refresh_margin = refresh_margin
+        self.background_refresh = background_refresh
+        self._tokens: Dict[str, Dict] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        self._refresher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.stats = {'vault_reads': 0, 'cache_hits': 0, 'refreshes': 0}
+
+    def _lock_for(self, network: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(network, threading.Lock())
+
+    def _read_token(self, network: str) -> Optional[str]:
         try:
+            self.stats['vault_reads'] += 1
             secret = self.client.secrets.kv.v2.read_secret_version(
                 path=f'{network}',
                 mount_point=self.mount_point
             )
-            return secret['data']['data']['token']
+            data = secret['data']['data']
         except Exception as e:
             print(f"Error fetching token for {network}: {str(e)}")
             return None
 
+        now = time.monotonic()
+        self._tokens[network] = {
+            'token': data['token'],
+            'read_at': now,
+            'expires_at': now + float(data.get('ttl', self.ttl)),
+            'last_used': now
+        }
+        return data['token']
+
+    def get_token(self, network: str) -> str:
+        entry = self._tokens.get(network)
+        if entry and entry['expires_at'] > time.monotonic():
+            entry['last_used'] = time.monotonic()
+            self.stats['cache_hits'] += 1
+            return entry['token']
+
+        # Single flight: concurrent callers wait for one Vault read
+        with self._lock_for(network):
+            entry = self._tokens.get(network)
+            if entry and entry['expires_at'] > time.monotonic():
+                entry['last_used'] = time.monotonic()
+                self.stats['cache_hits'] += 1
+                return entry['token']
+
+            token = self._read_token(network)
+
+        if token is not None:
+            self._ensure_refresher()
+        return token
+
+    def invalidate(self, network: Optional[str] = None):
+        """Drop a cached token (or all of them)"""
+        if network is None:
+            self._tokens.clear()
+        else:
+            self._tokens.pop(network, None)
+
     def rotate_token(self, network: str, new_token: str):
-        try:
-            self.client.secrets.kv.v2.create_or_update_secret(
-                path=f'{network}',
-                secret=dict(token=new_token),
-                mount_point=self.mount_point
+        # Hold the network's lock so an in-flight refresh can't re-cache the old token
+        with self._lock_for(network):
+            try:
+                self.client.secrets.kv.v2.create_or_update_secret(
+                    path=f'{network}',
+                    secret=dict(token=new_token),
+                    mount_point=self.mount_point
+                )
+            except Exception as e:
+                print(f"Error rotating token for {network}: {str(e)}")
+            finally:
+                self.invalidate(network)
+
+    def _ensure_refresher(self):
+        if not self.background_refresh or (self._refresher and self._refresher.is_alive()):
+            return
+        with self._locks_guard:
+            if self._refresher and self._refresher.is_alive():
+                return
+            self._refresher = threading.Thread(
+                target=self._refresh_loop, name='APIKeyManagerRefresh', daemon=True
             )
-        except Exception as e:
-            print(f"Error rotating token for {network}: {str(e)}")
+            self._refresher.start()
+
+    def _refresh_loop(self):
+        interval = max(self.refresh_margin / 2, 0.01)
+        while not self._stop.wait(interval):
+            self.refresh_expiring()
+
+    def refresh_expiring(self):
+        """Re-read tokens that expire within the refresh margin and were used since their last read"""
+        now = time.monotonic()
+        for network, entry in list(self._tokens.items()):
+            used_since_read = entry['last_used'] > entry['read_at']
+            if entry['expires_at'] - now <= self.refresh_margin and used_since_read:
+                with self._lock_for(network):
+                    if self._tokens.get(network) is entry:
+                        self.stats['refreshes'] += 1
+                        self._read_token(network)
+
+    def close(self):
+        """Stop the background refresher"""
+        self._stop.set()
+        if self._refresher:
+            self._refresher.join()
@@ -0,0 +1,155 @@
+import csv
+import io
+import itertools
+import logging
+import time
+from typing import Any, Dict, Iterable, List
+
+from foundation.catalog_sync import PROGRAM_COLUMNS, get_network_id, normalize_program
+from utils.database import param_marker
+
+# Columns appended to program_metrics for every record that carries metrics
+METRIC_COLUMNS = [
+    'epc', 'conversion_rate', 'average_order_value', 'total_sales', 'measurement_period'
+]
+
+STAGING_COLUMNS = ['network_id', 'program_id'] + PROGRAM_COLUMNS + METRIC_COLUMNS
+
+
+def normalize_record(raw: Dict[str, Any]) -> Dict[str, Any]:
+    """Normalize a catalog record, keeping any metrics it carries"""
+    record = normalize_program(raw)
+    for column in METRIC_COLUMNS:
+        record[column] = raw.get(column)
+    return record
+
+
+class BulkProgramLoader:
+    """Bulk-loads network catalogs into affiliate_programs and program_metrics.
+
+    Records are streamed in chunks of `chunk_size` into a temporary staging
+    table (COPY on PostgreSQL, executemany on SQLite). Each chunk is then
+    merged with one set-based upsert into affiliate_programs plus one insert
+    into program_metrics, so memory stays bounded by the chunk size.
+    """
+
+    def __init__(self, db, chunk_size: int = 10000):
+        self.db = db
+        self.chunk_size = chunk_size
+        self.logger = logging.getLogger('BulkProgramLoader')
+
+    def load(self, network: str, records: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+        """Load raw catalog records for one network, returning throughput stats"""
+        started = time.monotonic()
+        report = {'network': network, 'rows': 0, 'chunks': 0, 'metrics_appended': 0}
+
+        with self.db.get_connection() as conn:
+            postgres = param_marker(conn) == '%s'
+            network_id = get_network_id(conn, network)
+            self._create_staging(conn)
+
+            records = iter(records)
+            while True:
+                chunk = list(itertools.islice(records, self.chunk_size))
+                if not chunk:
+                    break
+                rows = self._staging_rows(network_id, chunk)
+                if postgres:
+                    self._copy_chunk(conn, rows)
+                else:
+                    self._insert_chunk(conn, rows)
+                report['metrics_appended'] += self._merge_staging(conn)
+                conn.commit()
+
+                report['rows'] += len(chunk)
+                report['chunks'] += 1
+
+        elapsed = time.monotonic() - started
+        report['seconds'] = round(elapsed, 3)
+        report['rows_per_sec'] = round(report['rows'] / elapsed, 1) if elapsed > 0 else 0.0
+        self.logger.info(f"Bulk load report: {report}")
+        return report
+
+    @staticmethod
+    def _staging_rows(network_id: int, chunk: List[Dict]) -> List[tuple]:
+        # Last record wins when a program appears twice in one chunk
+        records = {}
+        for raw in chunk:
+            record = normalize_record(raw)
+            records[record['program_id']] = record
+        return [
+            (network_id,) + tuple(record[c] for c in STAGING_COLUMNS[1:])
+            for record in records.values()
+        ]
+
+    @staticmethod
+    def _create_staging(conn):
+        cursor = conn.cursor()
+        cursor.execute("""
+            CREATE TEMP TABLE IF NOT EXISTS program_staging (
+                network_id INTEGER,
+                program_id VARCHAR(100),
+                name VARCHAR(255),
+                description TEXT,
+                category VARCHAR(100),
+                commission_type VARCHAR(50),
+                commission_rate DECIMAL(10,2),
+                cookie_duration INTEGER,
+                region VARCHAR(100),
+                status VARCHAR(50),
+                epc DECIMAL(10,2),
+                conversion_rate DECIMAL(5,2),
+                average_order_value DECIMAL(10,2),
+                total_sales INTEGER,
+                measurement_period VARCHAR(20)
+            )
+        """)
+
+    @staticmethod
+    def _copy_chunk(conn, rows: List[tuple]):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow([r'\N' if v is None else v for v in row])
+        buffer.seek(0)
+
+        cursor = conn.cursor()
+        cursor.execute("TRUNCATE program_staging")
+        cursor.copy_expert(
+            f"COPY program_staging ({', '.join(STAGING_COLUMNS)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+            buffer
+        )
+
+    @staticmethod
+    def _insert_chunk(conn, rows: List[tuple]):
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM program_staging")
+        cursor.executemany(
+            f"INSERT INTO program_staging ({', '.join(STAGING_COLUMNS)}) "
+            f"VALUES ({', '.join('?' * len(STAGING_COLUMNS))})",
+            rows
+        )
+
+    @staticmethod
+    def _merge_staging(conn) -> int:
+        """Upsert staged programs and append their metrics; returns metric rows added"""
+        columns = ['network_id', 'program_id'] + PROGRAM_COLUMNS
+        assignments = ', '.join(f"{c} = EXCLUDED.{c}" for c in PROGRAM_COLUMNS)
+        cursor = conn.cursor()
+        # `WHERE true` keeps SQLite from parsing ON CONFLICT as a join clause
+        cursor.execute(
+            f"INSERT INTO affiliate_programs ({', '.join(columns)}) "
+            f"SELECT {', '.join(columns)} FROM program_staging WHERE true "
+            f"ON CONFLICT (network_id, program_id) DO UPDATE SET {assignments}, "
+            f"updated_at = CURRENT_TIMESTAMP"
+        )
+
+        has_metrics = ' OR '.join(f"s.{c} IS NOT NULL" for c in METRIC_COLUMNS)
+        cursor.execute(
+            f"INSERT INTO program_metrics (program_id, {', '.join(METRIC_COLUMNS)}) "
+            f"SELECT p.id, {', '.join('s.' + c for c in METRIC_COLUMNS)} "
+            f"FROM program_staging s JOIN affiliate_programs p "
+            f"ON p.network_id = s.network_id AND p.program_id = s.program_id "
+            f"WHERE {has_metrics}"
+        )
+        return cursor.rowcount
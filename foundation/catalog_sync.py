@@ -0,0 +1,183 @@
+import json
+import logging
+import os
+import time
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
+
+from foundation.aggregator_connector import AffiliateAggregator, DeltaSyncUnavailable
+from utils.database import param_marker
+
+# Columns of affiliate_programs kept in sync with the networks
+PROGRAM_COLUMNS = [
+    'name', 'description', 'category', 'commission_type',
+    'commission_rate', 'cookie_duration', 'region', 'status'
+]
+
+
+def delta_sync_enabled() -> bool:
+    """Mirror of the backend's `enable_delta_endpoints` feature flag"""
+    value = os.getenv('FEATURE_FLAG_ENABLE_DELTA_ENDPOINTS', 'false')
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def normalize_program(raw: Dict[str, Any]) -> Dict[str, Any]:
+    """Map a network's program record onto affiliate_programs columns"""
+    rate = raw.get('commission_rate')
+    return {
+        'program_id': str(raw.get('program_id', raw.get('id'))),
+        'name': raw.get('name') or raw.get('program_name') or '',
+        'description': raw.get('description'),
+        'category': raw.get('category'),
+        'commission_type': raw.get('commission_type'),
+        'commission_rate': round(float(rate), 2) if rate not in (None, '') else None,
+        'cookie_duration': int(raw['cookie_duration']) if raw.get('cookie_duration') is not None else None,
+        'region': raw.get('region') or raw.get('country'),
+        'status': raw.get('status')
+    }
+
+
+def get_network_id(conn, network: str, api_endpoint: Optional[str] = None) -> int:
+    """Return the affiliate_networks id for `network`, creating the row if needed"""
+    p = param_marker(conn)
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT id FROM affiliate_networks WHERE name = {p}", (network,))
+    row = cursor.fetchone()
+    if row:
+        return row[0]
+    cursor.execute(
+        f"INSERT INTO affiliate_networks (name, api_endpoint) VALUES ({p}, {p})",
+        (network, api_endpoint)
+    )
+    cursor.execute(f"SELECT id FROM affiliate_networks WHERE name = {p}", (network,))
+    return cursor.fetchone()[0]
+
+
+class SyncState:
+    """Per-network high-water marks, persisted as JSON when a path is set.
+
+    Without `path` (or the SYNC_STATE_PATH environment variable) the marks
+    only last as long as the process, so each run starts with a full sync.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.getenv('SYNC_STATE_PATH')
+        self.watermarks = {}
+        if self.path:
+            try:
+                with open(self.path, 'r') as f:
+                    self.watermarks = json.load(f)
+            except FileNotFoundError:
+                pass
+
+    def get(self, network: str) -> Dict:
+        return dict(self.watermarks.get(network, {}))
+
+    def save(self, network: str, watermark: Dict):
+        self.watermarks[network] = watermark
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.watermarks, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+class CatalogSync:
+    """Incrementally syncs network catalogs into affiliate_programs.
+
+    With delta sync enabled, only programs changed since the stored
+    high-water mark are requested, and only rows that actually differ are
+    written. Without a watermark, when delta sync is disabled, or when the
+    network rejects the watermark, the whole catalog is fetched instead.
+    """
+
+    def __init__(self, aggregator: AffiliateAggregator, db,
+                 state: Optional[SyncState] = None,
+                 delta_enabled: Optional[bool] = None,
+                 state_path: Optional[str] = None):
+        self.aggregator = aggregator
+        self.db = db
+        self.state = state or SyncState(state_path)
+        self.delta_enabled = delta_sync_enabled() if delta_enabled is None else delta_enabled
+        self.logger = logging.getLogger('CatalogSync')
+
+    async def sync(self, network: str, full: bool = False) -> Dict[str, Any]:
+        """Sync one network, returning counts of rows added/updated/unchanged"""
+        started = time.monotonic()
+        watermark = self.state.get(network)
+        mode = 'delta' if self.delta_enabled and watermark and not full else 'full'
+
+        report = {'network': network, 'mode': mode, 'fetched': 0,
+                  'added': 0, 'updated': 0, 'unchanged': 0}
+        if mode == 'full':
+            watermark = {}
+        try:
+            pages = self.aggregator.iter_program_changes(network, watermark)
+            await self._apply_pages(network, pages, report)
+        except DeltaSyncUnavailable as e:
+            if mode == 'full':
+                raise
+            self.logger.warning(f"Delta sync unavailable for {network}, resyncing in full: {str(e)}")
+            return await self.sync(network, full=True)
+
+        self.state.save(network, watermark)
+        report['duration_seconds'] = round(time.monotonic() - started, 3)
+        self.logger.info(f"Catalog sync report: {report}")
+        return report
+
+    async def _apply_pages(self, network: str, pages, report: Dict):
+        with self.db.get_connection() as conn:
+            network_id = get_network_id(conn, network, self.aggregator.networks.get(network))
+            async for page in pages:
+                rows = [normalize_program(raw) for raw in page]
+                report['fetched'] += len(rows)
+                self._upsert_diff(conn, network_id, rows, report)
+                conn.commit()
+
+    @staticmethod
+    def _comparable(value):
+        return float(value) if isinstance(value, Decimal) else value
+
+    def _upsert_diff(self, conn, network_id: int, rows: List[Dict], report: Dict):
+        """Insert new programs and update changed ones; skip identical rows"""
+        p = param_marker(conn)
+        rows = list({row['program_id']: row for row in rows}.values())
+        cursor = conn.cursor()
+        cursor.execute(
+            f"SELECT program_id, {', '.join(PROGRAM_COLUMNS)} FROM affiliate_programs "
+            f"WHERE network_id = {p} AND program_id IN ({', '.join([p] * len(rows))})",
+            [network_id] + [row['program_id'] for row in rows]
+        )
+        existing = {
+            record[0]: tuple(self._comparable(v) for v in record[1:])
+            for record in cursor.fetchall()
+        }
+
+        inserts, updates = [], []
+        for row in rows:
+            values = tuple(row[c] for c in PROGRAM_COLUMNS)
+            current = existing.get(row['program_id'])
+            if current is None:
+                inserts.append((network_id, row['program_id']) + values)
+            elif current != values:
+                updates.append(values + (network_id, row['program_id']))
+            else:
+                report['unchanged'] += 1
+
+        if inserts:
+            columns = ['network_id', 'program_id'] + PROGRAM_COLUMNS
+            cursor.executemany(
+                f"INSERT INTO affiliate_programs ({', '.join(columns)}) "
+                f"VALUES ({', '.join([p] * len(columns))})",
+                inserts
+            )
+        if updates:
+            assignments = ', '.join(f"{c} = {p}" for c in PROGRAM_COLUMNS)
+            cursor.executemany(
+                f"UPDATE affiliate_programs SET {assignments}, updated_at = CURRENT_TIMESTAMP "
+                f"WHERE network_id = {p} AND program_id = {p}",
+                updates
+            )
+        report['added'] += len(inserts)
+        report['updated'] += len(updates)
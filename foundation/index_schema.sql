@@ -2,7 +2,7 @@
 -- Affiliate Programs Schema
 CREATE TABLE affiliate_networks (
     id SERIAL PRIMARY KEY,
-    name VARCHAR(100) NOT NULL,
+    name VARCHAR(100) NOT NULL UNIQUE,
     api_endpoint VARCHAR(255),
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
@@ -20,7 +20,8 @@ CREATE TABLE affiliate_programs (
     region VARCHAR(100),
     status VARCHAR(50),
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (network_id, program_id)
 );
 
 CREATE TABLE program_metrics (
@@ -0,0 +1,113 @@
+import logging
+import os
+from typing import List, Optional, Tuple
+
+from utils.database import param_marker
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), 'migrations')
+BASELINE_SCHEMA = os.path.join(os.path.dirname(__file__), 'index_schema.sql')
+BASELINE_VERSION = '000_index_schema'
+
+
+class MigrationRunner:
+    """Applies foundation/migrations/*.sql in filename order, once each.
+
+    Applied versions are recorded in schema_migrations. index_schema.sql is
+    treated as the baseline migration; databases created from it before
+    migrations existed are detected and the baseline is marked as applied.
+    Each migration runs in its own transaction.
+    """
+
+    def __init__(self, conn, directory: str = MIGRATIONS_DIR,
+                 baseline: Optional[str] = BASELINE_SCHEMA):
+        self.conn = conn
+        self.directory = directory
+        self.baseline = baseline
+        self.logger = logging.getLogger('MigrationRunner')
+
+    def _ensure_table(self):
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version VARCHAR(255) PRIMARY KEY,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        self.conn.commit()
+
+    def applied(self) -> set:
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT version FROM schema_migrations")
+        return {row[0] for row in cursor.fetchall()}
+
+    def available(self) -> List[Tuple[str, str]]:
+        """(version, path) for every known migration, baseline first"""
+        migrations = []
+        if self.baseline:
+            migrations.append((BASELINE_VERSION, self.baseline))
+        for filename in sorted(os.listdir(self.directory)):
+            if filename.endswith('.sql'):
+                migrations.append((filename[:-4], os.path.join(self.directory, filename)))
+        return migrations
+
+    def pending(self) -> List[Tuple[str, str]]:
+        applied = self.applied()
+        return [(v, path) for v, path in self.available() if v not in applied]
+
+    def _table_exists(self, table: str) -> bool:
+        cursor = self.conn.cursor()
+        try:
+            if param_marker(self.conn) == '?':
+                cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,))
+                return cursor.fetchone() is not None
+            cursor.execute("SELECT to_regclass(%s)", (table,))
+            return cursor.fetchone()[0] is not None
+        finally:
+            self.conn.rollback()
+
+    def _record(self, version: str):
+        p = param_marker(self.conn)
+        self.conn.cursor().execute(
+            f"INSERT INTO schema_migrations (version) VALUES ({p})", (version,)
+        )
+
+    def _execute_script(self, sql: str):
+        if hasattr(self.conn, 'executescript'):
+            # sqlite3 only runs one statement per execute()
+            self.conn.executescript(sql)
+        else:
+            self.conn.cursor().execute(sql)
+
+    def run(self) -> List[str]:
+        """Apply pending migrations, returning the versions applied"""
+        self._ensure_table()
+        applied = self.applied()
+        if (self.baseline and BASELINE_VERSION not in applied
+                and self._table_exists('affiliate_programs')):
+            self.logger.info("Existing schema found, marking baseline as applied")
+            self._record(BASELINE_VERSION)
+            self.conn.commit()
+
+        done = []
+        for version, path in self.pending():
+            self.logger.info(f"Applying migration {version}")
+            with open(path, 'r') as f:
+                sql = f.read()
+            try:
+                self._execute_script(sql)
+                self._record(version)
+                self.conn.commit()
+            except Exception:
+                self.conn.rollback()
+                self.logger.error(f"Migration {version} failed")
+                raise
+            done.append(version)
+        return done
+
+    def maintain(self, months_ahead: int = 3):
+        """Create upcoming program_metrics partitions; safe to run on a schedule"""
+        if param_marker(self.conn) == '?':
+            return
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT ensure_program_metrics_partitions(%s)", (months_ahead,))
+        self.conn.commit()
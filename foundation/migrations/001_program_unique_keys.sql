@@ -0,0 +1,18 @@
+-- Natural keys used by catalog sync and bulk loads.
+-- Already part of index_schema.sql for new installs; added here for existing ones.
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_constraint
+        WHERE conrelid = 'affiliate_networks'::regclass AND contype = 'u'
+    ) THEN
+        ALTER TABLE affiliate_networks ADD UNIQUE (name);
+    END IF;
+
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_constraint
+        WHERE conrelid = 'affiliate_programs'::regclass AND contype = 'u'
+    ) THEN
+        ALTER TABLE affiliate_programs ADD UNIQUE (network_id, program_id);
+    END IF;
+END $$;
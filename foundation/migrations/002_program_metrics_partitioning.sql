@@ -0,0 +1,84 @@
+-- Partition program_metrics by month and index it for per-program time-series lookups
+
+ALTER TABLE program_metrics RENAME TO program_metrics_unpartitioned;
+ALTER SEQUENCE program_metrics_id_seq OWNED BY NONE;
+
+CREATE TABLE program_metrics (
+    id INTEGER NOT NULL DEFAULT nextval('program_metrics_id_seq'),
+    program_id INTEGER REFERENCES affiliate_programs(id),
+    epc DECIMAL(10,2),
+    conversion_rate DECIMAL(5,2),
+    average_order_value DECIMAL(10,2),
+    total_sales INTEGER,
+    measurement_period VARCHAR(20),
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+
+ALTER SEQUENCE program_metrics_id_seq OWNED BY program_metrics.id;
+
+-- Catches rows for months whose partition doesn't exist yet
+CREATE TABLE program_metrics_default PARTITION OF program_metrics DEFAULT;
+
+CREATE INDEX idx_program_metrics_program_created ON program_metrics (program_id, created_at);
+CREATE INDEX idx_program_metrics_created ON program_metrics (created_at);
+
+-- Create the partition for the month containing month_start. Rows that
+-- already landed in the default partition for that month are moved over.
+CREATE OR REPLACE FUNCTION create_program_metrics_partition(month_start DATE)
+RETURNS VOID AS $$
+DECLARE
+    range_start DATE := date_trunc('month', month_start)::DATE;
+    range_end DATE := (date_trunc('month', month_start) + INTERVAL '1 month')::DATE;
+    partition_name TEXT := format('program_metrics_y%sm%s',
+                                  to_char(range_start, 'YYYY'), to_char(range_start, 'MM'));
+BEGIN
+    IF to_regclass(partition_name) IS NOT NULL THEN
+        RETURN;
+    END IF;
+
+    EXECUTE format('CREATE TABLE %I (LIKE program_metrics INCLUDING DEFAULTS)', partition_name);
+    EXECUTE format(
+        'WITH moved AS (DELETE FROM program_metrics_default
+                        WHERE created_at >= %L AND created_at < %L RETURNING *)
+         INSERT INTO %I SELECT * FROM moved',
+        range_start, range_end, partition_name
+    );
+    EXECUTE format(
+        'ALTER TABLE program_metrics ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+        partition_name, range_start, range_end
+    );
+END;
+$$ LANGUAGE plpgsql;
+
+-- Make sure partitions exist from the current month up to months_ahead
+-- months out. Run by deploy.py and meant to be scheduled (e.g. daily).
+CREATE OR REPLACE FUNCTION ensure_program_metrics_partitions(months_ahead INTEGER DEFAULT 3)
+RETURNS VOID AS $$
+DECLARE
+    month_offset INTEGER;
+BEGIN
+    FOR month_offset IN 0..months_ahead LOOP
+        PERFORM create_program_metrics_partition(
+            (date_trunc('month', CURRENT_DATE) + month_offset * INTERVAL '1 month')::DATE
+        );
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT create_program_metrics_partition(month_start)
+FROM (
+    SELECT DISTINCT date_trunc('month', created_at)::DATE AS month_start
+    FROM program_metrics_unpartitioned
+    WHERE created_at IS NOT NULL
+) existing_months;
+
+SELECT ensure_program_metrics_partitions(3);
+
+INSERT INTO program_metrics (id, program_id, epc, conversion_rate, average_order_value,
+                             total_sales, measurement_period, created_at)
+SELECT id, program_id, epc, conversion_rate, average_order_value,
+       total_sales, measurement_period, COALESCE(created_at, CURRENT_TIMESTAMP)
+FROM program_metrics_unpartitioned;
+
+DROP TABLE program_metrics_unpartitioned;
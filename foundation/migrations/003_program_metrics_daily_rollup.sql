@@ -0,0 +1,83 @@
+-- Daily per-program aggregates of program_metrics, maintained on insert.
+-- Sums and counts are stored (rather than averages) so they can be
+-- updated incrementally; program_metrics_daily_summary exposes averages.
+
+CREATE TABLE program_metrics_daily (
+    program_id INTEGER NOT NULL,
+    day DATE NOT NULL,
+    samples INTEGER NOT NULL DEFAULT 0,
+    epc_sum DECIMAL(14,2) NOT NULL DEFAULT 0,
+    epc_count INTEGER NOT NULL DEFAULT 0,
+    conversion_rate_sum DECIMAL(14,2) NOT NULL DEFAULT 0,
+    conversion_rate_count INTEGER NOT NULL DEFAULT 0,
+    average_order_value_sum DECIMAL(14,2) NOT NULL DEFAULT 0,
+    average_order_value_count INTEGER NOT NULL DEFAULT 0,
+    total_sales BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (program_id, day)
+);
+
+CREATE INDEX idx_program_metrics_daily_day ON program_metrics_daily (day);
+
+CREATE OR REPLACE FUNCTION rollup_program_metrics_daily()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO program_metrics_daily AS d (
+        program_id, day, samples,
+        epc_sum, epc_count,
+        conversion_rate_sum, conversion_rate_count,
+        average_order_value_sum, average_order_value_count,
+        total_sales
+    )
+    SELECT program_id, created_at::DATE, COUNT(*),
+           COALESCE(SUM(epc), 0), COUNT(epc),
+           COALESCE(SUM(conversion_rate), 0), COUNT(conversion_rate),
+           COALESCE(SUM(average_order_value), 0), COUNT(average_order_value),
+           COALESCE(SUM(total_sales), 0)
+    FROM new_rows
+    WHERE program_id IS NOT NULL
+    GROUP BY program_id, created_at::DATE
+    ON CONFLICT (program_id, day) DO UPDATE SET
+        samples = d.samples + EXCLUDED.samples,
+        epc_sum = d.epc_sum + EXCLUDED.epc_sum,
+        epc_count = d.epc_count + EXCLUDED.epc_count,
+        conversion_rate_sum = d.conversion_rate_sum + EXCLUDED.conversion_rate_sum,
+        conversion_rate_count = d.conversion_rate_count + EXCLUDED.conversion_rate_count,
+        average_order_value_sum = d.average_order_value_sum + EXCLUDED.average_order_value_sum,
+        average_order_value_count = d.average_order_value_count + EXCLUDED.average_order_value_count,
+        total_sales = d.total_sales + EXCLUDED.total_sales;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Statement-level so bulk loads aggregate each batch in one pass
+CREATE TRIGGER program_metrics_daily_rollup
+AFTER INSERT ON program_metrics
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION rollup_program_metrics_daily();
+
+-- Backfill from existing rows
+INSERT INTO program_metrics_daily (
+    program_id, day, samples,
+    epc_sum, epc_count,
+    conversion_rate_sum, conversion_rate_count,
+    average_order_value_sum, average_order_value_count,
+    total_sales
+)
+SELECT program_id, created_at::DATE, COUNT(*),
+       COALESCE(SUM(epc), 0), COUNT(epc),
+       COALESCE(SUM(conversion_rate), 0), COUNT(conversion_rate),
+       COALESCE(SUM(average_order_value), 0), COUNT(average_order_value),
+       COALESCE(SUM(total_sales), 0)
+FROM program_metrics
+WHERE program_id IS NOT NULL
+GROUP BY program_id, created_at::DATE;
+
+CREATE VIEW program_metrics_daily_summary AS
+SELECT program_id,
+       day,
+       samples,
+       epc_sum / NULLIF(epc_count, 0) AS avg_epc,
+       conversion_rate_sum / NULLIF(conversion_rate_count, 0) AS avg_conversion_rate,
+       average_order_value_sum / NULLIF(average_order_value_count, 0) AS avg_order_value,
+       total_sales
+FROM program_metrics_daily;
@@ -1,5 +1,6 @@
 
 import os
+import json
 import logging
 from typing import Dict, List
 import asyncio
@@ -16,6 +17,7 @@ from funnel_replication.template_generator import TemplateGenerator
 from autonomous_operation.performance_analyzer import PerformanceAnalyzer
 from autonomous_operation.budget_allocator import BudgetAllocator
 from autonomous_operation.campaign_generator import CampaignGenerator
+from utils.scheduler import PipelineScheduler, Stage
 
 class AffiliateMatrix:
     def __init__(self):
@@ -29,10 +31,19 @@ class AffiliateMatrix:
             ]
         )
         self.logger = logging.getLogger('AffiliateMatrix')
+        self.config = self.load_config()
 
         # Initialize components
         self.init_components()
 
+    def load_config(self) -> Dict:
+        """Load deployment configuration"""
+        try:
+            with open('config/deployment.json', 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
     def init_components(self):
         """Initialize all system components"""
         try:
@@ -42,7 +53,9 @@ class AffiliateMatrix:
 
             # Discovery Engine
             self.dorking_engine = DorkingEngine()
-            self.validator = ValidationPipeline()
+            self.validator = ValidationPipeline(
+                cache_path=self.config.get('discovery', {}).get('validation_cache_path')
+            )
             self.resource_monitor = ResourceMonitor()
 
             # Funnel Replication
@@ -59,23 +72,33 @@ class AffiliateMatrix:
             self.logger.error(f"Component initialization failed: {str(e)}")
             raise
 
-    async def discovery_cycle(self):
-        """Run the discovery cycle"""
-        try:
-            if self.resource_monitor.should_trigger_dorking():
-                self.logger.info("Starting discovery cycle")
+    async def discover_domains(self):
+        """Yield validated domains as soon as each one passes validation"""
+        if not self.resource_monitor.should_trigger_dorking():
+            return
 
-                # Discover new programs
-                discovered_domains = await self.dorking_engine.executeSearch()
+        self.logger.info("Starting discovery cycle")
 
-                # Validate discoveries
-                valid_domains = []
-                for domain in discovered_domains:
-                    if await self.validator.deep_validation(domain):
-                        valid_domains.append(domain)
+        # Discover new programs
+        discovered_domains = await self.dorking_engine.executeSearch()
 
-                self.logger.info(f"Discovery cycle completed. Found {len(valid_domains)} valid domains")
-                return valid_domains
+        # Drop domains that don't resolve before the expensive checks
+        resolving_domains = await self.validator.prefilter(discovered_domains)
+
+        # Validate discoveries concurrently
+        concurrency = self.config.get('pipeline', {}).get('validation_concurrency', 50)
+        valid_count = 0
+        async for result in self.validator.validate_many(resolving_domains, concurrency):
+            if result['valid']:
+                valid_count += 1
+                yield result['domain']
+
+        self.logger.info(f"Discovery cycle completed. Found {valid_count} valid domains")
+
+    async def discovery_cycle(self):
+        """Run the discovery cycle"""
+        try:
+            return [domain async for domain in self.discover_domains()]
         except Exception as e:
             self.logger.error(f"Discovery cycle failed: {str(e)}")
             return []
@@ -98,8 +121,9 @@ class AffiliateMatrix:
             self.logger.info(f"Funnel cycle completed. Generated {len(funnels)} templates")
             return funnels
         except Exception as e:
+            # Re-raised so the pipeline stage counts the failed batch
             self.logger.error(f"Funnel cycle failed: {str(e)}")
-            return []
+            raise
 
     async def operation_cycle(self, funnels: List[Dict]):
         """Run the autonomous operation cycle"""
@@ -124,6 +148,49 @@ class AffiliateMatrix:
             self.logger.info("Operation cycle completed")
         except Exception as e:
             self.logger.error(f"Operation cycle failed: {str(e)}")
+            raise
+
+    def build_scheduler(self) -> PipelineScheduler:
+        """Build the stage-pipelined scheduler from config/deployment.json"""
+        pipeline = self.config.get('pipeline', {})
+
+        def stage_config(name: str) -> Dict:
+            return pipeline.get(name, {})
+
+        async def funnel_stage(domains: List[str]) -> List[Dict]:
+            return await self.funnel_cycle(domains)
+
+        async def operation_stage(funnels: List[Dict]) -> None:
+            await self.operation_cycle(funnels)
+
+        funnel = stage_config('funnel')
+        operation = stage_config('operation')
+        stages = [
+            Stage(
+                name='funnel',
+                handler=funnel_stage,
+                workers=funnel.get('workers', 4),
+                queue_size=funnel.get('queue_size', 100),
+                batch_size=funnel.get('batch_size', 1),
+                interval=funnel.get('batch_timeout', 5)
+            ),
+            Stage(
+                name='operation',
+                handler=operation_stage,
+                workers=operation.get('workers', 1),
+                queue_size=operation.get('queue_size', 100),
+                batch_size=operation.get('batch_size', 50),
+                interval=operation.get('batch_timeout', 30)
+            )
+        ]
+
+        return PipelineScheduler(
+            source=self.discover_domains,
+            source_interval=self.config.get('system', {}).get('discovery_interval', 3600),
+            stages=stages,
+            report_interval=pipeline.get('report_interval', 60),
+            logger=self.logger
+        )
 
     async def main_loop(self):
         """Main system loop"""
@@ -131,20 +198,8 @@ class AffiliateMatrix:
 
         while True:
             try:
-                # Run discovery cycle
-                domains = await self.discovery_cycle()
-
-                if domains:
-                    # Run funnel cycle
-                    funnels = await self.funnel_cycle(domains)
-
-                    if funnels:
-                        # Run operation cycle
-                        await self.operation_cycle(funnels)
-
-                # Sleep between cycles
-                await asyncio.sleep(3600)  # 1 hour between cycles
-
+                self.scheduler = self.build_scheduler()
+                await self.scheduler.run()
             except Exception as e:
                 self.logger.error(f"Main loop iteration failed: {str(e)}")
                 await asyncio.sleep(300)  # 5 minutes before retry
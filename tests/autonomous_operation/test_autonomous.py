@@ -1,9 +1,13 @@
 
+import os
+import tempfile
 import unittest
 from unittest.mock import Mock, patch, MagicMock
 import numpy as np
 from datetime import datetime, timedelta
 
+from autonomous_operation.budget_allocator import BudgetAllocator, Campaign
+
 class TestPerformanceAnalyzer(unittest.TestCase):
     def setUp(self):
         self.mock_data = {
@@ -83,6 +87,92 @@ class TestBudgetAllocator(unittest.TestCase):
             roi = (campaign['revenue'] - campaign['cost']) / campaign['cost']
             self.assertTrue(roi > 0)
 
+class TestVectorizedBudgetAllocator(unittest.TestCase):
+    def setUp(self):
+        self.allocator = BudgetAllocator(1000.0, seed=1)
+        self.allocator.add_campaign(Campaign('strong', 0, 1000, 100, 500.0, 200.0))
+        self.allocator.add_campaign(Campaign('weak', 0, 1000, 20, 220.0, 200.0))
+        self.allocator.add_campaign(Campaign('new', 0, 0, 0, 0.0, 0.0))
+
+    def test_allocation_sums_to_budget_and_respects_floor(self):
+        allocations = self.allocator.allocate_budget()
+        self.assertAlmostEqual(sum(allocations.values()), 1000.0, places=6)
+        self.assertGreater(allocations['strong'], allocations['weak'])
+        self.assertGreater(allocations['weak'], allocations['new'])
+
+        self.allocator.exploration_ratio = 0.0
+        self.allocator.min_budget_ratio = 0.5
+        allocations = self.allocator.allocate_budget(n_samples=200)
+        floor = 0.5 * 1000.0 / 3
+        self.assertAlmostEqual(allocations['new'], floor, places=6)
+        self.assertTrue(all(a >= floor - 1e-9 for a in allocations.values()))
+        self.assertAlmostEqual(sum(allocations.values()), 1000.0, places=6)
+
+    def test_floor_above_equal_split_is_capped(self):
+        self.allocator.min_budget_ratio = 1.5
+        allocations = self.allocator.allocate_budget()
+        self.assertAlmostEqual(sum(allocations.values()), 1000.0, places=6)
+        for allocation in allocations.values():
+            self.assertAlmostEqual(allocation, 1000.0 / 3, places=6)
+
+    def test_update_and_vectorized_sampling(self):
+        self.allocator.add_campaign(Campaign('strong', 50.0, 2000, 150, 900.0, 300.0))
+        self.assertEqual(len(self.allocator), 3)
+        self.allocator.update_stats(['weak', 'extra'], impressions=np.array([10, 500]),
+                                    conversions=np.array([1, 50]))
+        self.assertEqual(self.allocator.campaign_ids, ['strong', 'weak', 'new', 'extra'])
+        self.assertEqual(self.allocator.campaigns['strong'].impressions, 2000)
+        self.assertEqual(self.allocator.impressions.tolist(), [2000, 10, 0, 500])
+
+        draws = self.allocator.sample_conversion_rates(n_samples=5000)
+        self.assertEqual(draws.shape, (5000, 4))
+        # Posterior means are (conversions + 1) / (impressions + 2)
+        np.testing.assert_allclose(draws.mean(axis=0), [151 / 2002, 2 / 12, 0.5, 51 / 502], atol=0.02)
+
+        confidence = self.allocator.roi_confidence()
+        self.assertEqual(confidence[2], 0.0)
+        self.assertAlmostEqual(self.allocator.calculate_roi_confidence(self.allocator.campaigns['strong']),
+                               confidence[0])
+
+class TestCampaignEventIngest(unittest.TestCase):
+    def test_events_update_counters(self):
+        allocator = BudgetAllocator(1000.0, seed=1)
+        allocator.add_campaign(Campaign('a', 0, 100, 5, 50.0, 20.0))
+        allocator.record_impressions('a', 900)
+        allocator.record_conversion('a', revenue=25.0)
+        allocator.record_cost('a', 10.0)
+        allocator.record_impressions('b')
+        self.assertEqual(allocator.campaigns['a'], Campaign('a', 0, 1000, 6, 75.0, 30.0))
+        self.assertEqual(allocator.campaign_ids, ['a', 'b'])
+        self.assertEqual(allocator.impressions.tolist(), [1000, 1])
+        for i in range(100):                       # arrays grow as campaigns appear
+            allocator.record_cost(f'c{i}', 1.0)
+        self.assertEqual(len(allocator), 102)
+        self.assertEqual(allocator.cost.sum(), 130.0)
+
+    @patch('autonomous_operation.budget_allocator.time.time')
+    def test_time_decay_and_snapshot(self, clock):
+        clock.return_value = 1000.0
+        allocator = BudgetAllocator(1000.0, seed=1, half_life_seconds=3600)
+        allocator.record_impressions('old', 1000)
+        allocator.record_conversion('old', revenue=100.0, n=100)
+        clock.return_value += 3600
+        allocator.record_impressions('new', 1000)
+        allocator.record_conversion('new', revenue=100.0, n=100)
+        # One half-life later the old campaign's evidence counts half
+        np.testing.assert_allclose(allocator.conversions, [50, 100])
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'bandit.npz')
+            allocator.save(path)
+            clock.return_value += 3600
+            restored = BudgetAllocator.restore(path, 1000.0)
+        self.assertEqual(restored.campaign_ids, ['old', 'new'])
+        self.assertEqual(restored.half_life_seconds, 3600)
+        # Decay continues across the restart
+        np.testing.assert_allclose(restored.conversions, [25, 50])
+        np.testing.assert_allclose(restored.revenue, [25.0, 50.0])
+
 class TestCampaignGenerator(unittest.TestCase):
     def setUp(self):
         self.niche = 'test_niche'
@@ -1,8 +1,15 @@
 
+import asyncio
 import unittest
 from unittest.mock import Mock, patch, MagicMock
 import json
 
+import dns.resolver
+
+from discovery.dns_resolver import AsyncDNSResolver
+from discovery.validation_cache import ValidationCache
+from discovery.validation_pipeline import ValidationPipeline
+
 class TestDorkingModule(unittest.TestCase):
     def setUp(self):
         self.mock_proxy_list = ['proxy1.test:8080', 'proxy2.test:8080']
@@ -35,6 +42,88 @@ class TestValidationPipeline(unittest.TestCase):
         mock_whois.return_value = MagicMock(creation_date='2020-01-01')
         self.assertTrue(True)  # Simulated deep validation
 
+    def test_validate_many_bounds_concurrency(self):
+        pipeline = ValidationPipeline(cache=ValidationCache(':memory:'))
+        state = {'running': 0, 'peak': 0}
+
+        async def fake_deep_validation(domain):
+            state['running'] += 1
+            state['peak'] = max(state['peak'], state['running'])
+            await asyncio.sleep(0.01)
+            state['running'] -= 1
+            return {'domain': domain, 'valid': domain.startswith('ok')}
+
+        async def collect():
+            return [r async for r in pipeline.validate_many(domains, concurrency=3)]
+
+        domains = [f'ok{i}.com' for i in range(10)] + ['bad.com', 'ok0.com']
+        with patch.object(pipeline, 'deep_validation', side_effect=fake_deep_validation):
+            results = asyncio.run(collect())
+
+        self.assertEqual(len(results), 11)  # duplicates validated once
+        self.assertLessEqual(state['peak'], 3)
+        self.assertTrue(all('elapsed' in r for r in results))
+        self.assertEqual(sum(r['valid'] for r in results), 10)
+
+    @patch('dns.resolver.resolve')
+    def test_fast_validation_uses_cache(self, mock_resolve):
+        pipeline = ValidationPipeline(cache=ValidationCache(':memory:'))
+        self.assertTrue(pipeline.fast_validation(self.test_domain))
+        self.assertTrue(pipeline.fast_validation(self.test_domain))
+        self.assertEqual(mock_resolve.call_count, 1)
+        self.assertEqual(pipeline.cache.stats()['by_check']['dns']['hits'], 1)
+
+    @patch('dns.resolver.resolve', side_effect=dns.resolver.NXDOMAIN())
+    def test_trusted_domains_and_blacklist_follow_cache(self, mock_resolve):
+        pipeline = ValidationPipeline()
+        self.assertEqual(pipeline.cache.stats()['hits'], 0)  # in-memory by default
+        pipeline.trusted_domains.add('manual.com')
+        pipeline.cache.set_result('checked.com', {'domain': 'checked.com', 'valid': True})
+
+        self.assertEqual(set(pipeline.trusted_domains), {'manual.com', 'checked.com'})
+        self.assertTrue(pipeline.fast_validation('checked.com'))
+        self.assertFalse(pipeline.fast_validation('dead.com'))
+        self.assertEqual(pipeline.blacklist, {'dead.com'})
+
+    @patch('dns.resolver.resolve', return_value=['127.0.0.1'])
+    def test_fast_validation_rejects_cached_invalid_result(self, mock_resolve):
+        pipeline = ValidationPipeline()
+        pipeline.cache.set_result('young.example', {'domain': 'young.example', 'valid': False})
+
+        self.assertIn('young.example', pipeline.blacklist)
+        self.assertFalse(pipeline.fast_validation('young.example'))
+        mock_resolve.assert_not_called()
+
+    def test_cache_expiry(self):
+        cache = ValidationCache(':memory:', negative_ttl=0)
+        cache.set(self.test_domain, 'dns', False, ok=False)
+        cache.set(self.test_domain, 'whois', 400)
+        self.assertIsNone(cache.get(self.test_domain, 'dns'))
+        self.assertEqual(cache.get(self.test_domain, 'whois'), 400)
+        self.assertEqual(cache.purge_expired(), 1)
+
+    def test_prefilter_with_stub_resolver(self):
+        calls = []
+
+        async def stub_backend(name, rdtype):
+            calls.append(name)
+            await asyncio.sleep(0.01)
+            if name.startswith('dead'):
+                raise dns.resolver.NXDOMAIN()
+            return ['127.0.0.1'], 60
+
+        resolver = AsyncDNSResolver(backend=stub_backend)
+        pipeline = ValidationPipeline(cache=ValidationCache(':memory:'), resolver=resolver)
+        domains = ['live.com', 'dead.com', 'LIVE.com', 'live.com']
+
+        kept = asyncio.run(pipeline.prefilter(domains))
+
+        self.assertEqual(kept, ['live.com', 'LIVE.com'])
+        self.assertEqual(sorted(calls), ['dead.com', 'live.com'])  # in-flight lookups collapsed
+        self.assertEqual(resolver.stats['coalesced'], 1)
+        self.assertFalse(pipeline.fast_validation('dead.com'))
+        self.assertEqual(pipeline.cache.get('live.com', 'dns'), True)
+
     def test_reputation_check(self):
         # Test domain reputation checking
         mock_score = 80
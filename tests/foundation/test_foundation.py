@@ -1,7 +1,42 @@
 
+import asyncio
+import os
+import sqlite3
+import tempfile
 import unittest
+from contextlib import contextmanager
 from unittest.mock import Mock, patch
 
+from aiohttp import web
+
+import threading
+import time
+
+from foundation.aggregator_connector import AffiliateAggregator
+from foundation.api_key_manager import APIKeyManager
+from foundation.bulk_loader import BulkProgramLoader
+from foundation.catalog_sync import CatalogSync, SyncState
+from foundation.migrate import MigrationRunner
+
+async def start_fake_network(programs, page_size):
+    """Serve a paginated catalog and per-program offers on localhost"""
+    async def list_programs(request):
+        page = int(request.query['page'])
+        return web.json_response(programs[(page - 1) * page_size:page * page_size])
+
+    async def list_offers(request):
+        return web.json_response([{'id': f"offer-{request.match_info['program_id']}"}])
+
+    app = web.Application()
+    app.router.add_get('/programs', list_programs)
+    app.router.add_get('/offers/{program_id}', list_offers)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    return runner, f'http://127.0.0.1:{port}'
+
 class TestAPIKeyManager(unittest.TestCase):
     @patch('hvac.Client')
     def test_token_retrieval(self, mock_vault):
@@ -10,12 +45,258 @@ class TestAPIKeyManager(unittest.TestCase):
         }
         self.assertEqual('test_token', 'test_token')  # Simulated test
 
+class LocalKV:
+    """Stand-in for hvac's KV v2 API that counts round-trips"""
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.reads = 0
+        self.secrets = Mock()
+        self.secrets.kv.v2.read_secret_version.side_effect = self.read
+        self.secrets.kv.v2.create_or_update_secret.side_effect = self.write
+
+    def read(self, path, mount_point):
+        self.reads += 1
+        time.sleep(0.01)
+        return {'data': {'data': {'token': self.tokens[path]}}}
+
+    def write(self, path, secret, mount_point):
+        self.tokens[path] = secret['token']
+
+class TestTokenCache(unittest.TestCase):
+    def test_single_flight_under_concurrency(self):
+        kv = LocalKV({'cj': 'token-1'})
+        manager = APIKeyManager(client=kv, background_refresh=False)
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(manager.get_token('cj')))
+            for _ in range(100)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(results, ['token-1'] * 100)
+        self.assertEqual(kv.reads, 1)
+        self.assertEqual(manager.stats['cache_hits'], 99)
+
+    def test_rotate_invalidates_cache(self):
+        kv = LocalKV({'cj': 'token-1'})
+        manager = APIKeyManager(client=kv, background_refresh=False)
+        manager.get_token('cj')
+        manager.rotate_token('cj', 'token-2')
+        self.assertEqual(manager.get_token('cj'), 'token-2')
+        self.assertEqual(kv.reads, 2)
+
+    def test_background_refresh_before_expiry(self):
+        kv = LocalKV({'cj': 'token-1'})
+        manager = APIKeyManager(client=kv, ttl=0.3, refresh_margin=0.2)
+        try:
+            manager.get_token('cj')
+            manager.get_token('cj')
+            kv.tokens['cj'] = 'token-2'
+            time.sleep(0.35)
+            self.assertEqual(manager.get_token('cj'), 'token-2')
+            self.assertGreaterEqual(manager.stats['refreshes'], 1)
+        finally:
+            manager.close()
+
 class TestAggregatorConnector(unittest.TestCase):
     @patch('requests.get')
     def test_program_fetching(self, mock_get):
         mock_get.return_value.json.return_value = {'programs': [{'id': 1}]}
         self.assertTrue(True)  # Simulated test
 
+    def test_paginated_streaming_and_offer_fanout(self):
+        programs = [{'id': i} for i in range(25)]
+
+        async def run():
+            runner, url = await start_fake_network(programs, page_size=10)
+            aggregator = AffiliateAggregator(
+                key_manager=Mock(get_token=Mock(return_value='token')),
+                networks={'fake': url},
+                page_size=10
+            )
+            try:
+                pages = [page async for page in aggregator.iter_program_pages('fake')]
+                offers = await aggregator.fetch_offers_many('fake', ['1', '2', '3'])
+            finally:
+                await aggregator.close()
+                await runner.cleanup()
+            return pages, offers
+
+        pages, offers = asyncio.run(run())
+        self.assertEqual([len(p) for p in pages], [10, 10, 5])
+        self.assertEqual(offers['2'], [{'id': 'offer-2'}])
+
+    def test_changes_resume_from_updated_at_and_etag_is_per_query(self):
+        programs = [{'id': i, 'updated_at': f'2024-01-0{i + 1}'} for i in range(3)]
+        requests_seen = []
+
+        async def list_programs(request):
+            requests_seen.append((dict(request.query), request.headers.get('If-None-Match')))
+            if request.headers.get('If-None-Match') == '"v1"':
+                return web.Response(status=304)
+            since = request.query.get('updated_since', '')
+            changed = [p for p in programs if p['updated_at'] > since]
+            start = int(request.query.get('cursor', 0))
+            body = {'programs': changed[start:start + 2]}
+            if start + 2 < len(changed):
+                body['next_cursor'] = str(start + 2)
+            return web.json_response(body, headers={'ETag': '"v1"'})
+
+        async def run():
+            app = web.Application()
+            app.router.add_get('/programs', list_programs)
+            runner = web.AppRunner(app)
+            await runner.setup()
+            site = web.TCPSite(runner, '127.0.0.1', 0)
+            await site.start()
+            aggregator = AffiliateAggregator(
+                key_manager=Mock(get_token=Mock(return_value='t')),
+                networks={'fake': f'http://127.0.0.1:{runner.addresses[0][1]}'},
+                page_size=2
+            )
+            watermark = {}
+            try:
+                full = [p async for p in aggregator.iter_program_changes('fake', watermark)]
+                after_full = dict(watermark)
+                delta = [p async for p in aggregator.iter_program_changes('fake', watermark)]
+                repeat = [p async for p in aggregator.iter_program_changes('fake', watermark)]
+            finally:
+                await aggregator.close()
+                await runner.cleanup()
+            return full, after_full, delta, repeat
+
+        full, after_full, delta, repeat = asyncio.run(run())
+        self.assertEqual([len(p) for p in full], [2, 1])
+        self.assertNotIn('cursor', after_full)
+        self.assertEqual(after_full['updated_at'], '2024-01-03')
+        # The delta query differs from the full one, so the full sync's ETag is not sent
+        self.assertEqual(requests_seen[2], ({'page_size': '2', 'updated_since': '2024-01-03', 'page': '1'}, None))
+        self.assertEqual(delta, [])
+        self.assertEqual(requests_seen[3][1], '"v1"')
+        self.assertEqual(repeat, [])
+
+class SQLiteDatabase:
+    """Minimal affiliate_networks/affiliate_programs tables in SQLite"""
+    def __init__(self):
+        self.conn = sqlite3.connect(':memory:')
+        self.conn.executescript('''
+            CREATE TABLE affiliate_networks (
+                id INTEGER PRIMARY KEY, name TEXT UNIQUE, api_endpoint TEXT);
+            CREATE TABLE affiliate_programs (
+                id INTEGER PRIMARY KEY, network_id INTEGER, program_id TEXT,
+                name TEXT, description TEXT, category TEXT, commission_type TEXT,
+                commission_rate REAL, cookie_duration INTEGER, region TEXT,
+                status TEXT, updated_at TIMESTAMP,
+                UNIQUE (network_id, program_id));
+            CREATE TABLE program_metrics (
+                id INTEGER PRIMARY KEY, program_id INTEGER, epc REAL,
+                conversion_rate REAL, average_order_value REAL, total_sales INTEGER,
+                measurement_period TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP);
+        ''')
+
+    @contextmanager
+    def get_connection(self):
+        yield self.conn
+
+class TestCatalogSync(unittest.TestCase):
+    def test_delta_sync_upserts_only_changes(self):
+        catalog = {
+            '1': {'id': 1, 'name': 'One', 'commission_rate': 5, 'updated_at': '2024-01-01'},
+            '2': {'id': 2, 'name': 'Two', 'commission_rate': 7, 'updated_at': '2024-01-01'}
+        }
+        requests_seen = []
+
+        async def list_programs(request):
+            requests_seen.append(dict(request.query))
+            since = request.query.get('updated_since', '')
+            changed = [p for p in catalog.values() if p['updated_at'] > since]
+            return web.json_response(changed)
+
+        async def run(sync):
+            app = web.Application()
+            app.router.add_get('/programs', list_programs)
+            runner = web.AppRunner(app)
+            await runner.setup()
+            site = web.TCPSite(runner, '127.0.0.1', 0)
+            await site.start()
+            sync.aggregator.networks['fake'] = f'http://127.0.0.1:{runner.addresses[0][1]}'
+            try:
+                first = await sync.sync('fake')
+                catalog['2'] = dict(catalog['2'], name='Two v2', updated_at='2024-02-01')
+                catalog['3'] = {'id': 3, 'name': 'Three', 'updated_at': '2024-02-01'}
+                second = await sync.sync('fake')
+                third = await sync.sync('fake', full=True)
+            finally:
+                await sync.aggregator.close()
+                await runner.cleanup()
+            return first, second, third
+
+        with tempfile.TemporaryDirectory() as tmp:
+            db = SQLiteDatabase()
+            sync = CatalogSync(
+                AffiliateAggregator(key_manager=Mock(get_token=Mock(return_value='t'))),
+                db,
+                state=SyncState(os.path.join(tmp, 'state.json')),
+                delta_enabled=True
+            )
+            first, second, third = asyncio.run(run(sync))
+
+        self.assertEqual((first['mode'], first['added']), ('full', 2))
+        self.assertEqual(second['mode'], 'delta')
+        self.assertEqual(requests_seen[1]['updated_since'], '2024-01-01')
+        self.assertEqual((second['added'], second['updated'], second['unchanged']), (1, 1, 0))
+        self.assertEqual((third['added'], third['updated'], third['unchanged']), (0, 0, 3))
+        names = db.conn.execute('SELECT name FROM affiliate_programs ORDER BY program_id').fetchall()
+        self.assertEqual(names, [('One',), ('Two v2',), ('Three',)])
+
+    def test_state_stays_in_memory_without_a_path(self):
+        with tempfile.TemporaryDirectory() as tmp, patch.dict(os.environ):
+            os.environ.pop('SYNC_STATE_PATH', None)
+            state = SyncState()
+            with patch('builtins.open') as open_:
+                state.save('fake', {'updated_at': '2024-01-01'})
+            open_.assert_not_called()
+            self.assertEqual(state.get('fake'), {'updated_at': '2024-01-01'})
+
+            path = os.path.join(tmp, 'state.json')
+            with patch.dict(os.environ, {'SYNC_STATE_PATH': path}):
+                SyncState().save('fake', {'updated_at': '2024-02-01'})
+            self.assertEqual(SyncState(path).get('fake'), {'updated_at': '2024-02-01'})
+
+class TestBulkProgramLoader(unittest.TestCase):
+    def test_chunked_upsert_and_metrics(self):
+        db = SQLiteDatabase()
+        loader = BulkProgramLoader(db, chunk_size=3)
+        records = ({'id': i, 'name': f'P{i}', 'epc': 0.5} for i in range(7))
+
+        report = loader.load('cj', records)
+        self.assertEqual((report['rows'], report['chunks'], report['metrics_appended']), (7, 3, 7))
+
+        loader.load('cj', [{'id': 1, 'name': 'Renamed'}])
+        programs = db.conn.execute('SELECT COUNT(*) FROM affiliate_programs').fetchone()[0]
+        name = db.conn.execute("SELECT name FROM affiliate_programs WHERE program_id = '1'").fetchone()[0]
+        metrics = db.conn.execute('SELECT COUNT(*) FROM program_metrics').fetchone()[0]
+        self.assertEqual((programs, name, metrics), (7, 'Renamed', 7))
+
+class TestMigrationRunner(unittest.TestCase):
+    def test_applies_pending_migrations_once(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with open(os.path.join(directory, '002_add_index.sql'), 'w') as f:
+                f.write('CREATE INDEX idx_programs_name ON affiliate_programs (name);')
+            with open(os.path.join(directory, '001_add_table.sql'), 'w') as f:
+                f.write('CREATE TABLE extra (id INTEGER);\nINSERT INTO extra VALUES (1);')
+
+            # Existing database created from the baseline schema
+            db = SQLiteDatabase()
+            runner = MigrationRunner(db.conn, directory)
+            self.assertEqual(runner.run(), ['001_add_table', '002_add_index'])
+            self.assertEqual(runner.run(), [])
+            self.assertEqual(runner.applied(), {'000_index_schema', '001_add_table', '002_add_index'})
+            self.assertEqual(db.conn.execute('SELECT COUNT(*) FROM extra').fetchone()[0], 1)
+
 class TestDatabaseSchema(unittest.TestCase):
     def test_schema_validation(self):
         required_tables = ['affiliate_networks', 'affiliate_programs', 'program_metrics']
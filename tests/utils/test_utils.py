@@ -0,0 +1,145 @@
+import asyncio
+import sqlite3
+import unittest
+
+from utils.database import (
+    AsyncConnectionPool, AsyncDatabaseConnection, ConnectionPool, DatabaseConnection,
+    PoolTimeout
+)
+from utils.scheduler import PipelineScheduler, Stage
+
+class TestPipelineScheduler(unittest.TestCase):
+    def test_items_flow_through_stages(self):
+        seen = []
+
+        async def source():
+            return ['a.com', 'b.com', 'c.com']
+
+        async def double(batch):
+            return [item + '!' for item in batch]
+
+        async def collect(batch):
+            seen.extend(batch)
+
+        scheduler = PipelineScheduler(
+            source=source,
+            source_interval=0,
+            stages=[
+                Stage('funnel', double, workers=2, queue_size=1),
+                Stage('operation', collect, batch_size=10, interval=0.01)
+            ],
+            report_interval=None
+        )
+        asyncio.run(scheduler.run(cycles=2))
+
+        self.assertEqual(sorted(seen), sorted(['a.com!', 'b.com!', 'c.com!'] * 2))
+        report = scheduler.report()
+        self.assertEqual(report['funnel']['processed'], 6)
+        self.assertEqual(report['operation']['queue_depth'], 0)
+
+    def test_stage_failure_is_counted(self):
+        async def source():
+            return [1, 2]
+
+        async def fail(batch):
+            raise RuntimeError('boom')
+
+        scheduler = PipelineScheduler(source, 0, [Stage('funnel', fail)], report_interval=None)
+        asyncio.run(scheduler.run(cycles=1))
+
+        self.assertEqual(scheduler.report()['funnel']['failed'], 2)
+
+class FakeAsyncConnection:
+    def __init__(self):
+        self.closed = False
+
+    async def execute(self, query):
+        if self.closed:
+            raise ConnectionError('closed')
+
+    async def close(self):
+        self.closed = True
+
+class TestConnectionPool(unittest.TestCase):
+    def test_connections_are_reused(self):
+        opened = []
+
+        def connect():
+            conn = sqlite3.connect(':memory:', check_same_thread=False)
+            opened.append(conn)
+            return conn
+
+        db = DatabaseConnection({}, min_size=1, max_size=2, connect=connect)
+        for _ in range(5):
+            with db.get_connection() as conn:
+                conn.execute('SELECT 1')
+
+        self.assertEqual(len(opened), 1)
+        self.assertEqual(db.metrics()['checkouts'], 5)
+        self.assertEqual(db.metrics()['in_use'], 0)
+
+    def test_unhealthy_and_expired_connections_are_replaced(self):
+        db = DatabaseConnection({}, min_size=1, max_size=1, connect=lambda: sqlite3.connect(':memory:'))
+        with db.get_connection() as conn:
+            first = conn
+        first.close()  # health check on next checkout fails
+        with db.get_connection() as conn:
+            self.assertIsNot(conn, first)
+
+        db.pool.max_lifetime = 0
+        with db.get_connection() as conn:
+            second = conn
+        with db.get_connection() as conn:
+            self.assertIsNot(conn, second)
+        self.assertEqual(db.metrics()['size'], 1)
+
+    def test_checkout_times_out_when_exhausted(self):
+        pool = ConnectionPool(lambda: sqlite3.connect(':memory:'), min_size=0,
+                              max_size=1, checkout_timeout=0.05)
+        pool.acquire()
+        with self.assertRaises(PoolTimeout):
+            pool.acquire()
+
+    def test_pool_connects_on_first_checkout(self):
+        opened = []
+        db = DatabaseConnection({}, min_size=2, connect=lambda: opened.append(1) or sqlite3.connect(':memory:'))
+        self.assertEqual(opened, [])
+        with db.get_connection():
+            pass
+        self.assertEqual(len(opened), 2)
+
+    def test_async_checkout_past_deadline_takes_idle_connection(self):
+        async def connect():
+            return FakeAsyncConnection()
+
+        async def run():
+            pool = AsyncConnectionPool(connect, min_size=1, max_size=1, checkout_timeout=0)
+            first = await pool.acquire()
+            await pool.release(first)
+            return first, await pool.acquire()
+
+        first, second = asyncio.run(run())
+        self.assertIs(first, second)
+
+    def test_async_pool_limits_concurrency(self):
+        async def connect():
+            return FakeAsyncConnection()
+
+        async def run():
+            db = AsyncDatabaseConnection({}, min_size=0, max_size=2, connect=connect)
+            peak = 0
+
+            async def use():
+                nonlocal peak
+                async with db.get_connection():
+                    peak = max(peak, db.metrics()['in_use'])
+                    await asyncio.sleep(0.01)
+
+            await asyncio.gather(*(use() for _ in range(6)))
+            await db.close()
+            return peak, db.metrics()
+
+        peak, metrics = asyncio.run(run())
+        self.assertEqual(peak, 2)
+        self.assertEqual(metrics['checkouts'], 6)
+        self.assertGreater(metrics['max_wait_ms'], 0)
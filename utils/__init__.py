@@ -1,4 +1,4 @@
 
 from .logger import setup_logger
-from .database import DatabaseConnection
+from .database import DatabaseConnection, AsyncDatabaseConnection
 from .metrics import MetricsCollector
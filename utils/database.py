@@ -1,17 +1,352 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Awaitable, Callable, Dict, Optional
 
+import asyncpg
 import psycopg2
-from contextlib import contextmanager
+
+class PoolTimeout(Exception):
+    """No connection became available within the checkout timeout"""
+
+class _PoolMetrics:
+    """Checkout wait-time and utilization counters shared by both pools"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.size = 0
+        self.in_use = 0
+        self.checkouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.discarded = 0
+
+    def _record_wait(self, waited: float):
+        self.checkouts += 1
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            'size': self.size,
+            'in_use': self.in_use,
+            'idle': self.size - self.in_use,
+            'max_size': self.max_size,
+            'utilization': self.in_use / self.max_size if self.max_size else 0.0,
+            'checkouts': self.checkouts,
+            'avg_wait_ms': (self.total_wait / self.checkouts * 1000) if self.checkouts else 0.0,
+            'max_wait_ms': self.max_wait * 1000,
+            'discarded': self.discarded
+        }
+
+def _sync_ping(conn):
+    conn.cursor().execute('SELECT 1')
+
+class ConnectionPool(_PoolMetrics):
+    """Thread-safe pool of DB-API connections.
+
+    Nothing is opened until the first checkout, which also pre-opens
+    `min_size` connections. Connections are health-checked on checkout and
+    replaced once they are older than `max_lifetime` seconds.
+    """
+
+    def __init__(self, connect: Callable[[], Any],
+                 min_size: int = 1,
+                 max_size: int = 10,
+                 max_lifetime: float = 3600,
+                 checkout_timeout: float = 30,
+                 health_check: Optional[Callable[[Any], None]] = _sync_ping):
+        super().__init__(max_size)
+        self.connect = connect
+        self.min_size = min_size
+        self.max_lifetime = max_lifetime
+        self.checkout_timeout = checkout_timeout
+        self.health_check = health_check
+
+        self._idle = deque()
+        self._created: Dict[int, float] = {}
+        self._cond = threading.Condition()
+        self._warmed = False
+
+    def _open(self):
+        conn = self.connect()
+        self._created[id(conn)] = time.monotonic()
+        self.size += 1
+        return conn
+
+    def _warm(self):
+        """Pre-open min_size connections on the first checkout"""
+        with self._cond:
+            if self._warmed:
+                return
+            while self.size < self.min_size:
+                self._idle.append(self._open())
+            self._warmed = True
+
+    def _discard(self, conn):
+        self._created.pop(id(conn), None)
+        self.discarded += 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _usable(self, conn) -> bool:
+        if time.monotonic() - self._created.get(id(conn), 0) > self.max_lifetime:
+            return False
+        if self.health_check:
+            try:
+                self.health_check(conn)
+            except Exception:
+                return False
+        return True
+
+    def acquire(self):
+        if not self._warmed:
+            self._warm()
+        started = time.monotonic()
+        deadline = started + self.checkout_timeout
+        while True:
+            conn = None
+            with self._cond:
+                while not self._idle and self.size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or not self._cond.wait(remaining):
+                        raise PoolTimeout(f"No connection available after {self.checkout_timeout}s")
+                if self._idle:
+                    conn = self._idle.pop()
+                # Reserve the slot; the checkout itself happens outside the lock
+                else:
+                    self.size += 1
+                self.in_use += 1
+
+            try:
+                if conn is None:
+                    conn = self.connect()
+                    self._created[id(conn)] = time.monotonic()
+                elif not self._usable(conn):
+                    self._discard(conn)
+                    self._release_slot()
+                    continue
+            except Exception:
+                self._release_slot()
+                raise
+
+            self._record_wait(time.monotonic() - started)
+            return conn
+
+    def _release_slot(self):
+        with self._cond:
+            self.size -= 1
+            self.in_use -= 1
+            self._cond.notify()
+
+    def release(self, conn, discard: bool = False):
+        if discard:
+            self._discard(conn)
+            self._release_slot()
+            return
+        with self._cond:
+            self.in_use -= 1
+            self._idle.append(conn)
+            self._cond.notify()
+
+    def close(self):
+        with self._cond:
+            while self._idle:
+                self._discard(self._idle.pop())
+                self.size -= 1
 
 class DatabaseConnection:
-    def __init__(self, config):
+    def __init__(self, config, min_size: int = 1, max_size: int = 10,
+                 max_lifetime: float = 3600, connect: Optional[Callable[[], Any]] = None):
         self.config = config
+        self.pool = ConnectionPool(
+            connect or (lambda: psycopg2.connect(**self.config)),
+            min_size=min_size,
+            max_size=max_size,
+            max_lifetime=max_lifetime
+        )
 
     @contextmanager
     def get_connection(self):
-        conn = None
+        conn = self.pool.acquire()
+        broken = False
+        try:
+            yield conn
+        except Exception:
+            broken = True
+            raise
+        finally:
+            # Uncommitted work is discarded, as closing the connection used to do
+            try:
+                conn.rollback()
+            except Exception:
+                broken = True
+            self.pool.release(conn, discard=broken and not self.pool._usable(conn))
+
+    def metrics(self) -> Dict[str, Any]:
+        return self.pool.metrics()
+
+    def close(self):
+        self.pool.close()
+
+async def _async_ping(conn):
+    await conn.execute('SELECT 1')
+
+class AsyncConnectionPool(_PoolMetrics):
+    """asyncio counterpart of ConnectionPool for coroutine-based drivers"""
+
+    def __init__(self, connect: Callable[[], Awaitable[Any]],
+                 min_size: int = 1,
+                 max_size: int = 10,
+                 max_lifetime: float = 3600,
+                 checkout_timeout: float = 30,
+                 health_check: Optional[Callable[[Any], Awaitable[None]]] = _async_ping):
+        super().__init__(max_size)
+        self.connect = connect
+        self.min_size = min_size
+        self.max_lifetime = max_lifetime
+        self.checkout_timeout = checkout_timeout
+        self.health_check = health_check
+
+        self._idle = deque()
+        self._created: Dict[int, float] = {}
+        self._cond: Optional[asyncio.Condition] = None
+
+    async def open(self):
+        """Create the condition on the running loop and pre-open min_size connections"""
+        self._cond = asyncio.Condition()
+        for _ in range(self.min_size):
+            self._idle.append(await self._open())
+
+    async def _open(self):
+        conn = await self.connect()
+        self._created[id(conn)] = time.monotonic()
+        self.size += 1
+        return conn
+
+    async def _discard(self, conn):
+        self._created.pop(id(conn), None)
+        self.discarded += 1
+        try:
+            await conn.close()
+        except Exception:
+            pass
+
+    async def _usable(self, conn) -> bool:
+        if time.monotonic() - self._created.get(id(conn), 0) > self.max_lifetime:
+            return False
+        if self.health_check:
+            try:
+                await self.health_check(conn)
+            except Exception:
+                return False
+        return True
+
+    def _available(self) -> bool:
+        return bool(self._idle) or self.size < self.max_size
+
+    async def acquire(self):
+        if self._cond is None:
+            await self.open()
+        started = time.monotonic()
+        deadline = started + self.checkout_timeout
+        while True:
+            conn = None
+            async with self._cond:
+                if not self._available():
+                    remaining = deadline - time.monotonic()
+                    try:
+                        if remaining <= 0:
+                            raise asyncio.TimeoutError()
+                        await asyncio.wait_for(self._cond.wait_for(self._available), remaining)
+                    except asyncio.TimeoutError:
+                        raise PoolTimeout(f"No connection available after {self.checkout_timeout}s")
+                if self._idle:
+                    conn = self._idle.pop()
+                # Reserve the slot; the checkout itself happens outside the lock
+                else:
+                    self.size += 1
+                self.in_use += 1
+
+            try:
+                if conn is None:
+                    conn = await self.connect()
+                    self._created[id(conn)] = time.monotonic()
+                elif not await self._usable(conn):
+                    await self._discard(conn)
+                    await self._release_slot()
+                    continue
+            except BaseException:
+                await self._release_slot()
+                raise
+
+            self._record_wait(time.monotonic() - started)
+            return conn
+
+    async def _release_slot(self):
+        async with self._cond:
+            self.size -= 1
+            self.in_use -= 1
+            self._cond.notify()
+
+    async def release(self, conn, discard: bool = False):
+        if discard:
+            await self._discard(conn)
+            await self._release_slot()
+            return
+        async with self._cond:
+            self.in_use -= 1
+            self._idle.append(conn)
+            self._cond.notify()
+
+    async def close(self):
+        while self._idle:
+            await self._discard(self._idle.pop())
+            self.size -= 1
+
+class AsyncDatabaseConnection:
+    """Pooled asyncpg connections for the asyncio code paths"""
+
+    def __init__(self, config, min_size: int = 1, max_size: int = 10,
+                 max_lifetime: float = 3600,
+                 connect: Optional[Callable[[], Awaitable[Any]]] = None):
+        self.config = config
+        self.pool = AsyncConnectionPool(
+            connect or self._connect,
+            min_size=min_size,
+            max_size=max_size,
+            max_lifetime=max_lifetime
+        )
+
+    async def _connect(self):
+        config = dict(self.config)
+        # asyncpg names the database `database`, psycopg2 `dbname`
+        if 'dbname' in config:
+            config['database'] = config.pop('dbname')
+        return await asyncpg.connect(**config)
+
+    @asynccontextmanager
+    async def get_connection(self):
+        conn = await self.pool.acquire()
+        broken = False
         try:
-            conn = psycopg2.connect(**self.config)
             yield conn
+        except Exception:
+            broken = True
+            raise
         finally:
-            if conn:
-                conn.close()
+            await self.pool.release(conn, discard=broken and not await self.pool._usable(conn))
+
+    def metrics(self) -> Dict[str, Any]:
+        return self.pool.metrics()
+
+    async def close(self):
+        await self.pool.close()
+
+def param_marker(conn) -> str:
+    """Query parameter placeholder for a DB-API connection (sqlite3 or psycopg2)"""
+    return '?' if type(conn).__module__.startswith('sqlite3') else '%s'
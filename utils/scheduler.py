@@ -0,0 +1,184 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+# Sentinel pushed through the queues to stop downstream workers
+_STOP = object()
+
+
+@dataclass
+class StageStats:
+    name: str
+    processed: int = 0
+    failed: int = 0
+    batches: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def throughput(self) -> float:
+        """Items processed per second since the stage started"""
+        elapsed = time.monotonic() - self.started_at
+        return self.processed / elapsed if elapsed > 0 else 0.0
+
+
+@dataclass
+class Stage:
+    """A pipeline stage consuming items from its input queue.
+
+    `handler` receives a batch (list) of items and returns an iterable of
+    results to forward to the next stage (or None). A batch is flushed as
+    soon as `batch_size` items are buffered or `interval` seconds have
+    passed since the first item of the batch arrived.
+    """
+    name: str
+    handler: Callable[[List[Any]], Awaitable[Optional[List[Any]]]]
+    workers: int = 1
+    queue_size: int = 100
+    batch_size: int = 1
+    interval: Optional[float] = None
+
+
+class PipelineScheduler:
+    """Runs a periodic source feeding a chain of bounded, concurrent stages.
+
+    Queues between stages are bounded so a slow stage applies backpressure
+    to the ones upstream of it instead of buffering without limit.
+    """
+
+    def __init__(self,
+                 source: Callable[[], Any],
+                 source_interval: float,
+                 stages: List[Stage],
+                 report_interval: Optional[float] = 60,
+                 logger: Optional[logging.Logger] = None):
+        self.source = source
+        self.source_interval = source_interval
+        self.stages = stages
+        self.report_interval = report_interval
+        self.logger = logger or logging.getLogger('PipelineScheduler')
+
+        self.queues: List[asyncio.Queue] = []
+        self.stats: Dict[str, StageStats] = {'source': StageStats('source')}
+        for stage in stages:
+            self.stats[stage.name] = StageStats(stage.name)
+
+    async def run(self, cycles: Optional[int] = None):
+        """Run the pipeline; `cycles` limits the number of source runs"""
+        self.queues = [asyncio.Queue(maxsize=s.queue_size) for s in self.stages]
+
+        stage_tasks = []
+        for index, stage in enumerate(self.stages):
+            workers = [
+                asyncio.create_task(self._worker(index, stage))
+                for _ in range(max(1, stage.workers))
+            ]
+            stage_tasks.append(workers)
+
+        reporter = None
+        if self.report_interval:
+            reporter = asyncio.create_task(self._reporter())
+
+        try:
+            await self._produce(cycles)
+        finally:
+            # Drain stage by stage so every queued item is processed
+            for index, workers in enumerate(stage_tasks):
+                for _ in workers:
+                    await self.queues[index].put(_STOP)
+                await asyncio.gather(*workers, return_exceptions=True)
+            if reporter:
+                reporter.cancel()
+
+    async def _produce(self, cycles: Optional[int]):
+        stats = self.stats['source']
+        runs = 0
+        while cycles is None or runs < cycles:
+            started = time.monotonic()
+            try:
+                result = self.source()
+                if hasattr(result, '__aiter__'):
+                    async for item in result:
+                        await self._forward(0, [item])
+                        stats.processed += 1
+                else:
+                    items = await result if asyncio.iscoroutine(result) else result
+                    for item in items or []:
+                        await self._forward(0, [item])
+                        stats.processed += 1
+            except Exception as e:
+                stats.failed += 1
+                self.logger.error(f"Pipeline source failed: {str(e)}")
+            stats.batches += 1
+
+            runs += 1
+            if cycles is not None and runs >= cycles:
+                break
+            elapsed = time.monotonic() - started
+            await asyncio.sleep(max(0.0, self.source_interval - elapsed))
+
+    async def _forward(self, index: int, items):
+        if index >= len(self.queues):
+            return
+        for item in items or []:
+            await self.queues[index].put(item)
+
+    async def _next_batch(self, queue: asyncio.Queue, stage: Stage):
+        """Collect up to batch_size items, waiting at most `interval`"""
+        first = await queue.get()
+        if first is _STOP:
+            return None, True
+        batch = [first]
+        deadline = time.monotonic() + (stage.interval or 0)
+        while len(batch) < stage.batch_size:
+            timeout = deadline - time.monotonic()
+            try:
+                if timeout > 0:
+                    item = await asyncio.wait_for(queue.get(), timeout)
+                else:
+                    item = queue.get_nowait()
+            except (asyncio.TimeoutError, asyncio.QueueEmpty):
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    async def _worker(self, index: int, stage: Stage):
+        queue = self.queues[index]
+        stats = self.stats[stage.name]
+        while True:
+            batch, stop = await self._next_batch(queue, stage)
+            if batch:
+                try:
+                    results = await stage.handler(batch)
+                    stats.processed += len(batch)
+                    await self._forward(index + 1, results)
+                except Exception as e:
+                    stats.failed += len(batch)
+                    self.logger.error(f"Stage {stage.name} failed: {str(e)}")
+                stats.batches += 1
+            if stop:
+                return
+
+    def report(self) -> Dict[str, Dict]:
+        """Per-stage queue depth and throughput"""
+        report = {}
+        for name, stats in self.stats.items():
+            report[name] = {
+                'processed': stats.processed,
+                'failed': stats.failed,
+                'batches': stats.batches,
+                'throughput': round(stats.throughput, 3)
+            }
+        for stage, queue in zip(self.stages, self.queues):
+            report[stage.name]['queue_depth'] = queue.qsize()
+            report[stage.name]['queue_size'] = stage.queue_size
+        return report
+
+    async def _reporter(self):
+        while True:
+            await asyncio.sleep(self.report_interval)
+            for name, stats in self.report().items():
+                self.logger.info(f"Pipeline stage {name}: {stats}")